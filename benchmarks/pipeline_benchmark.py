@@ -0,0 +1,473 @@
+import ast
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from collections import Counter
+from typing import List, Dict
+
+import pandas as pd
+
+from benchmarks.project_generator import create_synthetic_project
+from graphit import __version__
+from graphit.settings import logger, PARSING_MODE_AST, PARSING_MODES, PROFILE_REPORT_FILE_NAME, \
+    FLOW_CHART_RENDERERS, FLOW_CHART_RENDERER_SVG, GRAPH_EXPANSION_MODES, GRAPH_EXPANSION_MODE_MEMOIZED
+from graphit.utils.diff_helpers import read_baseline_meta_data, get_function_import_paths, get_function_dependency_lists
+from graphit.utils.run_helpers import parse_graphit_arguments, run_configured_graphit
+
+# the synthetic projects benchmarked, see benchmarks.project_generator.create_synthetic_project
+BENCHMARK_PROJECT_SIZES = {
+    'small': {'n_modules': 20, 'n_functions_per_module': 10},
+    'medium': {'n_modules': 100, 'n_functions_per_module': 20},
+    'large': {'n_modules': 400, 'n_functions_per_module': 25},
+}
+
+# the baseline results committed to the repository, see compare_benchmark_results
+BENCHMARK_BASELINE_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_results.json')
+
+# a stage only counts as regressed if it is slower / uses more memory than its baseline by more than the relative
+# tolerance AND the absolute minimum difference, so that noise in very short stages doesn't fail the comparison
+BENCHMARK_REGRESSION_TOLERANCE = 0.25
+BENCHMARK_REGRESSION_MIN_TIME_DELTA_S = 0.05
+BENCHMARK_REGRESSION_MIN_MEMORY_DELTA_MB = 5
+BENCHMARK_REGRESSION_MAX_ACCURACY_DROP = 0.01
+
+# the size and repeats of the calibration workload the stage timings are normalized with, see measure_calibration_time
+BENCHMARK_CALIBRATION_N_FUNCTIONS = 2000
+BENCHMARK_CALIBRATION_REPEATS = 5
+
+
+def measure_calibration_time(n_functions: int = BENCHMARK_CALIBRATION_N_FUNCTIONS,
+                             n_repeats: int = BENCHMARK_CALIBRATION_REPEATS) -> float:
+    '''
+    Returns the best of n_repeats wall times of a fixed workload similar to that of graphit, i.e. parsing and walking
+    the syntax tree of a synthetic module with n_functions functions. Timings are compared with a baseline as multiples
+    of the calibration time measured along with them, so that baselines remain comparable across machines of different
+    speed, see compare_benchmark_results.
+
+    Args:
+        n_functions:
+        n_repeats:
+
+    Returns:
+
+    '''
+
+    module_source = ''.join([f'def handle_{function_index}(x):\n    return handle_{function_index + 1}(len(str(x)))\n\n'
+                             for function_index in range(n_functions)])
+    calibration_times = []
+
+    for _ in range(n_repeats):
+        calibration_start = time.perf_counter()
+
+        for _ in ast.walk(ast.parse(module_source)):
+            pass
+
+        calibration_times.append(time.perf_counter() - calibration_start)
+
+    return min(calibration_times)
+
+
+def run_profiled_graphit(project_directory: str,
+                         output_directory: str,
+                         parse_cache_directory: str,
+                         trace_memory: bool = False,
+                         parsing_mode: str = PARSING_MODE_AST,
+                         graph_expansion_mode: str = GRAPH_EXPANSION_MODE_MEMOIZED,
+                         export_diagrams: bool = True,
+                         renderer: str = FLOW_CHART_RENDERER_SVG,
+                         n_jobs: int = 1) -> Dict:
+    '''
+    Runs graphit on the specified project via graphit.utils.run_helpers.run_configured_graphit, i.e. exactly like
+    `run_graphit --profile` does, with a cold parse cache in the specified cache directory. The stage measurements are
+    taken from the run's profile report: each stage's wall time, cpu time and, if trace_memory is set, the peak memory
+    allocated during the stage (which slows down all stages considerably).
+
+    Returns the stage measurements and the recorded function calls as qualified handles, read back from the exported
+    meta data, see resolution_accuracy.
+
+    Args:
+        project_directory:
+        output_directory: The directory the run's timestamped output directory is created in
+        parse_cache_directory:
+        trace_memory:
+        parsing_mode: See `run_graphit --mode`
+        graph_expansion_mode: See `run_graphit --graph-expansion`
+        export_diagrams: See `run_graphit --no-diagrams`
+        renderer: See `run_graphit --renderer`
+        n_jobs: See `run_graphit --jobs`
+
+    Returns:
+
+    '''
+
+    graphit_args = ['--reference-directory', project_directory,
+                    '--module-scope', project_directory,
+                    '--meta-data-export-directory', output_directory,
+                    '--cache-directory', parse_cache_directory,
+                    '--rebuild-cache',
+                    '--mode', parsing_mode,
+                    '--graph-expansion', graph_expansion_mode,
+                    '--renderer', renderer,
+                    '--jobs', str(n_jobs),
+                    '--profile']
+
+    if not trace_memory:
+        graphit_args.append('--no-profile-memory')
+
+    if not export_diagrams:
+        graphit_args.append('--no-diagrams')
+
+    run_output_directory = run_configured_graphit(parse_graphit_arguments(graphit_args))
+
+    with open(os.path.join(run_output_directory, PROFILE_REPORT_FILE_NAME), 'r') as f:
+        profile_report = json.load(f)
+
+    stage_measurements = dict([(stage_profile['stage'], stage_profile) for stage_profile in profile_report['stages']])
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = read_baseline_meta_data(run_output_directory)
+    function_import_paths = get_function_import_paths(module_meta_data, function_meta_data)
+    function_dependency_lists = get_function_dependency_lists(function_dependency_meta_data)
+
+    recorded_function_calls = dict([(function_import_path, [function_import_paths[function_dependency_id]
+                                                            for function_dependency_id in function_dependency_lists.get(function_id, [])])
+                                    for function_id, function_import_path in function_import_paths.items()])
+
+    return {'stage_measurements': stage_measurements,
+            'function_calls': recorded_function_calls,
+            'n_graph_roots': stage_measurements['graph_roots']['n_items'],
+            'n_graph_records': stage_measurements['graph_root_export']['n_items']}
+
+
+def resolution_accuracy(recorded_function_calls: Dict[str, List[str]],
+                        expected_function_calls: Dict[str, List[str]]) -> Dict:
+    '''
+    Compares the recorded function calls with the ground truth of a synthetic project. Both map qualified function
+    handles onto the qualified handles of the functions they call. Returns the share of recorded calls that are correct
+    (precision) and the share of actual calls that were recorded (recall).
+
+    Args:
+        recorded_function_calls:
+        expected_function_calls:
+
+    Returns:
+
+    '''
+
+    recorded_calls = Counter([(function, called_function) for function, called_functions in recorded_function_calls.items()
+                              for called_function in called_functions])
+    expected_calls = Counter([(function, called_function) for function, called_functions in expected_function_calls.items()
+                              for called_function in called_functions])
+
+    n_correct_calls = sum((recorded_calls & expected_calls).values())
+
+    return {'precision': n_correct_calls / max(1, sum(recorded_calls.values())),
+            'recall': n_correct_calls / max(1, sum(expected_calls.values()))}
+
+
+def compare_parsing_modes(project_directory: str,
+                          output_directory: str,
+                          parse_cache_directory: str,
+                          expected_function_calls: Dict[str, List[str]],
+                          n_repeats: int = 1) -> List[Dict]:
+    '''
+    Runs graphit on the specified project with each parsing mode (see PARSING_MODES), without plotting any diagrams, and
+    compares the modes' speed and accuracy: the best of n_repeats wall times of the function recording stage, the share
+    of the project's functions that were recorded (definition_recall), and the accuracy of the function call resolution
+    against the project's ground truth, see resolution_accuracy.
+
+    Args:
+        project_directory:
+        output_directory:
+        parse_cache_directory:
+        expected_function_calls:
+        n_repeats:
+
+    Returns:
+
+    '''
+
+    parsing_mode_results = []
+
+    for parsing_mode in PARSING_MODES:
+        graphit_runs = [run_profiled_graphit(project_directory, output_directory, parse_cache_directory,
+                                             parsing_mode=parsing_mode, export_diagrams=False)
+                        for _ in range(n_repeats)]
+
+        parsing_mode_results.append({'parsing_mode': parsing_mode,
+                                     'function_recording_wall_time_s': min([graphit_run['stage_measurements']['function_recording']['wall_time_s'] for graphit_run in graphit_runs]),
+                                     'definition_recall': len(set(graphit_runs[0]['function_calls']).intersection(expected_function_calls)) / max(1, len(expected_function_calls)),
+                                     **resolution_accuracy(graphit_runs[0]['function_calls'], expected_function_calls)})
+
+    return parsing_mode_results
+
+
+def run_pipeline_benchmark(project_sizes: List[str],
+                           n_repeats: int = 1,
+                           trace_memory: bool = True,
+                           graph_expansion_mode: str = GRAPH_EXPANSION_MODE_MEMOIZED,
+                           export_diagrams: bool = True,
+                           renderer: str = FLOW_CHART_RENDERER_SVG,
+                           n_jobs: int = 1,
+                           compare_modes: bool = True) -> Dict:
+    '''
+    Generates a synthetic project of each of the specified sizes (see BENCHMARK_PROJECT_SIZES) and runs graphit on it,
+    see run_profiled_graphit. The best of n_repeats wall and cpu times is reported for each stage of the run, along with
+    the calibration time measured right before the project's runs (see measure_calibration_time). The peak
+    memory of each stage is measured in a separate run, so that tracing the memory doesn't distort the timings. The
+    accuracy of the function call resolution is measured against the projects' ground truth. If compare_modes is set,
+    the speed and accuracy of the parsing modes are compared as well, see compare_parsing_modes.
+
+    Returns the machine readable benchmark results, see compare_benchmark_results.
+
+    Args:
+        project_sizes:
+        n_repeats:
+        trace_memory:
+        graph_expansion_mode:
+        export_diagrams:
+        renderer:
+        n_jobs:
+        compare_modes:
+
+    Returns:
+
+    '''
+
+    benchmark_results = {'graphit_version': __version__,
+                         'python_version': platform.python_version(),
+                         'platform': platform.platform(),
+                         'machine': platform.machine(),
+                         'processor': platform.processor(),
+                         'cpu_count': os.cpu_count(),
+                         'stages': [],
+                         'accuracy': [],
+                         'parsing_modes': []}
+
+    run_kwargs = dict(graph_expansion_mode=graph_expansion_mode, export_diagrams=export_diagrams, renderer=renderer,
+                      n_jobs=n_jobs)
+
+    for project_size in project_sizes:
+        with tempfile.TemporaryDirectory() as temp_directory:
+            project_directory = os.path.join(temp_directory, 'project')
+            output_directory = os.path.join(temp_directory, 'output')
+            parse_cache_directory = os.path.join(temp_directory, 'cache')
+            os.makedirs(output_directory)
+
+            synthetic_project = create_synthetic_project(project_directory, **BENCHMARK_PROJECT_SIZES[project_size])
+            calibration_time_s = measure_calibration_time()
+
+            graphit_runs = [run_profiled_graphit(project_directory, output_directory, parse_cache_directory, **run_kwargs)
+                            for _ in range(n_repeats)]
+
+            if trace_memory:
+                memory_stage_measurements = run_profiled_graphit(project_directory, output_directory, parse_cache_directory,
+                                                                 trace_memory=True, **run_kwargs)['stage_measurements']
+
+            if compare_modes:
+                benchmark_results['parsing_modes'].extend([{'size': project_size, **parsing_mode_result}
+                                                           for parsing_mode_result in compare_parsing_modes(project_directory,
+                                                                                                            output_directory,
+                                                                                                            parse_cache_directory,
+                                                                                                            synthetic_project['function_calls'],
+                                                                                                            n_repeats=n_repeats)])
+
+        stage_names = list(graphit_runs[0]['stage_measurements'])
+
+        for stage_name in stage_names:
+            stage_result = {'size': project_size,
+                            'n_modules': synthetic_project['n_modules'],
+                            'n_functions': synthetic_project['n_functions'],
+                            'n_calls': synthetic_project['n_calls'],
+                            'stage': stage_name,
+                            'wall_time_s': min([graphit_run['stage_measurements'][stage_name]['wall_time_s'] for graphit_run in graphit_runs]),
+                            'cpu_time_s': min([graphit_run['stage_measurements'][stage_name]['cpu_time_s'] for graphit_run in graphit_runs]),
+                            'calibration_time_s': calibration_time_s}
+
+            if trace_memory:
+                stage_result['peak_memory_mb'] = memory_stage_measurements[stage_name]['peak_memory_mb']
+
+            benchmark_results['stages'].append(stage_result)
+
+        benchmark_results['accuracy'].append({'size': project_size,
+                                              'n_graph_roots': graphit_runs[0]['n_graph_roots'],
+                                              'n_graph_records': graphit_runs[0]['n_graph_records'],
+                                              **resolution_accuracy(graphit_runs[0]['function_calls'],
+                                                                    synthetic_project['function_calls'])})
+
+        logger.info(f'Benchmarked {project_size} project ({synthetic_project["n_functions"]} functions) in '
+                    f'{sum([stage_result["wall_time_s"] for stage_result in benchmark_results["stages"][-len(stage_names):]]):.2f}s.')
+
+    return benchmark_results
+
+
+def compare_benchmark_results(benchmark_results: Dict,
+                              baseline_results: Dict,
+                              tolerance: float = BENCHMARK_REGRESSION_TOLERANCE) -> List[str]:
+    '''
+    Compares the specified benchmark results with the specified baseline results, as returned by run_pipeline_benchmark.
+    Returns a description of every regression, i.e. of every stage that got slower or uses more memory than allowed by
+    the tolerance (see BENCHMARK_REGRESSION_MIN_TIME_DELTA_S and BENCHMARK_REGRESSION_MIN_MEMORY_DELTA_MB), and of every
+    drop in resolution accuracy of more than BENCHMARK_REGRESSION_MAX_ACCURACY_DROP. Sizes and stages that are not part
+    of both results are skipped.
+
+    The baseline timings are scaled by the ratio of the calibration times of both results before comparing them, so
+    that a baseline recorded on a faster or slower machine is compared as if it had been recorded on this machine. The
+    timings of stages without a calibration time in either result are not compared, only their memory.
+
+    Args:
+        benchmark_results:
+        baseline_results:
+        tolerance:
+
+    Returns:
+
+    '''
+
+    regressions = []
+
+    baseline_stage_results = dict([((stage_result['size'], stage_result['stage']), stage_result) for stage_result in baseline_results['stages']])
+
+    for stage_result in benchmark_results['stages']:
+        baseline_stage_result = baseline_stage_results.get((stage_result['size'], stage_result['stage']))
+
+        if baseline_stage_result is None:
+            continue
+
+        for metric_name, min_delta in (('wall_time_s', BENCHMARK_REGRESSION_MIN_TIME_DELTA_S),
+                                       ('peak_memory_mb', BENCHMARK_REGRESSION_MIN_MEMORY_DELTA_MB)):
+            if metric_name not in stage_result or metric_name not in baseline_stage_result:
+                continue
+
+            value, baseline_value = stage_result[metric_name], baseline_stage_result[metric_name]
+
+            if metric_name == 'wall_time_s':
+                if 'calibration_time_s' not in stage_result or 'calibration_time_s' not in baseline_stage_result:
+                    continue
+
+                baseline_value *= stage_result['calibration_time_s'] / baseline_stage_result['calibration_time_s']
+
+            if value > baseline_value * (1 + tolerance) and value - baseline_value > min_delta:
+                regressions.append(f'{stage_result["stage"]} ({stage_result["size"]}): {metric_name} regressed from '
+                                   f'{baseline_value:.3f} to {value:.3f}.')
+
+    baseline_accuracy_results = dict([(accuracy_result['size'], accuracy_result) for accuracy_result in baseline_results['accuracy']])
+
+    for accuracy_result in benchmark_results['accuracy']:
+        baseline_accuracy_result = baseline_accuracy_results.get(accuracy_result['size'])
+
+        if baseline_accuracy_result is None:
+            continue
+
+        for metric_name in ('precision', 'recall'):
+            if accuracy_result[metric_name] < baseline_accuracy_result[metric_name] - BENCHMARK_REGRESSION_MAX_ACCURACY_DROP:
+                regressions.append(f'resolution ({accuracy_result["size"]}): {metric_name} regressed from '
+                                   f'{baseline_accuracy_result[metric_name]:.3f} to {accuracy_result[metric_name]:.3f}.')
+
+    return regressions
+
+
+def main():
+
+    parser = ArgumentParser('Benchmark all stages of the graphit pipeline on synthetic projects of growing size')
+    parser.add_argument('--sizes',
+                        dest='project_sizes',
+                        nargs='+',
+                        choices=list(BENCHMARK_PROJECT_SIZES),
+                        default=['small', 'medium'])
+    parser.add_argument('--repeats',
+                        dest='n_repeats',
+                        type=int,
+                        default=1)
+    parser.add_argument('--no-memory',
+                        dest='trace_memory',
+                        help='Skip the memory profiling run.',
+                        action='store_false')
+    parser.add_argument('--graph-expansion',
+                        dest='graph_expansion_mode',
+                        choices=GRAPH_EXPANSION_MODES,
+                        default=GRAPH_EXPANSION_MODE_MEMOIZED)
+    parser.add_argument('--no-diagrams',
+                        dest='export_diagrams',
+                        help='Skip plotting the flow chart diagrams of the graph roots.',
+                        action='store_false')
+    parser.add_argument('--renderer',
+                        dest='renderer',
+                        choices=FLOW_CHART_RENDERERS,
+                        default=FLOW_CHART_RENDERER_SVG)
+    parser.add_argument('--jobs',
+                        dest='n_jobs',
+                        type=int,
+                        default=1)
+    parser.add_argument('--no-mode-comparison',
+                        dest='compare_modes',
+                        help='Skip the comparison of the speed and accuracy of the parsing modes.',
+                        action='store_false')
+    parser.add_argument('--output',
+                        dest='output_file_path',
+                        help='Write the benchmark results to this json file, e.g. to use them as the baseline of '
+                             'later runs.',
+                        type=str,
+                        default=None)
+    parser.add_argument('--baseline',
+                        dest='baseline_file_path',
+                        help='Compare the benchmark results with the baseline results in this json file, and exit '
+                             'with a non-zero status if any stage regressed. Pass \'committed\' to compare with the '
+                             f'baseline results committed to the repository, {os.path.basename(BENCHMARK_BASELINE_FILE_PATH)}.',
+                        type=str,
+                        default=None)
+    parser.add_argument('--tolerance',
+                        dest='tolerance',
+                        help='Set the relative slow down / memory increase over the baseline that is tolerated.',
+                        type=float,
+                        default=BENCHMARK_REGRESSION_TOLERANCE)
+
+    command_line_args = parser.parse_args()
+
+    benchmark_results = run_pipeline_benchmark(project_sizes=command_line_args.project_sizes,
+                                               n_repeats=command_line_args.n_repeats,
+                                               trace_memory=command_line_args.trace_memory,
+                                               graph_expansion_mode=command_line_args.graph_expansion_mode,
+                                               export_diagrams=command_line_args.export_diagrams,
+                                               renderer=command_line_args.renderer,
+                                               n_jobs=command_line_args.n_jobs,
+                                               compare_modes=command_line_args.compare_modes)
+
+    print(pd.DataFrame(benchmark_results['stages']).to_string(index=False))
+    print(pd.DataFrame(benchmark_results['accuracy']).to_string(index=False))
+
+    if benchmark_results['parsing_modes']:
+        print(pd.DataFrame(benchmark_results['parsing_modes']).to_string(index=False))
+
+    if command_line_args.output_file_path is not None:
+        with open(command_line_args.output_file_path, 'w') as f:
+            json.dump(benchmark_results, f, indent=2)
+
+    if command_line_args.baseline_file_path is not None:
+        if command_line_args.baseline_file_path == 'committed':
+            command_line_args.baseline_file_path = BENCHMARK_BASELINE_FILE_PATH
+
+        with open(command_line_args.baseline_file_path, 'r') as f:
+            baseline_results = json.load(f)
+
+        if baseline_results.get('platform') != benchmark_results['platform']:
+            logger.info(f'The baseline was recorded on another machine ({baseline_results.get("platform")}), its timings are '
+                        f'compared relative to the calibration times.')
+
+        regressions = compare_benchmark_results(benchmark_results, baseline_results,
+                                                tolerance=command_line_args.tolerance)
+
+        for regression in regressions:
+            logger.error(f'Benchmark regression: {regression}')
+
+        if regressions:
+            sys.exit(1)
+
+        logger.info('No benchmark regressions compared to the baseline.')
+
+
+if __name__ == '__main__':
+    main()
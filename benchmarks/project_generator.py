@@ -0,0 +1,179 @@
+import os
+import random
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Dict
+
+# handles that are (re)used by functions in many modules, to simulate the handle collisions of real projects
+COLLIDING_FUNCTION_HANDLES = ['run', 'main', 'load', 'save', 'process', 'handle', 'update', 'validate', 'build', 'parse']
+
+MODULES_PER_PACKAGE = 10
+
+
+def create_synthetic_project(project_directory: Path,
+                             n_modules: int = 20,
+                             n_functions_per_module: int = 10,
+                             fan_out: int = 3,
+                             call_depth: int = 5,
+                             recursion_rate: float = 0.05,
+                             handle_collision_rate: float = 0.2,
+                             seed: int = 0) -> Dict:
+    '''
+    Creates a synthetic python project in the specified directory, with packages of MODULES_PER_PACKAGE modules each,
+    and n_functions_per_module module level functions in each module. The functions are spread evenly over call_depth
+    levels, and each function calls fan_out randomly chosen functions of the next level, either in the same module (by
+    name) or in another module (via an `import ... as ...` alias). On top of that,
+    - a recursion_rate share of the functions also call a function of their own or a previous level, closing a cycle
+    - a handle_collision_rate share of the functions get one of the COLLIDING_FUNCTION_HANDLES instead of a unique handle
+    - every function also makes a few calls to builtins, which must not be resolved to project functions
+
+    The project only depends on the specified arguments, including the random seed.
+
+    Returns the project's ground truth, i.e. the number of modules, functions and calls, and the calls of each function
+    as qualified handles, e.g. 'package_0.module_1.run' -> ['package_0.module_1.function_3', 'package_2.module_0.load'].
+
+    Args:
+        project_directory:
+        n_modules:
+        n_functions_per_module:
+        fan_out:
+        call_depth:
+        recursion_rate:
+        handle_collision_rate:
+        seed:
+
+    Returns:
+
+    '''
+
+    random_generator = random.Random(seed)
+
+    module_import_paths = [f'package_{module_index // MODULES_PER_PACKAGE}.module_{module_index % MODULES_PER_PACKAGE}'
+                           for module_index in range(n_modules)]
+
+    # assign handles and call levels to all functions
+    module_function_handles = []
+    function_levels = {}
+
+    for module_import_path in module_import_paths:
+        function_handles = []
+
+        for function_index in range(n_functions_per_module):
+            colliding_function_handles = [colliding_function_handle for colliding_function_handle in COLLIDING_FUNCTION_HANDLES
+                                          if colliding_function_handle not in function_handles]
+
+            if colliding_function_handles and random_generator.random() < handle_collision_rate:
+                function_handle = random_generator.choice(colliding_function_handles)
+            else:
+                function_handle = f'function_{function_index}'
+
+            function_handles.append(function_handle)
+            function_levels[f'{module_import_path}.{function_handle}'] = function_index * call_depth // n_functions_per_module
+
+        module_function_handles.append(function_handles)
+
+    functions_by_level = {}
+
+    for qualified_function_handle, function_level in function_levels.items():
+        functions_by_level.setdefault(function_level, []).append(qualified_function_handle)
+
+    # create the calls of all functions
+    function_calls = {}
+
+    for qualified_function_handle, function_level in function_levels.items():
+        called_functions = []
+
+        if function_level + 1 in functions_by_level:
+            called_functions.extend([random_generator.choice(functions_by_level[function_level + 1]) for _ in range(fan_out)])
+
+        if random_generator.random() < recursion_rate:
+            called_functions.append(random_generator.choice(functions_by_level[random_generator.randint(0, function_level)]))
+
+        function_calls[qualified_function_handle] = called_functions
+
+    # write the project's modules
+    for module_import_path, function_handles in zip(module_import_paths, module_function_handles):
+        module_file_path = os.path.join(project_directory, *module_import_path.split('.')) + '.py'
+        os.makedirs(os.path.dirname(module_file_path), exist_ok=True)
+
+        package_init_file_path = os.path.join(os.path.dirname(module_file_path), '__init__.py')
+
+        if not os.path.exists(package_init_file_path):
+            with open(package_init_file_path, 'w') as f:
+                f.write('')
+
+        imported_module_import_paths = sorted(set([called_function.rsplit('.', 1)[0]
+                                                   for function_handle in function_handles
+                                                   for called_function in function_calls[f'{module_import_path}.{function_handle}']
+                                                   if called_function.rsplit('.', 1)[0] != module_import_path]))
+
+        module_source_lines = [f'import {imported_module_import_path} as {imported_module_import_path.replace(".", "_")}'
+                               for imported_module_import_path in imported_module_import_paths] + ['', '']
+
+        for function_handle in function_handles:
+            module_source_lines.append(f'def {function_handle}(x):')
+            module_source_lines.append('    y = len(str(x))')
+
+            for called_function in function_calls[f'{module_import_path}.{function_handle}']:
+                called_module_import_path, called_function_handle = called_function.rsplit('.', 1)
+
+                if called_module_import_path == module_import_path:
+                    module_source_lines.append(f'    y += {called_function_handle}(x)')
+                else:
+                    module_source_lines.append(f'    y += {called_module_import_path.replace(".", "_")}.{called_function_handle}(x)')
+
+            module_source_lines.extend(['    print(y)', '    return y', '', ''])
+
+        with open(module_file_path, 'w') as f:
+            f.write('\n'.join(module_source_lines))
+
+    return {'n_modules': n_modules,
+            'n_functions': len(function_calls),
+            'n_calls': sum([len(called_functions) for called_functions in function_calls.values()]),
+            'function_calls': function_calls}
+
+
+def main():
+
+    parser = ArgumentParser('Create a synthetic python project for benchmarking graphit')
+    parser.add_argument('project_directory',
+                        type=Path)
+    parser.add_argument('--modules',
+                        dest='n_modules',
+                        type=int,
+                        default=20)
+    parser.add_argument('--functions-per-module',
+                        dest='n_functions_per_module',
+                        type=int,
+                        default=10)
+    parser.add_argument('--fan-out',
+                        dest='fan_out',
+                        type=int,
+                        default=3)
+    parser.add_argument('--call-depth',
+                        dest='call_depth',
+                        type=int,
+                        default=5)
+    parser.add_argument('--recursion-rate',
+                        dest='recursion_rate',
+                        type=float,
+                        default=0.05)
+    parser.add_argument('--handle-collision-rate',
+                        dest='handle_collision_rate',
+                        type=float,
+                        default=0.2)
+    parser.add_argument('--seed',
+                        dest='seed',
+                        type=int,
+                        default=0)
+
+    command_line_args = vars(parser.parse_args())
+
+    synthetic_project = create_synthetic_project(**command_line_args)
+
+    print(f'Created {synthetic_project["n_modules"]} modules with {synthetic_project["n_functions"]} functions and '
+          f'{synthetic_project["n_calls"]} calls in {command_line_args["project_directory"]}.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import time
+from argparse import ArgumentParser
+from typing import List, Dict
+
+import pandas as pd
+
+from graphit.settings import logger, FLOW_CHART_RENDERERS, FLOW_CHART_RENDERER_SCHEMDRAW, FLOW_CHART_RENDERER_SVG
+from graphit.utils.graph_helpers import plot_project_graph
+from graphit.utils.meta_data_helpers import create_graph_meta_data
+from graphit.utils.svg_helpers import render_svg_flow_chart
+
+
+def create_synthetic_graph_meta_data(n_rows: int,
+                                     fan_out: int = 4) -> pd.DataFrame:
+    '''
+    Creates the graph meta data of a synthetic root function whose dependency tree has exactly n_rows nodes, with each
+    function calling up to fan_out other functions, spread over a handful of modules.
+
+    Args:
+        n_rows:
+        fan_out:
+
+    Returns:
+
+    '''
+
+    function_ids = [f'function_{i}' for i in range(n_rows)]
+    n_modules = 8
+
+    module_meta_data = pd.DataFrame([(f'module_{i}', f'module_{i}.py', f'package.module_{i}', '.') for i in range(n_modules)],
+                                    columns=['unique_reference_id', 'file_path', 'import_path', 'reference_directory'])
+
+    function_meta_data = pd.DataFrame([(function_id, f'handle_{i}', f'module_{i % n_modules}') for i, function_id in enumerate(function_ids)],
+                                      columns=['unique_reference_id', 'function_handle', 'source_module_reference_id'])
+
+    # function i calls functions i * fan_out + 1, ..., i * fan_out + fan_out, i.e. the call graph is a complete tree
+    function_dependency_meta_data = pd.DataFrame(
+        [(function_ids[i], function_ids[j], j - i * fan_out - 1) for j in range(1, n_rows) for i in [(j - 1) // fan_out]],
+        columns=['unique_reference_id', 'function_dependency_reference_id', 'function_dependency_index'])
+
+    return create_graph_meta_data(root_function_reference_id=function_ids[0],
+                                  module_meta_data=module_meta_data,
+                                  function_meta_data=function_meta_data,
+                                  function_dependency_meta_data=function_dependency_meta_data)
+
+
+def run_rendering_benchmark(graph_sizes: List[int],
+                            n_repeats: int = 1,
+                            renderer: str = FLOW_CHART_RENDERER_SCHEMDRAW) -> List[Dict]:
+    '''
+    Times plot_project_graph and the conversion of the resulting drawing into svg image data on synthetic graph meta
+    data of the specified sizes. If rendering scales linearly, the render time per row stays roughly constant across
+    sizes.
+
+    Args:
+        graph_sizes:
+        n_repeats: The best of n_repeats timings is reported for each size.
+        renderer:
+
+    Returns:
+
+    '''
+
+    benchmark_results = []
+
+    for graph_size in graph_sizes:
+        graph_meta_data = create_synthetic_graph_meta_data(n_rows=graph_size)
+
+        render_times = []
+
+        for _ in range(n_repeats):
+            render_start = time.perf_counter()
+
+            if renderer == FLOW_CHART_RENDERER_SVG:
+                with tempfile.TemporaryDirectory() as svg_directory:
+                    render_svg_flow_chart(graph_meta_data=graph_meta_data,
+                                          svg_file_path=os.path.join(svg_directory, 'diagram.svg'))
+            else:
+                plot_project_graph(graph_meta_data=graph_meta_data).get_imagedata('svg')
+
+            render_times.append(time.perf_counter() - render_start)
+
+        benchmark_results.append({'n_rows': graph_size,
+                                  'render_time_s': min(render_times),
+                                  'render_time_per_row_ms': 1000 * min(render_times) / graph_size})
+
+        logger.info(f'Rendered {graph_size} rows in {min(render_times):.3f}s '
+                    f'({benchmark_results[-1]["render_time_per_row_ms"]:.3f}ms per row).')
+
+    return benchmark_results
+
+
+def main():
+
+    parser = ArgumentParser('Benchmark the rendering time of the graphit flow chart for growing graph sizes')
+    parser.add_argument('--graph-sizes',
+                        dest='graph_sizes',
+                        nargs='+',
+                        type=int,
+                        default=[250, 500, 1000, 2000, 4000])
+    parser.add_argument('--repeats',
+                        dest='n_repeats',
+                        type=int,
+                        default=1)
+    parser.add_argument('--renderer',
+                        dest='renderer',
+                        choices=FLOW_CHART_RENDERERS,
+                        default=FLOW_CHART_RENDERER_SCHEMDRAW)
+
+    command_line_args = parser.parse_args()
+
+    benchmark_results = run_rendering_benchmark(graph_sizes=command_line_args.graph_sizes,
+                                                n_repeats=command_line_args.n_repeats,
+                                                renderer=command_line_args.renderer)
+
+    print(pd.DataFrame(benchmark_results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
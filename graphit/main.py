@@ -1,4 +1,5 @@
-from graphit.utils.run_helpers import parse_graphit_arguments, run_configured_graphit
+from graphit.utils.run_helpers import parse_graphit_arguments, run_configured_graphit, watch_configured_graphit, \
+    serve_configured_graphit, shard_configured_graphit
 
 
 def run_graphit():
@@ -6,7 +7,14 @@ def run_graphit():
     # get all arguments required for running graphit on the given project
     command_line_args = parse_graphit_arguments()
 
-    run_configured_graphit(command_line_args)
+    if command_line_args.watch:
+        watch_configured_graphit(command_line_args)
+    elif command_line_args.serve:
+        serve_configured_graphit(command_line_args)
+    elif command_line_args.shard is not None:
+        shard_configured_graphit(command_line_args)
+    else:
+        run_configured_graphit(command_line_args)
 
     return
 
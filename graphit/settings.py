@@ -1,16 +1,90 @@
 import logging
+import os
+import re
 from logging import DEBUG, INFO, WARNING, ERROR
 
+# module discovery settings
+PYTHON_MODULE_FILE_REGEX = re.compile('[a-zA-Z0-9_]{1,50}\\.py')
+DEFAULT_EXCLUDE_PATTERNS = ['.git', '__pycache__', 'node_modules']
+
 # parsing settings
 TAB_INDENTATION_LEVEL = 4
-GENERIC_FUNCTION_DEFINITION_PATTERN = '(^[ \t\n]{0,20}def [a-zA-Z0-9_]{1,50}\()'
+GENERIC_FUNCTION_DEFINITION_PATTERN = r'(^[ \t\n]{0,20}(?:async )?def [a-zA-Z0-9_]{1,50}\()'
+GENERIC_CLASS_DEFINITION_PATTERN = '(^[ \t\n]{0,20}class [a-zA-Z0-9_]{1,50}[(:])'
 SPECIFIC_FUNCTION_DEFINITION_PATTERN_STUMP = '(^[ \t\n]{0,20}def '
-SPECIFIC_FUNCTION_DEFINITION_PATTERN_TEMPLATE = '{function_handle}\()'
+SPECIFIC_FUNCTION_DEFINITION_PATTERN_TEMPLATE = r'{function_handle}\()'
 SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_1 = '={function_handle}('
 SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_2 = ' {function_handle}('
 SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_3 = '[{function_handle}('
 SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_4 = '({function_handle}('
 SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_5 = '  {function_handle}('
+PARSING_MODE_AST = 'ast'
+PARSING_MODE_FAST = 'fast'
+PARSING_MODES = [PARSING_MODE_AST, PARSING_MODE_FAST]
+
+# fast scan settings
+FAST_SCAN_MMAP_MIN_FILE_SIZE_BYTES = 1024 ** 2
+
+# call resolution settings
+SYMBOL_RESOLUTION_MAX_IMPORT_HOPS = 5
+SYMBOL_RESOLUTION_METHOD_QUALIFIERS = ('self', 'cls')
+
+# parallel parsing settings
+PARSING_CHUNKS_PER_JOB = 4
+
+# streaming pipeline settings
+STREAMING_MODULES_IN_FLIGHT_PER_WORKER = 4
+
+# parse cache settings
+PARSE_CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'graphit')
+PARSE_CACHE_SIZE_LIMIT_MB = 512
+PARSE_CACHE_FORMAT_VERSION = 2
+
+# watch mode settings
+WATCH_POLL_INTERVAL_SECONDS = 0.5
+
+# query server settings
+SERVE_HOST = '127.0.0.1'
+SERVE_PORT = 8765
+SERVE_RESPONSE_CACHE_SIZE_LIMIT_MB = 64
+SERVE_SUBTREE_MAX_NODES = 10000
+
+# profiling settings
+PROFILE_REPORT_FILE_NAME = 'graphit_profile_report.json'
+
+# graph settings
+GRAPH_EXPANSION_MODE_FULL = 'full'
+GRAPH_EXPANSION_MODE_MEMOIZED = 'memoized'
+GRAPH_EXPANSION_MODES = [GRAPH_EXPANSION_MODE_FULL, GRAPH_EXPANSION_MODE_MEMOIZED]
+GRAPH_NODE_TYPE_FUNCTION = 'function'
+GRAPH_NODE_TYPE_CYCLE = 'cycle'
+GRAPH_NODE_TYPE_REFERENCE = 'reference'
+GRAPH_NODE_TYPE_TRUNCATED = 'truncated'
+GRAPH_NODE_COLUMNS = ['target_function_node_type', 'target_function_reference_graph_index']
+GRAPH_DIRECTION_CALLEES = 'callees'
+GRAPH_DIRECTION_CALLERS = 'callers'
+GRAPH_DIRECTIONS = [GRAPH_DIRECTION_CALLEES, GRAPH_DIRECTION_CALLERS]
+GRAPH_ROOT_TASKS_IN_FLIGHT_PER_JOB = 2
+
+# sharding settings
+SHARD_ARTIFACT_FORMAT_VERSION = 2
+
+# graph diff settings
+GRAPH_DIFF_REPORT_FILE_NAME = 'graphit_graph_diff.json'
+GRAPH_EXPORT_SETTINGS_FILE_NAME = 'graphit_graph_export_settings.json'
+
+# graph store settings
+GRAPH_STORE_FILE_NAME = 'graphit_graph_store.sqlite'
+
+# export settings
+EXPORT_FORMAT_CSV = 'csv'
+EXPORT_FORMAT_PARQUET = 'parquet'
+EXPORT_FORMAT_ARROW = 'arrow'
+EXPORT_FORMATS = [EXPORT_FORMAT_CSV, EXPORT_FORMAT_PARQUET, EXPORT_FORMAT_ARROW]
+EXPORT_FORMAT_FILE_EXTENSIONS = {EXPORT_FORMAT_CSV: 'csv', EXPORT_FORMAT_PARQUET: 'parquet', EXPORT_FORMAT_ARROW: 'arrow'}
+EXPORT_COMPRESSION = 'zstd'
+EXPORT_DICTIONARY_ENCODED_COLUMN_KEYWORDS = ('_id', 'handle', 'path', 'reference_directory')
+GRAPH_META_DATA_DATASET_ROWS_PER_PART = 500000
 
 # flow chart visuals & layout
 FLOW_CHART_FONT_SIZE = 7
@@ -45,6 +119,23 @@ FLOW_CHART_LINE_WIDTH=1
 
 FLOW_CHART_SIZE_Y = 250
 
+# flow chart renderers. the svg renderer streams the flow chart straight to the svg file, see graphit.utils.svg_helpers
+FLOW_CHART_RENDERER_SCHEMDRAW = 'schemdraw'
+FLOW_CHART_RENDERER_SVG = 'svg'
+FLOW_CHART_RENDERERS = [FLOW_CHART_RENDERER_SCHEMDRAW, FLOW_CHART_RENDERER_SVG]
+FLOW_CHART_ROUND_BOX_CORNER_RADIUS = 0.3
+FLOW_CHART_ARROW_HEAD_LENGTH = 0.2
+FLOW_CHART_ARROW_HEAD_WIDTH = 0.15
+FLOW_CHART_FONT_FAMILY = 'sans'
+FLOW_CHART_SVG_POINTS_PER_UNIT = 36 # same scale as schemdraw's svg backend
+FLOW_CHART_SVG_MARGIN = 0.5
+
+# flow chart paging. graphs with more rows are split into pages of at most this many rows each, linked by continuation
+# markers and an index page. with at most 200 rows of FLOW_CHART_Y_STEP_STANDARD each, every page fits into
+# FLOW_CHART_SIZE_Y
+FLOW_CHART_MAX_ROWS_PER_PAGE = 200
+FLOW_CHART_CONTINUATION_MARKER_LENGTH = 0.6
+
 # logging
 LOG_LEVEL = INFO
 logger = logging.getLogger()
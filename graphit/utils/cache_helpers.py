@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import platform
+import shutil
+from pathlib import Path
+from typing import Dict, Optional
+
+from graphit import __version__
+from graphit.settings import logger, PARSE_CACHE_FORMAT_VERSION
+
+PARSE_CACHE_ENTRY_DIRECTORY = 'entries'
+PARSE_CACHE_INDEX_DIRECTORY = 'index'
+
+
+def prepare_parse_cache_directory(parse_cache_directory: Path,
+                                  rebuild: bool = False) -> Path:
+    '''
+    Utility function that creates the parse cache directory and its subdirectories, where needed. If rebuild is set,
+    all existing cache entries are removed first.
+
+    Args:
+        parse_cache_directory:
+        rebuild:
+
+    Returns:
+
+    '''
+
+    if rebuild and os.path.isdir(parse_cache_directory):
+        shutil.rmtree(parse_cache_directory)
+        logger.info(f'Removed existing parse cache at {parse_cache_directory}.')
+
+    os.makedirs(os.path.join(parse_cache_directory, PARSE_CACHE_ENTRY_DIRECTORY), exist_ok=True)
+    os.makedirs(os.path.join(parse_cache_directory, PARSE_CACHE_INDEX_DIRECTORY), exist_ok=True)
+
+    return parse_cache_directory
+
+
+def get_parse_cache_version() -> str:
+    '''
+    Returns the versions the parse results depend on apart from the module's content, i.e. the graphit version, the
+    python version and the cache format version.
+
+    Returns:
+
+    '''
+
+    return f'{__version__}|{platform.python_version()}|{PARSE_CACHE_FORMAT_VERSION}'
+
+
+def get_parse_cache_key(module_source: bytes) -> str:
+    '''
+    Creates the cache key of a module's parse results from the module's content and the parse cache version (see
+    get_parse_cache_version). Any change in either of these invalidates the cache entry.
+
+    Args:
+        module_source:
+
+    Returns:
+
+    '''
+
+    key_hash = hashlib.sha256(module_source)
+    key_hash.update(f'|{get_parse_cache_version()}'.encode())
+
+    return key_hash.hexdigest()
+
+
+def get_parse_cache_entry_path(parse_cache_directory: Path,
+                               parse_cache_key: str) -> str:
+
+    return os.path.join(parse_cache_directory, PARSE_CACHE_ENTRY_DIRECTORY, f'{parse_cache_key}.json')
+
+
+def get_parse_cache_index_path(parse_cache_directory: Path,
+                               module_file_path: Path) -> str:
+
+    module_file_path_hash = hashlib.sha256(os.path.abspath(module_file_path).encode()).hexdigest()
+
+    return os.path.join(parse_cache_directory, PARSE_CACHE_INDEX_DIRECTORY, f'{module_file_path_hash}.json')
+
+
+def write_json_atomically(file_path: str,
+                          content) -> None:
+    '''
+    Writes the specified content to a temporary file first and then moves it into place, so that concurrent readers
+    (e.g. other worker processes) never see a partially written file.
+
+    Args:
+        file_path:
+        content:
+
+    Returns:
+
+    '''
+
+    temp_file_path = f'{file_path}.{os.getpid()}.tmp'
+
+    with open(temp_file_path, 'w') as f:
+        json.dump(content, f)
+
+    os.replace(temp_file_path, file_path)
+
+
+def read_json(file_path: str):
+
+    try:
+        with open(file_path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def get_module_file_stat(module_file_path: Path) -> Dict:
+
+    module_file_stat = os.stat(module_file_path)
+
+    return {'mtime_ns': module_file_stat.st_mtime_ns, 'size': module_file_stat.st_size}
+
+
+def load_cached_parse_results_by_stat(parse_cache_directory: Path,
+                                      module_file_path: Path) -> Optional[Dict]:
+    '''
+    Cheap pre-check: if the module file's modification time and size match the ones recorded when the module was
+    last cached, and the module was cached with the current parse cache version (see get_parse_cache_version), the
+    cached parse results are returned without reading the module file. Returns None otherwise.
+    A hit refreshes the index record's modification time, just like that of the cache entry.
+
+    Args:
+        parse_cache_directory:
+        module_file_path:
+
+    Returns:
+
+    '''
+
+    parse_cache_index_path = get_parse_cache_index_path(parse_cache_directory, module_file_path)
+    parse_cache_index_record = read_json(parse_cache_index_path)
+
+    if parse_cache_index_record is None:
+        return None
+
+    # index records written by other graphit or python versions point at entries of those versions
+    if parse_cache_index_record.get('cache_version') != get_parse_cache_version():
+        return None
+
+    if get_module_file_stat(module_file_path) != parse_cache_index_record['stat']:
+        return None
+
+    parse_results = load_cached_parse_results(parse_cache_directory, parse_cache_index_record['cache_key'])
+
+    if parse_results is not None:
+        try:
+            os.utime(parse_cache_index_path)
+        except FileNotFoundError:
+            pass
+
+    return parse_results
+
+
+def load_cached_parse_results(parse_cache_directory: Path,
+                              parse_cache_key: str) -> Optional[Dict]:
+    '''
+    Returns the cached parse results, i.e. the definition payloads and the symbol table of a module, stored under the
+    specified cache key, or None if there is no such entry.
+    A hit refreshes the entry's modification time, which is used as the recency marker for LRU eviction.
+
+    Args:
+        parse_cache_directory:
+        parse_cache_key:
+
+    Returns:
+
+    '''
+
+    parse_cache_entry_path = get_parse_cache_entry_path(parse_cache_directory, parse_cache_key)
+    parse_cache_entry = read_json(parse_cache_entry_path)
+
+    if parse_cache_entry is None:
+        return None
+
+    try:
+        os.utime(parse_cache_entry_path)
+    except FileNotFoundError:
+        pass
+
+    return parse_cache_entry
+
+
+def record_parse_cache_index(parse_cache_directory: Path,
+                             module_file_path: Path,
+                             module_file_stat: Dict,
+                             parse_cache_key: str) -> None:
+
+    write_json_atomically(get_parse_cache_index_path(parse_cache_directory, module_file_path),
+                          {'stat': module_file_stat, 'cache_key': parse_cache_key, 'cache_version': get_parse_cache_version()})
+
+
+def write_cached_parse_results(parse_cache_directory: Path,
+                               parse_cache_key: str,
+                               parse_results: Dict) -> None:
+
+    write_json_atomically(get_parse_cache_entry_path(parse_cache_directory, parse_cache_key), parse_results)
+
+
+def evict_parse_cache_entries(parse_cache_directory: Path,
+                              size_limit_mb: float) -> int:
+    '''
+    Removes the least recently used cache entries and index records until their total size is below the specified size
+    limit. Index records of evicted entries, or of modules that no longer exist, are no longer refreshed and therefore
+    evicted eventually as well. Entries already removed by another run evicting the same parse cache at the same time are
+    skipped. Returns the number of removed entries and index records.
+
+    Args:
+        parse_cache_directory:
+        size_limit_mb:
+
+    Returns:
+
+    '''
+
+    parse_cache_entries = []
+
+    for parse_cache_subdirectory in (PARSE_CACHE_ENTRY_DIRECTORY, PARSE_CACHE_INDEX_DIRECTORY):
+        for dir_entry in os.scandir(os.path.join(parse_cache_directory, parse_cache_subdirectory)):
+            if dir_entry.is_file() and dir_entry.name.endswith('.json'):
+                # the entry may have been evicted by another run sharing the parse cache in the meantime
+                try:
+                    dir_entry_stat = dir_entry.stat()
+                except FileNotFoundError:
+                    continue
+
+                parse_cache_entries.append((dir_entry_stat.st_mtime_ns, dir_entry_stat.st_size, dir_entry.path))
+
+    total_size = sum([parse_cache_entry[1] for parse_cache_entry in parse_cache_entries])
+    size_limit = size_limit_mb * 1024 * 1024
+
+    # least recently used first
+    parse_cache_entries.sort()
+
+    n_evicted_entries = 0
+
+    for _, parse_cache_entry_size, parse_cache_entry_path in parse_cache_entries:
+        if total_size <= size_limit:
+            break
+
+        total_size -= parse_cache_entry_size
+
+        try:
+            os.remove(parse_cache_entry_path)
+        except FileNotFoundError:
+            continue
+
+        n_evicted_entries += 1
+
+    if n_evicted_entries:
+        logger.info(f'Evicted {n_evicted_entries} entries and index records from the parse cache at {parse_cache_directory}.')
+
+    return n_evicted_entries
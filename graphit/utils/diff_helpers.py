@@ -0,0 +1,211 @@
+import glob
+import json
+import os
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Optional, Set, Tuple
+
+import pandas as pd
+
+from graphit.settings import logger, GRAPH_DIFF_REPORT_FILE_NAME, GRAPH_EXPORT_SETTINGS_FILE_NAME
+from graphit.utils.export_helpers import read_meta_data
+
+
+def read_baseline_meta_data(baseline_directory: Path) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    '''
+    Reads the module, function and function dependency meta data exported by a previous run to the specified output
+    directory, in any of the export formats. Raises a FileNotFoundError if any of them is missing.
+
+    Args:
+        baseline_directory:
+
+    Returns:
+
+    '''
+
+    baseline_meta_data = []
+
+    for meta_data_name in ('module_meta_data', 'function_meta_data', 'function_dependency_meta_data'):
+        meta_data_file_paths = glob.glob(os.path.join(glob.escape(str(baseline_directory)), f'graphit_{meta_data_name}.*'))
+
+        if not meta_data_file_paths:
+            raise FileNotFoundError(f'The baseline directory {baseline_directory} contains no {meta_data_name.replace("_", " ")}.')
+
+        baseline_meta_data.append(read_meta_data(meta_data_file_paths[0]))
+
+    return tuple(baseline_meta_data)
+
+
+def get_function_import_paths(module_meta_data: pd.DataFrame,
+                              function_meta_data: pd.DataFrame) -> Dict[str, str]:
+    '''
+    Returns the import path of each function, e.g. 'utils.helpers.load', like the graph meta data's
+    target_function_import_path column.
+
+    Args:
+        module_meta_data:
+        function_meta_data:
+
+    Returns:
+
+    '''
+
+    module_import_paths = dict(zip(module_meta_data['unique_reference_id'].tolist(), module_meta_data['import_path'].tolist()))
+
+    return dict([(function_id, f'{module_import_paths.get(module_id, "")}.{function_handle}')
+                 for function_id, function_handle, module_id in zip(function_meta_data['unique_reference_id'].tolist(),
+                                                                    function_meta_data['function_handle'].tolist(),
+                                                                    function_meta_data['source_module_reference_id'].tolist())])
+
+
+def get_function_dependency_lists(function_dependency_meta_data: pd.DataFrame) -> Dict[str, List[str]]:
+    '''
+    Returns the ordered list of the ids of the functions called by each function. Functions without dependencies are
+    not included.
+
+    Args:
+        function_dependency_meta_data:
+
+    Returns:
+
+    '''
+
+    function_dependency_lists = {}
+
+    for function_id, function_dependency_id, _ in sorted(zip(function_dependency_meta_data['unique_reference_id'].tolist(),
+                                                             function_dependency_meta_data['function_dependency_reference_id'].tolist(),
+                                                             function_dependency_meta_data['function_dependency_index'].tolist()),
+                                                         key=lambda function_dependency: function_dependency[2]):
+        function_dependency_lists.setdefault(function_id, []).append(function_dependency_id)
+
+    return function_dependency_lists
+
+
+def create_graph_diff(baseline_meta_data: Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame],
+                      meta_data: Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]) -> Tuple[Dict, Set[str]]:
+    '''
+    Compares the module, function and function dependency meta data of a baseline run with those of the current run.
+    Function ids are derived from the functions' import paths and therefore comparable across runs. Returns
+    - the diff report, listing the added and removed functions, the rewired functions (i.e. functions that call
+      different functions, or the same functions in a different order, than before) along with their added and removed
+      dependencies, and the totals of added and removed dependencies. Functions are listed by their import paths.
+    - the ids of all changed, i.e. added, removed and rewired, functions
+
+    Args:
+        baseline_meta_data: The module, function and function dependency meta data of the baseline run
+        meta_data: The module, function and function dependency meta data of the current run
+
+    Returns:
+
+    '''
+
+    baseline_function_import_paths = get_function_import_paths(*baseline_meta_data[:2])
+    function_import_paths = get_function_import_paths(*meta_data[:2])
+    all_function_import_paths = dict(baseline_function_import_paths, **function_import_paths)
+
+    baseline_function_dependency_lists = get_function_dependency_lists(baseline_meta_data[2])
+    function_dependency_lists = get_function_dependency_lists(meta_data[2])
+
+    added_function_ids = sorted(set(function_import_paths).difference(baseline_function_import_paths),
+                                key=lambda function_id: function_import_paths[function_id])
+    removed_function_ids = sorted(set(baseline_function_import_paths).difference(function_import_paths),
+                                  key=lambda function_id: baseline_function_import_paths[function_id])
+    rewired_function_ids = sorted([function_id for function_id in set(function_import_paths).intersection(baseline_function_import_paths)
+                                   if function_dependency_lists.get(function_id, []) != baseline_function_dependency_lists.get(function_id, [])],
+                                  key=lambda function_id: function_import_paths[function_id])
+
+    def get_import_paths(function_ids: List[str]) -> List[str]:
+        return [all_function_import_paths.get(function_id, function_id) for function_id in function_ids]
+
+    rewired_functions = []
+    n_added_dependencies, n_removed_dependencies = 0, 0
+
+    for function_id in sorted(set(function_dependency_lists).union(baseline_function_dependency_lists),
+                              key=lambda function_id: all_function_import_paths.get(function_id, function_id)):
+        function_dependency_counts = Counter(function_dependency_lists.get(function_id, []))
+        baseline_function_dependency_counts = Counter(baseline_function_dependency_lists.get(function_id, []))
+
+        n_added_dependencies += sum((function_dependency_counts - baseline_function_dependency_counts).values())
+        n_removed_dependencies += sum((baseline_function_dependency_counts - function_dependency_counts).values())
+
+        if function_id in rewired_function_ids:
+            rewired_functions.append({'function': all_function_import_paths[function_id],
+                                      'added_dependencies': get_import_paths(sorted((function_dependency_counts - baseline_function_dependency_counts).elements())),
+                                      'removed_dependencies': get_import_paths(sorted((baseline_function_dependency_counts - function_dependency_counts).elements()))})
+
+    graph_diff = {'n_added_functions': len(added_function_ids),
+                  'n_removed_functions': len(removed_function_ids),
+                  'n_rewired_functions': len(rewired_function_ids),
+                  'n_added_dependencies': n_added_dependencies,
+                  'n_removed_dependencies': n_removed_dependencies,
+                  'added_functions': get_import_paths(added_function_ids),
+                  'removed_functions': get_import_paths(removed_function_ids),
+                  'rewired_functions': rewired_functions}
+
+    return graph_diff, set(added_function_ids + removed_function_ids + rewired_function_ids)
+
+
+def export_graph_diff(graph_diff: Dict,
+                      output_directory: Path) -> str:
+    '''
+    Exports the specified diff report as json to the output directory, and returns its file path.
+
+    Args:
+        graph_diff:
+        output_directory:
+
+    Returns:
+
+    '''
+
+    graph_diff_file_path = os.path.join(output_directory, GRAPH_DIFF_REPORT_FILE_NAME)
+
+    with open(graph_diff_file_path, 'w') as f:
+        json.dump(graph_diff, f, indent=2)
+
+    logger.info(f'Exported graph diff to: {graph_diff_file_path} ({graph_diff["n_added_functions"]} added, '
+                f'{graph_diff["n_removed_functions"]} removed and {graph_diff["n_rewired_functions"]} rewired functions).')
+
+    return graph_diff_file_path
+
+
+def export_graph_export_settings(graph_export_settings: Dict,
+                                 output_directory: Path) -> str:
+    '''
+    Exports the settings the graph roots are exported with, e.g. the graph expansion mode, as json to the output
+    directory, and returns its file path. A later run using the output directory as its baseline only reuses the
+    graph root outputs if it exports them with the same settings.
+
+    Args:
+        graph_export_settings:
+        output_directory:
+
+    Returns:
+
+    '''
+
+    graph_export_settings_file_path = os.path.join(output_directory, GRAPH_EXPORT_SETTINGS_FILE_NAME)
+
+    with open(graph_export_settings_file_path, 'w') as f:
+        json.dump(graph_export_settings, f, indent=2)
+
+    return graph_export_settings_file_path
+
+
+def read_baseline_graph_export_settings(baseline_directory: Path) -> Optional[Dict]:
+    '''
+    Reads the settings the graph roots were exported with by a previous run to the specified output directory. Returns
+    None if the previous run did not export them.
+
+    Args:
+        baseline_directory:
+
+    Returns:
+
+    '''
+
+    try:
+        with open(os.path.join(baseline_directory, GRAPH_EXPORT_SETTINGS_FILE_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
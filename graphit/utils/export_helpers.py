@@ -0,0 +1,171 @@
+import os
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+
+from graphit.settings import logger, EXPORT_FORMAT_CSV, EXPORT_FORMAT_PARQUET, EXPORT_FORMAT_ARROW, \
+    EXPORT_FORMAT_FILE_EXTENSIONS, EXPORT_COMPRESSION, EXPORT_DICTIONARY_ENCODED_COLUMN_KEYWORDS
+
+
+def import_pyarrow():
+    '''
+    Imports pyarrow, which is only needed for the columnar export formats and therefore not a required dependency.
+
+    Returns:
+
+    '''
+
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError as e:
+        logger.error('The parquet and arrow export formats require the pyarrow package. Install it via '
+                     '`pip install pyarrow` or use the csv export format.')
+        raise e
+
+    return pyarrow
+
+
+def convert_meta_data_to_arrow_table(meta_data: pd.DataFrame):
+    '''
+    Converts the specified meta data table into a typed arrow table. All id, handle and path columns are dictionary
+    encoded, since they consist of comparatively few distinct, often long strings.
+
+    Args:
+        meta_data:
+
+    Returns:
+
+    '''
+
+    pyarrow = import_pyarrow()
+
+    arrow_columns = []
+
+    for column_name in meta_data.columns:
+        column = meta_data[column_name]
+
+        # e.g. the pathlib.Path type module file paths
+        if column.dtype == object:
+            column = column.astype(str)
+
+        arrow_column = pyarrow.array(column)
+
+        if pyarrow.types.is_string(arrow_column.type) or pyarrow.types.is_large_string(arrow_column.type):
+            if any([column_keyword in column_name for column_keyword in EXPORT_DICTIONARY_ENCODED_COLUMN_KEYWORDS]):
+                arrow_column = arrow_column.dictionary_encode()
+
+        arrow_columns.append(arrow_column)
+
+    return pyarrow.table(arrow_columns, names=list(meta_data.columns))
+
+
+def write_meta_data(meta_data: pd.DataFrame,
+                    file_path: str,
+                    export_format: str = EXPORT_FORMAT_CSV) -> None:
+
+    if export_format == EXPORT_FORMAT_CSV:
+        meta_data.to_csv(file_path, index=False)
+    elif export_format == EXPORT_FORMAT_PARQUET:
+        import_pyarrow().parquet.write_table(convert_meta_data_to_arrow_table(meta_data), file_path,
+                                             compression=EXPORT_COMPRESSION)
+    elif export_format == EXPORT_FORMAT_ARROW:
+        import_pyarrow().feather.write_feather(convert_meta_data_to_arrow_table(meta_data), file_path,
+                                               compression=EXPORT_COMPRESSION)
+    else:
+        raise ValueError(f'Unknown export format {export_format}.')
+
+
+def export_meta_data(meta_data: pd.DataFrame,
+                     output_directory: Path,
+                     meta_data_name: str,
+                     export_format: str = EXPORT_FORMAT_CSV) -> str:
+    '''
+    Exports the specified meta data table to the file graphit_{meta_data_name}.{csv,parquet,arrow} in the specified
+    output directory and returns the file path.
+
+    Args:
+        meta_data:
+        output_directory:
+        meta_data_name: E.g. 'module_meta_data'
+        export_format: One of 'csv', 'parquet' or 'arrow'
+
+    Returns:
+
+    '''
+
+    meta_data_filepath = os.path.join(output_directory,
+                                      f'graphit_{meta_data_name}.{EXPORT_FORMAT_FILE_EXTENSIONS[export_format]}')
+
+    write_meta_data(meta_data, meta_data_filepath, export_format=export_format)
+
+    return meta_data_filepath
+
+
+def get_graph_meta_data_dataset_directory(output_directory: Path,
+                                          export_format: str) -> str:
+
+    return os.path.join(output_directory, f'graphit_graph_meta_data.{EXPORT_FORMAT_FILE_EXTENSIONS[export_format]}')
+
+
+def export_graph_meta_data_part(graph_meta_data_list: List[pd.DataFrame],
+                                output_directory: Path,
+                                part_index: int,
+                                export_format: str) -> str:
+    '''
+    Exports the specified graph meta data tables of several graph roots as one part file of the graph meta data dataset,
+    i.e. the directory graphit_graph_meta_data.{parquet,arrow} in the specified output directory. The graph meta data
+    tables are expected to have a root_function_id column identifying their graph root.
+
+    The dataset can be read back in one go, e.g. via pandas.read_parquet or pyarrow.dataset.dataset.
+
+    Args:
+        graph_meta_data_list:
+        output_directory:
+        part_index:
+        export_format: Either 'parquet' or 'arrow'
+
+    Returns:
+
+    '''
+
+    graph_meta_data_dataset_directory = get_graph_meta_data_dataset_directory(output_directory, export_format)
+    os.makedirs(graph_meta_data_dataset_directory, exist_ok=True)
+
+    graph_meta_data_part_filepath = os.path.join(graph_meta_data_dataset_directory,
+                                                 f'part-{part_index:05d}.{EXPORT_FORMAT_FILE_EXTENSIONS[export_format]}')
+
+    write_meta_data(pd.concat(graph_meta_data_list, ignore_index=True), graph_meta_data_part_filepath,
+                    export_format=export_format)
+
+    logger.debug('Exported graph meta data of %s graph roots to %s.', len(graph_meta_data_list), graph_meta_data_part_filepath)
+
+    return graph_meta_data_part_filepath
+
+
+def read_meta_data(file_path: str) -> pd.DataFrame:
+    '''
+    Reads a meta data table or graph meta data dataset exported by graphit in any of the export formats. The export
+    format is derived from the file extension.
+
+    Args:
+        file_path:
+
+    Returns:
+
+    '''
+
+    if str(file_path).endswith(EXPORT_FORMAT_FILE_EXTENSIONS[EXPORT_FORMAT_PARQUET]):
+        return pd.read_parquet(file_path)
+    elif str(file_path).endswith(EXPORT_FORMAT_FILE_EXTENSIONS[EXPORT_FORMAT_ARROW]):
+        if os.path.isdir(file_path):
+            import_pyarrow()
+            import pyarrow.dataset
+
+            return pyarrow.dataset.dataset(file_path, format='ipc').to_table().to_pandas()
+
+        return pd.read_feather(file_path)
+
+    return pd.read_csv(file_path, keep_default_na=False)
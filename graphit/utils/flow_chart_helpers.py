@@ -0,0 +1,263 @@
+import os
+from typing import Dict, Iterable, List
+from xml.sax.saxutils import escape
+
+import pandas as pd
+
+from graphit.settings import FLOW_CHART_COLOR_PALETTE, GRAPH_NODE_TYPE_CYCLE, GRAPH_NODE_TYPE_REFERENCE, \
+    GRAPH_NODE_TYPE_TRUNCATED, FLOW_CHART_X_STEP_SMALL, FLOW_CHART_X_STEP_STANDARD, FLOW_CHART_Y_STEP_STANDARD, \
+    FLOW_CHART_ELEMENT_HEIGHT_STANDARD, FLOW_CHART_ELEMENT_WIDTH_STANDARD, FLOW_CHART_SIZE_Y, FLOW_CHART_CONTINUATION_MARKER_LENGTH
+
+# the parts of the flow chart layout shared by all renderers. deliberately free of heavy dependencies, so that renderers
+# other than the schemdraw one don't have to import schemdraw
+
+
+def get_module_colors(module_import_paths: Iterable[str]) -> Dict[str, str]:
+    '''
+    Utility function that maps each of the specified module import paths onto a color of the flow chart color palette.
+    Colors are assigned in the alphabetical order of the import paths, cycling through the color palette if there are
+    more modules than colors.
+
+    Args:
+        module_import_paths:
+
+    Returns:
+
+    '''
+
+    return dict([(module_import_path, FLOW_CHART_COLOR_PALETTE[module_index % len(FLOW_CHART_COLOR_PALETTE)])
+                 for module_index, module_import_path in enumerate(sorted(set(module_import_paths)))])
+
+
+def get_function_handle_label(graph_meta_data_record) -> str:
+    '''
+    Utility function that creates the label of the function handle box of the passed graph meta data record. Nodes that
+    are not expanded because they close a cycle or have already been expanded elsewhere point to the graph index of
+    the expanded node, e.g. 'load (see 1.3.2)'. Nodes that are not expanded because of a depth or node limit are marked as
+    such, e.g. 'load (...)'.
+
+    Args:
+        graph_meta_data_record:
+
+    Returns:
+
+    '''
+
+    if graph_meta_data_record.target_function_node_type == GRAPH_NODE_TYPE_CYCLE:
+        return f'{graph_meta_data_record.target_function_handle} (cycle: {graph_meta_data_record.target_function_reference_graph_index or "root"})'
+    elif graph_meta_data_record.target_function_node_type == GRAPH_NODE_TYPE_REFERENCE:
+        return f'{graph_meta_data_record.target_function_handle} (see {graph_meta_data_record.target_function_reference_graph_index or "root"})'
+    elif graph_meta_data_record.target_function_node_type == GRAPH_NODE_TYPE_TRUNCATED:
+        return f'{graph_meta_data_record.target_function_handle} (...)'
+
+    return graph_meta_data_record.target_function_handle
+
+
+def get_next_graph_index_nested(graph_index: str) -> str:
+    '''
+    Utility function that generates the next, nested graph index number for a given graph index. i.e., for
+    - '1.2', this function returns '1.2.1'
+    - '2.7', this function returns '2.7.1'
+    - '1', this function returns '1.1'
+    - '3.1.2.2', this function returns '3.1.2.2.1'
+
+    Args:
+        graph_index:
+
+    Returns:
+
+    '''
+
+    if graph_index:
+        next_graph_index = f'{graph_index}.1'
+    else:
+        next_graph_index = '1'
+
+    return next_graph_index
+
+def get_next_graph_index_sequential(graph_index: str) -> str:
+    '''
+    Utility function that generates the next, sequential graph index number for a given graph index. i.e., for
+    - '1.2', this function returns '1.3'
+    - '2.7', this function returns '2.8'
+    - '1', this function returns '2'
+    - '3.1.2.2', this function returns '3.1.2.3'
+
+    Args:
+        graph_index:
+
+    Returns:
+
+    '''
+
+    # generation 2 and above
+    if '.' in graph_index:
+        fixed_generations = '.'.join(graph_index.split('.')[:-1])
+        next_graph_index = f'{fixed_generations}.{int(graph_index.split(".")[-1])+1}'
+    # generation 1
+    elif graph_index:
+        next_graph_index = str(int(graph_index) + 1)
+    else:
+        next_graph_index = 'n/a'
+
+    return next_graph_index
+
+
+def get_continuation_marker(graph_index: str,
+                            x_coordinate: int,
+                            y_coordinate: int,
+                            linked_graph_index: str,
+                            linked_page_index: int,
+                            is_outgoing: bool,
+                            is_nested: bool) -> Dict:
+    '''
+    Utility function that creates the continuation marker of a vertical arrow that crosses pages, for the page of the
+    record with the specified graph index and (paged) plot coordinates. Outgoing markers leave the record's function
+    handle box (for arrows to the record's first dependency) or graph index circle (for arrows to its next sibling)
+    downwards, incoming markers enter the record's graph index circle from above. Coordinates are in flow chart units,
+    with the y axis pointing up, as in graphit.utils.graph_helpers.draw_horizontal_elements.
+
+    Args:
+        graph_index:
+        x_coordinate:
+        y_coordinate:
+        linked_graph_index: The graph index of the record at the other end of the arrow
+        linked_page_index: The (zero based) index of the page the record at the other end of the arrow is on
+        is_outgoing:
+        is_nested: Whether the arrow points to the first dependency of its start record, rather than its next sibling
+
+    Returns:
+
+    '''
+
+    function_handle_box_x = x_coordinate * FLOW_CHART_X_STEP_STANDARD
+    center_y = FLOW_CHART_SIZE_Y - y_coordinate * FLOW_CHART_Y_STEP_STANDARD
+
+    if is_outgoing and is_nested:
+        start_x = function_handle_box_x + FLOW_CHART_ELEMENT_WIDTH_STANDARD / 2
+    else:
+        start_x = function_handle_box_x - FLOW_CHART_X_STEP_SMALL + FLOW_CHART_ELEMENT_HEIGHT_STANDARD / 2
+
+    if is_outgoing:
+        start_y = center_y - FLOW_CHART_ELEMENT_HEIGHT_STANDARD / 2
+        end_y = start_y - FLOW_CHART_CONTINUATION_MARKER_LENGTH
+        label = f'continues at {linked_graph_index} (page {linked_page_index + 1})'
+        label_y = end_y - FLOW_CHART_ELEMENT_HEIGHT_STANDARD / 4
+    else:
+        end_y = center_y + FLOW_CHART_ELEMENT_HEIGHT_STANDARD / 2
+        start_y = end_y + FLOW_CHART_CONTINUATION_MARKER_LENGTH
+        label = f'continued from {linked_graph_index or "root"} (page {linked_page_index + 1})'
+        label_y = start_y + FLOW_CHART_ELEMENT_HEIGHT_STANDARD / 4
+
+    return {'graph_index': graph_index,
+            'linked_graph_index': linked_graph_index,
+            'linked_page_index': linked_page_index,
+            'start': (start_x, start_y),
+            'end': (start_x, end_y),
+            'label': label,
+            'label_position': (start_x, label_y)}
+
+
+def split_flow_chart_into_pages(graph_meta_data: pd.DataFrame,
+                                max_rows_per_page: int) -> List[Dict]:
+    '''
+    Utility function that splits the flow chart of the passed graph meta data into pages of at most max_rows_per_page
+    consecutive rows each, so that large graphs don't run off the canvas and stay small enough to be opened. Each page
+    can be rendered on its own, and contains
+    - page_index: the zero based index of the page
+    - graph_meta_data: the page's rows, with the plot coordinates shifted so that the page's first row is at the top and
+      its shallowest generation at the left (but still right of the root's position, to leave room for the graph index
+      circles)
+    - continuation_markers: one marker for each end of each vertical arrow that crosses pages, see
+      get_continuation_marker. The vertical arrows between rows of the same page are drawn as usual
+    - first_graph_index, last_graph_index: the graph indices of the page's first and last rows
+
+    A max_rows_per_page of 0 disables paging, i.e. returns a single page.
+
+    Args:
+        graph_meta_data:
+        max_rows_per_page:
+
+    Returns:
+
+    '''
+
+    if max_rows_per_page <= 0 or len(graph_meta_data) <= max_rows_per_page:
+        max_rows_per_page = max(len(graph_meta_data), 1)
+
+    graph_meta_data = graph_meta_data.sort_values('graph_plot_y_coordinate')
+
+    pages = []
+
+    for page_index, page_start in enumerate(range(0, len(graph_meta_data), max_rows_per_page)):
+        page_graph_meta_data = graph_meta_data.iloc[page_start:page_start + max_rows_per_page]
+        x_offset = max(page_graph_meta_data['graph_plot_x_coordinate'].min() - 1, 0)
+        y_offset = page_graph_meta_data['graph_plot_y_coordinate'].min() - 1
+
+        page_graph_meta_data = page_graph_meta_data.assign(
+            graph_plot_x_coordinate=page_graph_meta_data['graph_plot_x_coordinate'] - x_offset,
+            graph_plot_y_coordinate=page_graph_meta_data['graph_plot_y_coordinate'] - y_offset)
+
+        pages.append({'page_index': page_index,
+                      'graph_meta_data': page_graph_meta_data,
+                      'continuation_markers': [],
+                      'first_graph_index': page_graph_meta_data['target_function_graph_index'].iloc[0],
+                      'last_graph_index': page_graph_meta_data['target_function_graph_index'].iloc[-1]})
+
+    if len(pages) == 1:
+        return pages
+
+    # the page and paged coordinates of every record, to find and place the arrows crossing pages
+    record_pages = {}
+
+    for page in pages:
+        for graph_index, x_coordinate, y_coordinate in zip(page['graph_meta_data']['target_function_graph_index'].tolist(),
+                                                           page['graph_meta_data']['graph_plot_x_coordinate'].tolist(),
+                                                           page['graph_meta_data']['graph_plot_y_coordinate'].tolist()):
+            record_pages[graph_index] = (page['page_index'], x_coordinate, y_coordinate)
+
+    for graph_index, (page_index, x_coordinate, y_coordinate) in record_pages.items():
+        for next_graph_index, is_nested in ((get_next_graph_index_nested(graph_index), True),
+                                            (get_next_graph_index_sequential(graph_index), False)):
+            if next_graph_index not in record_pages or record_pages[next_graph_index][0] == page_index:
+                continue
+
+            next_page_index, next_x_coordinate, next_y_coordinate = record_pages[next_graph_index]
+
+            pages[page_index]['continuation_markers'].append(
+                get_continuation_marker(graph_index, x_coordinate, y_coordinate, next_graph_index, next_page_index,
+                                        is_outgoing=True, is_nested=is_nested))
+            pages[next_page_index]['continuation_markers'].append(
+                get_continuation_marker(next_graph_index, next_x_coordinate, next_y_coordinate, graph_index, page_index,
+                                        is_outgoing=False, is_nested=is_nested))
+
+    return pages
+
+
+def write_flow_chart_index_page(pages: List[Dict],
+                                page_file_paths: List[str],
+                                index_file_path: str,
+                                title: str) -> None:
+    '''
+    Utility function that writes a html index page linking the specified pages of a flow chart, see
+    split_flow_chart_into_pages, with the range of graph indices and the number of rows on each page.
+
+    Args:
+        pages:
+        page_file_paths:
+        index_file_path:
+        title:
+
+    Returns:
+
+    '''
+
+    page_links = [f'<li><a href="{escape(os.path.basename(page_file_path))}">Page {page["page_index"] + 1}</a>: '
+                  f'{escape(page["first_graph_index"] or "root")} to {escape(page["last_graph_index"] or "root")} '
+                  f'({len(page["graph_meta_data"])} rows)</li>'
+                  for page, page_file_path in zip(pages, page_file_paths)]
+
+    with open(index_file_path, 'w') as index_file:
+        index_file.write(f'<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>{escape(title)}</title></head>\n'
+                         f'<body>\n<h1>{escape(title)}</h1>\n<ol>\n' + '\n'.join(page_links) + '\n</ol>\n</body>\n</html>\n')
+
@@ -1,40 +1,394 @@
 import ast
+import keyword
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
 from functools import partial
-from typing import List, Dict, Union, Type, Tuple
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Union, Type, Tuple, Optional, Pattern, Iterable, Iterator
+
+from graphit.settings import logger, DEBUG, PARSING_CHUNKS_PER_JOB, STREAMING_MODULES_IN_FLIGHT_PER_WORKER, PARSING_MODE_AST, PARSING_MODE_FAST, \
+    GENERIC_FUNCTION_DEFINITION_PATTERN, GENERIC_CLASS_DEFINITION_PATTERN, SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_1, \
+    SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_2, SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_3, \
+    SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_4, SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_5, FAST_SCAN_MMAP_MIN_FILE_SIZE_BYTES
+from graphit.utils.cache_helpers import get_parse_cache_key, get_module_file_stat, load_cached_parse_results, \
+    load_cached_parse_results_by_stat, record_parse_cache_index, write_cached_parse_results
+from graphit.utils.helpers import create_unique_reference_id, check_unique_reference_ids
+from graphit.utils.records import ModuleRecord, FunctionRecord
+from graphit.utils.symbol_helpers import get_function_call_qualifier, record_module_symbol_table, \
+    create_symbol_resolution_index, resolve_function_call
+
+
+def record_functions_from_module(recorded_module: ModuleRecord,
+                                 parse_cache_directory: Optional[Path] = None,
+                                 parsing_mode: str = PARSING_MODE_AST) -> List[FunctionRecord]:
+    '''
+    Records all module level functions and classes of the specified module. If a parse cache directory is specified,
+    the definitions of modules that have not changed since they were last cached are loaded from the cache instead of
+    parsing the module's source.
+
+    Args:
+        recorded_module:
+        parse_cache_directory:
+        parsing_mode: Either 'ast' or 'fast', see record_functions_and_symbol_table_from_module
+
+    Returns:
+
+    '''
+
+    return record_functions_and_symbol_table_from_module(recorded_module, parse_cache_directory=parse_cache_directory,
+                                                         parsing_mode=parsing_mode)[0]
+
+
+def record_functions_and_symbol_table_from_module(recorded_module: ModuleRecord,
+                                                  parse_cache_directory: Optional[Path] = None,
+                                                  parsing_mode: str = PARSING_MODE_AST,
+                                                  prefetched_module: Optional[Dict] = None) -> Tuple[List[FunctionRecord], Dict]:
+    '''
+    Same as record_functions_from_module, but also returns the module's symbol table (see
+    graphit.utils.symbol_helpers.record_module_symbol_table), which is needed to resolve the recorded function calls.
+
+    With the 'fast' parsing mode, the module is scanned instead of parsed (see scan_module_source), which never fails on
+    syntax errors but only records approximate definitions. Scans are cheap enough to not use the parse cache.
+
+    Args:
+        recorded_module:
+        parse_cache_directory:
+        parsing_mode: Either 'ast' or 'fast'
+        prefetched_module: The module's source or cached parse results, if they have already been read, see
+            prefetch_module
 
-from graphit.settings import logger
-from graphit.utils.helpers import create_unique_reference_id
-from graphit.utils.model import RecordedModule, RecordedFunction, RecordedClass
+    Returns:
+
+    '''
+
+    prefetched_module = prefetched_module or {}
+    parse_results = prefetched_module.get('parse_results')
+    module_source = prefetched_module.get('module_source')
+
+    if parse_results is not None:
+        logger.debug('Loaded definitions of unchanged module %s from parse cache.', recorded_module.file_path)
+    elif parsing_mode == PARSING_MODE_FAST:
+        parse_results = scan_module(recorded_module, module_source=module_source)
+    elif parse_cache_directory is None:
+        parse_results = record_parse_results_from_module(recorded_module, module_source=module_source)
+    else:
+        parse_results = record_parse_results_from_module_with_cache(recorded_module,
+                                                                    parse_cache_directory=parse_cache_directory,
+                                                                    module_source=module_source,
+                                                                    module_file_stat=prefetched_module.get('module_file_stat'))
+
+    # create FunctionRecord records from function definition payloads
+    recorded_functions = convert_definition_payloads_to_recorded_functions_and_classes(
+        definition_payloads=parse_results['definitions'],
+        source_module_reference_id=recorded_module.unique_reference_id,
+        source_module_import_path=recorded_module.import_path)
+
+    return recorded_functions, parse_results['symbol_table']
+
+
+def record_parse_results_from_module(recorded_module: ModuleRecord,
+                                     module_source: Optional[bytes] = None) -> Dict:
+    '''
+    Parses the specified module and returns its parse results, i.e. the payloads of its module level function and class
+    definitions and its symbol table.
+
+    Args:
+        recorded_module:
+        module_source: The module's source, if it has already been read
 
+    Returns:
 
-def record_functions_from_module(recorded_module: RecordedModule) -> List[RecordedFunction]:
+    '''
 
-    with open(recorded_module.file_path, "r") as f:
-        module_ast = ast.parse(f.read(), recorded_module.file_path)
+    if module_source is None:
+        with open(recorded_module.file_path, "rb") as f:
+            module_source = f.read()
 
-    # import pdb
-    # pdb.set_trace()
+    module_ast = ast.parse(module_source, recorded_module.file_path)
 
-    logger.debug(f'Recording functions using AST from module {recorded_module.file_path}')
+    logger.debug('Recording functions using AST from module %s', recorded_module.file_path)
 
     # get module level function and class definitions
     module_function_and_class_definition_nodes = get_module_level_function_and_class_definition_nodes(module_ast)
 
-    # create RecordedFunction models from function definition nodes
-    recorded_functions = convert_nodes_to_recorded_functions_and_classes(
-        module_function_and_class_definition_nodes=module_function_and_class_definition_nodes,
-        source_module_reference_id=recorded_module.unique_reference_id)
+    return {'definitions': convert_nodes_to_definition_payloads(module_function_and_class_definition_nodes),
+            'symbol_table': record_module_symbol_table(module_ast)}
 
-    return recorded_functions
 
+def record_parse_results_from_module_with_cache(recorded_module: ModuleRecord,
+                                                parse_cache_directory: Path,
+                                                module_source: Optional[bytes] = None,
+                                                module_file_stat: Optional[Dict] = None) -> Dict:
+    '''
+    Cache aware version of record_parse_results_from_module. Uses the module file's modification time and size as
+    a cheap pre-check, then falls back onto the module's content hash before parsing the module.
+
+    Args:
+        recorded_module:
+        parse_cache_directory:
+        module_source: The module's source, if it has already been read after the pre-check missed, see
+            prefetch_module
+        module_file_stat: The module file's stat taken before its source was read. Required along with module_source
+
+    Returns:
+
+    '''
+
+    if module_source is None:
+        parse_results = load_cached_parse_results_by_stat(parse_cache_directory, recorded_module.file_path)
+
+        if parse_results is not None:
+            logger.debug('Loaded definitions of unchanged module %s from parse cache.', recorded_module.file_path)
+            return parse_results
+
+        module_file_stat = get_module_file_stat(recorded_module.file_path)
+
+        with open(recorded_module.file_path, "rb") as f:
+            module_source = f.read()
 
-def convert_nodes_to_recorded_functions_and_classes(module_function_and_class_definition_nodes: List[Type[ast.AST]],
-                                                    source_module_reference_id: str) -> List[Union[RecordedFunction, RecordedClass]]:
+    parse_cache_key = get_parse_cache_key(module_source)
+    parse_results = load_cached_parse_results(parse_cache_directory, parse_cache_key)
+
+    if parse_results is None:
+        parse_results = record_parse_results_from_module(recorded_module, module_source=module_source)
+        write_cached_parse_results(parse_cache_directory, parse_cache_key, parse_results)
+    else:
+        logger.debug('Loaded definitions of module %s from parse cache via content hash.', recorded_module.file_path)
+
+    record_parse_cache_index(parse_cache_directory, recorded_module.file_path, module_file_stat, parse_cache_key)
+
+    return parse_results
+
+
+def prefetch_module(recorded_module: ModuleRecord,
+                    parse_cache_directory: Optional[Path] = None,
+                    parsing_mode: str = PARSING_MODE_AST) -> Dict:
     '''
-    Walks the graphs attached to the specified function and class definition nodes at module level. Extracts the meta data needed
-    to create the RecordedFunction and RecordedClass pydantic model representation of each module level function and class definition.
-    Note that at this point the strings in the list type attribute ordered_function_calls are the function handles, not
-    the ids, since the matching of handle and ids can only be done once all functions and classes have been recorded.
+    Does all the reading needed to record the functions of the specified module, but none of the parsing, so that it can
+    run on an I/O thread ahead of the parsing, see stream_functions_and_symbol_tables_from_modules. Returns a dictionary
+    of either the module's cached parse results, if the parse cache's pre-check hits (see
+    record_parse_results_from_module_with_cache), or the module's source, along with the module file's stat if the
+    parse cache is used.
+
+    Args:
+        recorded_module:
+        parse_cache_directory:
+        parsing_mode: Either 'ast' or 'fast'
+
+    Returns:
+
+    '''
+
+    module_file_stat = None
+
+    if parsing_mode == PARSING_MODE_AST and parse_cache_directory is not None:
+        parse_results = load_cached_parse_results_by_stat(parse_cache_directory, recorded_module.file_path)
+
+        if parse_results is not None:
+            return {'parse_results': parse_results}
+
+        module_file_stat = get_module_file_stat(recorded_module.file_path)
+
+    with open(recorded_module.file_path, "rb") as f:
+        module_source = f.read()
+
+    return {'module_source': module_source,
+            'module_file_stat': module_file_stat}
+
+
+def create_fast_scan_pattern() -> Pattern:
+    '''
+    Compiles the single regular expression the fast scan (see scan_module_source) tokenizes module sources with. Its
+    alternatives are tried in order at each position, so that string literals and comments are consumed before they can
+    be mistaken for code:
+    - string: string literals, including triple quoted ones spanning several lines
+    - comment: comments
+    - function_definition, class_definition: function and class definitions at any level, see
+        GENERIC_FUNCTION_DEFINITION_PATTERN and GENERIC_CLASS_DEFINITION_PATTERN
+    - import_statement: import statements, with the imported module (if any) and the imported names
+    - statement: the first character of any other statement at module level, which ends the preceding definition
+    - function_call: dotted names called in one of the contexts of the SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_*
+        patterns, e.g. ' load(' or '=helpers.load('
+
+    Returns:
+
+    '''
+
+    # the characters that precede a called name, e.g. '=' for '={function_handle}('
+    function_call_prefixes = sorted(set([function_call_pattern_template.split('{function_handle}')[0][-1]
+                                         for function_call_pattern_template in (SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_1,
+                                                                                SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_2,
+                                                                                SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_3,
+                                                                                SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_4,
+                                                                                SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_5)]))
+
+    fast_scan_pattern = '|'.join([
+        r'(?P<string>[rRbBuUfF]{0,2}(?:"""[\s\S]*?"""|' + r"'''[\s\S]*?'''" + r'|"(?:\\.|[^"\\\n])*"|' + r"'(?:\\.|[^'\\\n])*'))",
+        r'(?P<comment>#[^\n]*)',
+        f'(?P<function_definition>{GENERIC_FUNCTION_DEFINITION_PATTERN})',
+        f'(?P<class_definition>{GENERIC_CLASS_DEFINITION_PATTERN})',
+        r'(?P<import_statement>^[ \t]*(?:from[ \t]+(?P<imported_module>\.*[\w.]*)[ \t]+)?import[ \t]+(?P<imported_names>\([^)]*\)|[^\n#;]*))',
+        r'(?P<statement>^[^\s#)\]}])',
+        f'(?<=[{re.escape("".join(function_call_prefixes))}])' + r'(?P<function_call>[a-zA-Z_]\w*(?:\.[a-zA-Z_]\w*)*)\('])
+
+    return re.compile(fast_scan_pattern.encode(), re.MULTILINE)
+
+
+FAST_SCAN_PATTERN = create_fast_scan_pattern()
+
+FAST_SCAN_DEFINITION_HANDLE_PATTERN = re.compile(rb'(?:def|class) (\w+)')
+
+
+def record_scanned_imports(module_symbol_table: Dict,
+                           imported_module: Optional[str],
+                           imported_names: str):
+    '''
+    Adds the names bound by an import statement found by the fast scan to the specified symbol table, the same way
+    graphit.utils.symbol_helpers.record_module_symbol_table does for the import nodes of a module's AST.
+
+    Args:
+        module_symbol_table:
+        imported_module: The module names are imported from, or None for `import ...` statements
+        imported_names: E.g. 'a.b as c, d' or '(load, dump)'
+
+    Returns:
+
+    '''
+
+    for imported_name in imported_names.strip().strip('()').split(','):
+        imported_name_parts = imported_name.split()
+
+        if not imported_name_parts:
+            continue
+
+        name, alias = imported_name_parts[0], imported_name_parts[2] if len(imported_name_parts) == 3 else None
+
+        if imported_module is None:
+            if alias is not None:
+                module_symbol_table['imports'][alias] = name
+            else:
+                module_symbol_table['imports'][name.split('.')[0]] = name.split('.')[0]
+        elif name == '*':
+            module_symbol_table['star_imports'].append(imported_module)
+        elif imported_module.endswith('.'):
+            module_symbol_table['imports'][alias or name] = f'{imported_module}{name}'
+        else:
+            module_symbol_table['imports'][alias or name] = f'{imported_module}.{name}'
+
+
+def scan_module_source(module_source: Union[bytes, mmap.mmap]) -> Dict:
+    '''
+    Fast, approximate alternative to parsing a module's source into an AST: scans the source in a single pass with
+    FAST_SCAN_PATTERN and returns the same parse results as record_parse_results_from_module, i.e. the payloads of the
+    module level function and class definitions and the module's symbol table.
+
+    A module level definition spans all lines up to the next statement at module level, and records all calls made in
+    those lines by a (dotted) name. Calls the scan can't name, e.g. `get_loader().load(...)`, and calls in contexts not
+    covered by the SPECIFIC_FUNCTION_CALL_PATTERN_TEMPLATE_* patterns, e.g. after a comma, are missed. All payloads are
+    therefore flagged as approximate. Since the source is never compiled, modules with syntax errors are scanned like
+    any other.
+
+    Args:
+        module_source: The module's source, or a memory map of the module's file
+
+    Returns:
+
+    '''
+
+    definition_payloads = []
+    module_symbol_table = {'imports': {}, 'star_imports': []}
+
+    definition_payload = None
+    line_index, line_index_position = 1, 0
+
+    for match in FAST_SCAN_PATTERN.finditer(module_source):
+        match_type = match.lastgroup
+
+        if match_type == 'function_call':
+            function_call = match.group('function_call').decode()
+
+            # keywords followed by brackets, e.g. 'if(', are not calls
+            if definition_payload is not None and not keyword.iskeyword(function_call):
+                definition_payload['ordered_function_calls'].append(function_call)
+        elif match_type in ('function_definition', 'class_definition'):
+            definition_header = match.group().lstrip()
+
+            # definitions that are indented are part of the enclosing module level definition
+            if match.group()[:-len(definition_header)].rstrip(b' \t') != match.group()[:-len(definition_header)]:
+                continue
+
+            # line numbers are only needed for module level definitions, so the lines are only counted up to those
+            definition_start_position = match.end() - len(definition_header)
+            line_index += module_source[line_index_position:definition_start_position].count(b'\n')
+            line_index_position = definition_start_position
+
+            definition_payload = {'definition_type': 'class' if match_type == 'class_definition' else 'function',
+                                  'function_handle': FAST_SCAN_DEFINITION_HANDLE_PATTERN.search(definition_header).group(1).decode(),
+                                  'definition_start_line_index': line_index,
+                                  'definition_start_line_offset': 0,
+                                  'definition_end_line_index': line_index,
+                                  'definition_end_line_offset': len(definition_header),
+                                  'ordered_function_calls': [],
+                                  'is_approximate': True}
+
+            definition_payloads.append(definition_payload)
+        elif match_type == 'import_statement':
+            imported_module = match.group('imported_module')
+
+            record_scanned_imports(module_symbol_table,
+                                   imported_module=imported_module.decode() if imported_module is not None else None,
+                                   imported_names=match.group('imported_names').decode())
+        elif match_type == 'statement':
+            definition_payload = None
+
+    return {'definitions': definition_payloads,
+            'symbol_table': module_symbol_table}
+
+
+def scan_module(recorded_module: ModuleRecord,
+                module_source: Optional[bytes] = None) -> Dict:
+    '''
+    Scans the specified module with the fast scan, see scan_module_source. Unless its source has already been read,
+    files of at least FAST_SCAN_MMAP_MIN_FILE_SIZE_BYTES are memory mapped rather than read, so that the scan works on
+    the pages of the file directly.
+
+    Args:
+        recorded_module:
+        module_source: The module's source, if it has already been read
+
+    Returns:
+
+    '''
+
+    logger.debug('Recording functions using the fast scan from module %s', recorded_module.file_path)
+
+    if module_source is not None:
+        return scan_module_source(module_source)
+
+    with open(recorded_module.file_path, 'rb') as f:
+        module_file_size = os.fstat(f.fileno()).st_size
+
+        # empty files, e.g. most __init__.py files, can't be memory mapped
+        if module_file_size < FAST_SCAN_MMAP_MIN_FILE_SIZE_BYTES or not module_file_size:
+            return scan_module_source(f.read())
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as module_source:
+            return scan_module_source(module_source)
+
+
+def convert_nodes_to_definition_payloads(module_function_and_class_definition_nodes: List[Type[ast.AST]]) -> List[Dict]:
+    '''
+    Walks the graphs attached to the specified function and class definition nodes at module level. Extracts the meta
+    data needed to create the FunctionRecord record of each module level function and class definition, apart from the
+    reference ids. The payloads only depend on the module's source and can therefore be cached.
+    Note that at this point the strings in the list type attribute ordered_function_calls are the dotted names the
+    functions are called by (see graphit.utils.symbol_helpers.get_function_call_qualifier), not the ids, since the
+    matching of calls and ids can only be done once all functions and classes have been recorded.
 
     Args:
         module_function_and_class_definition_nodes:
@@ -43,14 +397,21 @@ def convert_nodes_to_recorded_functions_and_classes(module_function_and_class_de
 
     '''
 
-    recorded_definitions = []
+    definition_payloads = []
+
+    # checked once, so that the debug logging in the loop below costs nothing when disabled
+    is_debug_logging = logger.isEnabledFor(DEBUG)
 
     for module_function_or_class_definition_node in module_function_and_class_definition_nodes:
 
         # record basic data points
-        definition_payload = {'unique_reference_id':create_unique_reference_id(),
-                                       'function_handle':module_function_or_class_definition_node.name,
-                                       'source_module_reference_id':source_module_reference_id}
+        if isinstance(module_function_or_class_definition_node,ast.ClassDef):
+            definition_type = 'class'
+        else:
+            definition_type = 'function'
+
+        definition_payload = {'definition_type':definition_type,
+                              'function_handle':module_function_or_class_definition_node.name}
 
         # record definition start & finish, and all (nested) - even of locally defined ones - function calls made inside
         # this definition
@@ -65,7 +426,8 @@ def convert_nodes_to_recorded_functions_and_classes(module_function_and_class_de
         # ordered_function_calls
         ordered_function_call_handles: List[Tuple[str,int]] = []
 
-        logger.debug(f'Function definition node: {module_function_or_class_definition_node.__dict__}')
+        if is_debug_logging:
+            logger.debug('Function definition node: %s', module_function_or_class_definition_node.__dict__)
 
         for child_node in ast.walk(module_function_or_class_definition_node):
             if isinstance(child_node, ast.Call):
@@ -73,16 +435,15 @@ def convert_nodes_to_recorded_functions_and_classes(module_function_and_class_de
 
                 grandchild_node = child_call_node.func
 
-                if isinstance(grandchild_node, ast.Name):
-                    called_function_handle = grandchild_node.id
-                elif isinstance(grandchild_node, ast.Attribute):
-                    called_function_handle = grandchild_node.attr
-                else:
-                    logger.warning(f'Unexpected Call node func attribute type encountered: {grandchild_node.__dict__} | {type(grandchild_node).__name__}')
+                called_function_handle = get_function_call_qualifier(grandchild_node)
+
+                if called_function_handle is None:
+                    logger.warning('Unexpected Call node func attribute type encountered: %s | %s', grandchild_node.__dict__, type(grandchild_node).__name__)
                     continue
 
-                logger.debug(f'Child node: {child_call_node.__dict__} | {type(child_call_node).__name__}')
-                logger.debug(f'Grandchild node: {grandchild_node.__dict__} | {type(grandchild_node).__name__}')
+                if is_debug_logging:
+                    logger.debug('Child node: %s | %s', child_call_node.__dict__, type(child_call_node).__name__)
+                    logger.debug('Grandchild node: %s | %s', grandchild_node.__dict__, type(grandchild_node).__name__)
 
                 ordered_function_call_handles.append((called_function_handle, child_call_node.lineno))
 
@@ -91,12 +452,78 @@ def convert_nodes_to_recorded_functions_and_classes(module_function_and_class_de
 
         definition_payload.update(ordered_function_calls=ordered_function_call_handles)
 
-        # create function or class definition model and add to storage
-        # set the class type
-        if isinstance(module_function_or_class_definition_node,ast.FunctionDef):
-            recorded_definition = RecordedFunction(**definition_payload)
-        elif isinstance(module_function_or_class_definition_node,ast.ClassDef):
-            recorded_definition = RecordedClass(**definition_payload)
+        definition_payloads.append(definition_payload)
+
+    return definition_payloads
+
+
+def get_function_reference_key(source_module_import_path: str,
+                               function_handle: str,
+                               occurrence_index: int = 0) -> str:
+    '''
+    Creates the key that a function's reference id is derived from, i.e. the function's qualified import path. Repeated
+    module level definitions of the same handle are told apart by their (1 based) occurrence, e.g.
+    'function:utils.helpers.load#2' for the second definition of 'load' in the module 'utils.helpers'.
+
+    Args:
+        source_module_import_path:
+        function_handle:
+        occurrence_index:
+
+    Returns:
+
+    '''
+
+    function_reference_key = f'function:{source_module_import_path}.{function_handle}'
+
+    if occurrence_index:
+        function_reference_key = f'{function_reference_key}#{occurrence_index + 1}'
+
+    return function_reference_key
+
+
+def convert_definition_payloads_to_recorded_functions_and_classes(definition_payloads: List[Dict],
+                                                                  source_module_reference_id: str,
+                                                                  source_module_import_path: str) -> List[FunctionRecord]:
+    '''
+    Creates the FunctionRecord records from the specified definition payloads by attaching the reference ids. The
+    function reference ids are derived from the source module's import path and the function handle, so they are
+    identical across runs.
+
+    Args:
+        definition_payloads:
+        source_module_reference_id:
+        source_module_import_path:
+
+    Returns:
+
+    '''
+
+    recorded_definitions = []
+    function_handle_occurrences = {}
+
+    for definition_payload in definition_payloads:
+        function_handle = definition_payload['function_handle']
+
+        occurrence_index = function_handle_occurrences.get(function_handle, 0)
+        function_handle_occurrences[function_handle] = occurrence_index + 1
+
+        function_reference_key = get_function_reference_key(source_module_import_path=source_module_import_path,
+                                                            function_handle=function_handle,
+                                                            occurrence_index=occurrence_index)
+
+        # create function or class definition record and add to storage
+        recorded_definition = FunctionRecord(
+            unique_reference_id=create_unique_reference_id(function_reference_key),
+            function_handle=function_handle,
+            source_module_reference_id=source_module_reference_id,
+            definition_start_line_index=definition_payload['definition_start_line_index'],
+            definition_start_line_offset=definition_payload['definition_start_line_offset'],
+            definition_end_line_index=definition_payload['definition_end_line_index'],
+            definition_end_line_offset=definition_payload['definition_end_line_offset'],
+            ordered_function_calls=definition_payload['ordered_function_calls'],
+            is_class=definition_payload['definition_type'] == 'class',
+            is_approximate=definition_payload.get('is_approximate', False))
 
         recorded_definitions.append(recorded_definition)
 
@@ -123,80 +550,291 @@ def get_module_level_function_and_class_definition_nodes(module_ast: ast.AST) ->
     return module_level_function_and_class_definition_nodes
 
 
-def get_function_handle_to_id_mapping(recorded_functions: List[RecordedFunction]) -> Dict:
+def map_function_called_function_handles_to_ids(recorded_functions: List[FunctionRecord],
+                                                recorded_modules: Optional[List[ModuleRecord]] = None,
+                                                module_symbol_tables: Optional[Dict[str, Dict]] = None) -> List[FunctionRecord]:
     '''
-    Constructs a dict mapping function_handle -> function reference id. Assumes all function handles are unique.
+    Utility function that resolves the function calls in the recorded_functions' ordered_function_calls attribute to
+    function ids, using the symbol tables of the calling modules (see graphit.utils.symbol_helpers.resolve_function_call).
+    Calls that don't resolve to a project function are removed. Returns the updated list of FunctionRecord objects. The
+    records are updated in place.
+
+    Without modules and symbol tables, calls can only be resolved to definitions in the calling module, or by their
+    handle if it is unique across all recorded functions.
 
     Args:
         recorded_functions:
+        recorded_modules:
+        module_symbol_tables: module id -> symbol table
 
     Returns:
 
     '''
 
-    return dict([(rec_func.function_handle, rec_func.unique_reference_id) for rec_func in recorded_functions])
-
+    symbol_resolution_index = create_symbol_resolution_index(recorded_modules=recorded_modules or [],
+                                                             recorded_functions=recorded_functions,
+                                                             module_symbol_tables=module_symbol_tables or {})
 
-def map_function_handle_to_id(function_handle: str,
-                              function_handle_to_id_mapping: Dict) -> str:
+    return resolve_recorded_function_calls(recorded_functions=recorded_functions,
+                                           symbol_resolution_index=symbol_resolution_index)
 
-    try:
-        function_id = function_handle_to_id_mapping[function_handle]
-    except KeyError as e:
-        function_id = None
 
-    return function_id
-
-
-def map_function_called_function_handles_to_ids(recorded_functions: List[RecordedFunction]) -> List[RecordedFunction]:
+def resolve_recorded_function_calls(recorded_functions: List[FunctionRecord],
+                                    symbol_resolution_index: Dict,
+                                    function_calls: Optional[Dict[str, List[str]]] = None) -> List[FunctionRecord]:
     '''
-    Utility function that creates a mapping from function handle -> function id based on the inputs recorded_functions.
-    Assumes function handles are unique.
-    Then maps all the function handles in the recorded_functions' ordered_function_calls argument to function ids, and
-    returns the updated list of RecordedFunctions objects.
+    Resolves the function calls of the specified recorded functions using the specified symbol resolution index (see
+    graphit.utils.symbol_helpers.create_symbol_resolution_index), and replaces their ordered_function_calls attribute
+    with the ids of the called functions. Calls that don't resolve to a project function are removed.
 
     Args:
         recorded_functions:
+        symbol_resolution_index:
+        function_calls: function id -> unresolved function calls. If not specified, the calls are taken from the
+            recorded functions' ordered_function_calls attribute, which then must not have been resolved yet.
 
     Returns:
 
     '''
 
-    function_handle_to_id_mapping = get_function_handle_to_id_mapping(recorded_functions)
-
-    cleaned_functions = []
-
     for recorded_function in recorded_functions:
-        cleaned_function = recorded_function.copy()
+        if function_calls is None:
+            recorded_function_calls = recorded_function.ordered_function_calls
+        else:
+            recorded_function_calls = function_calls[recorded_function.unique_reference_id]
 
         ordered_function_call_ids = [
-            map_function_handle_to_id(function_handle=function_call,
-                                      function_handle_to_id_mapping=function_handle_to_id_mapping) \
-            for function_call in recorded_function.ordered_function_calls
+            resolve_function_call(function_call=function_call,
+                                  module_id=recorded_function.source_module_reference_id,
+                                  symbol_resolution_index=symbol_resolution_index) \
+            for function_call in recorded_function_calls
         ]
 
         ordered_function_call_ids = [called_function_id for called_function_id in ordered_function_call_ids if called_function_id is not None]
 
-        cleaned_function.ordered_function_calls = ordered_function_call_ids
+        recorded_function.ordered_function_calls = ordered_function_call_ids
+
+    return recorded_functions
+
+
+def get_parsing_chunk_size(n_modules: int,
+                           n_jobs: int) -> int:
+    '''
+    Utility function that determines how many modules are sent to a worker process in one go. Aims for
+    PARSING_CHUNKS_PER_JOB chunks per worker so that the work load stays balanced without paying the inter process
+    communication overhead for every single module.
+
+    Args:
+        n_modules:
+        n_jobs:
+
+    Returns:
+
+    '''
+
+    return max(1, n_modules // (n_jobs * PARSING_CHUNKS_PER_JOB))
+
+
+def record_unresolved_functions_from_modules(recorded_modules: List[ModuleRecord],
+                                             n_jobs: int = 1,
+                                             parse_cache_directory: Optional[Path] = None,
+                                             parsing_mode: str = PARSING_MODE_AST) -> Tuple[List[FunctionRecord], Dict[str, Dict]]:
+    '''
+    Records all module level functions and classes of the specified modules, without resolving their function calls.
+    Returns the recorded functions and the symbol table of each module, which together with the modules are all that's
+    needed to resolve the function calls, see map_function_called_function_handles_to_ids.
+
+    Args:
+        recorded_modules:
+        n_jobs: The number of worker processes used to parse the modules. Defaults to 1, in which case all modules are
+            parsed sequentially in the current process.
+        parse_cache_directory: The directory of the parse cache. If not specified, all modules are parsed without
+            using the cache.
+        parsing_mode: Either 'ast' or 'fast'. The fast mode scans the modules instead of parsing them, which also
+            records modules with syntax errors, but only approximately, see scan_module_source.
+
+    Returns:
+
+    '''
+
+    all_functions = []
+    module_symbol_tables = {}
+
+    record_functions = partial(record_functions_and_symbol_table_from_module, parse_cache_directory=parse_cache_directory,
+                               parsing_mode=parsing_mode)
+
+    if n_jobs > 1 and len(recorded_modules) > 1:
+        chunk_size = get_parsing_chunk_size(n_modules=len(recorded_modules),n_jobs=n_jobs)
+
+        logger.info(f'Recording functions from {len(recorded_modules)} modules using {n_jobs} processes (chunk size: {chunk_size}).')
+
+        # the executor's map returns the results in the order of the specified modules, which keeps the merged
+        # function list deterministic regardless of which worker finishes first
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            for module, (module_functions, module_symbol_table) in zip(recorded_modules,
+                                                                       executor.map(record_functions, recorded_modules, chunksize=chunk_size)):
+                all_functions.extend(module_functions)
+                module_symbol_tables[module.unique_reference_id] = module_symbol_table
+    else:
+        for module in recorded_modules:
+            # capture all function definitions in this module and convert into FunctionRecord records
+            module_functions, module_symbol_table = record_functions(module)
+            all_functions.extend(module_functions)
+            module_symbol_tables[module.unique_reference_id] = module_symbol_table
+
+    return all_functions, module_symbol_tables
+
+
+def stream_functions_and_symbol_tables_from_modules(recorded_modules: Iterable[ModuleRecord],
+                                                    n_jobs: int = 1,
+                                                    n_io_threads: int = 1,
+                                                    parse_cache_directory: Optional[Path] = None,
+                                                    parsing_mode: str = PARSING_MODE_AST,
+                                                    max_modules_in_flight: Optional[int] = None) -> Iterator[Tuple[ModuleRecord, List[FunctionRecord], Dict]]:
+    '''
+    Streaming version of record_unresolved_functions_from_modules, which overlaps reading the modules with parsing them.
+    A pool of I/O threads prefetches the modules (see prefetch_module), and each module is handed over to be parsed as
+    soon as it has been read, either in the current process or on one of the worker processes. Yields each module along
+    with its recorded functions and symbol table, in the order of the specified modules.
+
+    At most max_modules_in_flight modules are read or parsed ahead of the module that is yielded next, so memory stays
+    flat regardless of the number of modules, and the specified modules are only consumed as the window moves on, e.g.
+    while they are still being found (see graphit.utils.module_helpers.iterate_all_modules).
+
+    Args:
+        recorded_modules: Any iterable of modules, including a generator
+        n_jobs: The number of worker processes used to parse the modules. Defaults to 1, in which case all modules are
+            parsed in the current process.
+        n_io_threads: The number of threads used to read the modules
+        parse_cache_directory: See record_unresolved_functions_from_modules
+        parsing_mode: See record_unresolved_functions_from_modules
+        max_modules_in_flight: Defaults to STREAMING_MODULES_IN_FLIGHT_PER_WORKER modules per process or thread,
+            whichever there are more of
+
+    Returns:
+
+    '''
+
+    if max_modules_in_flight is None:
+        max_modules_in_flight = max(n_jobs, n_io_threads) * STREAMING_MODULES_IN_FLIGHT_PER_WORKER
+
+    prefetch = partial(prefetch_module, parse_cache_directory=parse_cache_directory, parsing_mode=parsing_mode)
+    record_functions = partial(record_functions_and_symbol_table_from_module, parse_cache_directory=parse_cache_directory,
+                               parsing_mode=parsing_mode)
+
+    with ThreadPoolExecutor(max_workers=max(n_io_threads, 1)) as io_executor, \
+            (ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else nullcontext()) as parse_executor:
+
+        def prefetch_and_submit_module(recorded_module: ModuleRecord) -> Future:
+            # runs on an I/O thread, so the module is parsed as soon as it has been read, not once it is yielded next
+            return parse_executor.submit(record_functions, recorded_module, prefetched_module=prefetch(recorded_module))
+
+        read_module = prefetch if parse_executor is None else prefetch_and_submit_module
+
+        recorded_modules = iter(recorded_modules)
+        modules_in_flight = deque()
 
-        cleaned_functions.append(cleaned_function)
+        while True:
+            # top up the window of modules in flight, in the order of the specified modules
+            for recorded_module in islice(recorded_modules, max_modules_in_flight - len(modules_in_flight)):
+                modules_in_flight.append((recorded_module, io_executor.submit(read_module, recorded_module)))
 
-    return cleaned_functions
+            if not modules_in_flight:
+                break
 
+            recorded_module, module_future = modules_in_flight.popleft()
 
-def record_all_functions_from_modules(recorded_modules: List[RecordedModule]) -> List[RecordedFunction]:
+            if parse_executor is None:
+                module_functions, module_symbol_table = record_functions(recorded_module, prefetched_module=module_future.result())
+            else:
+                module_functions, module_symbol_table = module_future.result().result()
 
+            yield recorded_module, module_functions, module_symbol_table
+
+
+def record_unresolved_functions_from_module_stream(recorded_modules: Iterable[ModuleRecord],
+                                                   **stream_kwargs) -> Tuple[List[ModuleRecord], List[FunctionRecord], Dict[str, Dict]]:
+    '''
+    Records all module level functions and classes of the specified modules with the streaming pipeline (see
+    stream_functions_and_symbol_tables_from_modules), without resolving their function calls. Returns the modules, as
+    they are consumed along the way, along with the recorded functions and the symbol table of each module.
+
+    Args:
+        recorded_modules: Any iterable of modules, e.g. graphit.utils.module_helpers.iterate_all_modules
+        stream_kwargs: Passed on to stream_functions_and_symbol_tables_from_modules, e.g. n_jobs or n_io_threads
+
+    Returns:
+
+    '''
+
+    all_modules = []
     all_functions = []
+    module_symbol_tables = {}
+
+    for module, module_functions, module_symbol_table in stream_functions_and_symbol_tables_from_modules(recorded_modules,
+                                                                                                         **stream_kwargs):
+        all_modules.append(module)
+        all_functions.extend(module_functions)
+        module_symbol_tables[module.unique_reference_id] = module_symbol_table
+
+    check_unique_reference_ids([module.unique_reference_id for module in all_modules], reference_type='module')
+
+    logger.info(f'Recorded functions from {len(all_modules)} streamed modules.')
+
+    return all_modules, all_functions, module_symbol_tables
+
+
+def record_all_functions_from_modules(recorded_modules: List[ModuleRecord],
+                                      n_jobs: int = 1,
+                                      parse_cache_directory: Optional[Path] = None,
+                                      parsing_mode: str = PARSING_MODE_AST) -> List[FunctionRecord]:
+    '''
+    Records all module level functions and classes of the specified modules, and resolves their function calls to
+    function ids.
+
+    Args:
+        recorded_modules:
+        n_jobs: See record_unresolved_functions_from_modules
+        parse_cache_directory: See record_unresolved_functions_from_modules
+        parsing_mode: See record_unresolved_functions_from_modules
+
+    Returns:
+
+    '''
+
+    all_functions, module_symbol_tables = record_unresolved_functions_from_modules(recorded_modules=recorded_modules,
+                                                                                   n_jobs=n_jobs,
+                                                                                   parse_cache_directory=parse_cache_directory,
+                                                                                   parsing_mode=parsing_mode)
+
+    return resolve_all_function_calls(all_functions, recorded_modules, module_symbol_tables)
+
+
+def resolve_all_function_calls(all_functions: List[FunctionRecord],
+                               recorded_modules: List[ModuleRecord],
+                               module_symbol_tables: Dict[str, Dict]) -> List[FunctionRecord]:
+    '''
+    Resolves the function calls of all specified functions, as recorded by record_unresolved_functions_from_modules, to
+    function ids.
+
+    Args:
+        all_functions:
+        recorded_modules:
+        module_symbol_tables:
+
+    Returns:
+
+    '''
 
-    for module in recorded_modules:
-        # capture all function definitions in this module and convert into RecordedFunction type objects
-        all_functions.extend(record_functions_from_module(module))
+    check_unique_reference_ids([rec_func.unique_reference_id for rec_func in all_functions], reference_type='function')
 
-    # resolve function calls: map called handles onto the function id where a match can be found, otherwise remove the
-    # called handle from the attribute ordered_function_calls
-    all_functions_cleaned = map_function_called_function_handles_to_ids(recorded_functions=all_functions)
+    # resolve function calls: map calls onto the id of the called function where it can be found via the calling module's
+    # symbol table, otherwise remove the call from the attribute ordered_function_calls
+    all_functions_cleaned = map_function_called_function_handles_to_ids(recorded_functions=all_functions,
+                                                                        recorded_modules=recorded_modules,
+                                                                        module_symbol_tables=module_symbol_tables)
 
     logger.info(f'Recorded remaining function meta data.')
-    logger.debug(f'Recorded functions meta data (including scope and calls): {all_functions_cleaned}')
+    logger.debug('Recorded functions meta data (including scope and calls): %s', all_functions_cleaned)
 
-    return all_functions_cleaned
\ No newline at end of file
+    return all_functions_cleaned
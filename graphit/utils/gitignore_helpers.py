@@ -0,0 +1,188 @@
+import fnmatch
+import os
+import re
+from pathlib import Path
+from typing import List, Tuple, Pattern
+
+from graphit.settings import logger
+
+# a gitignore rule: (compiled pattern, is negated, only matches directories)
+GitignoreRule = Tuple[Pattern, bool, bool]
+
+
+def convert_gitignore_pattern_to_regex(gitignore_pattern: str,
+                                       is_anchored: bool) -> str:
+    '''
+    Translates a gitignore glob pattern into a regular expression matching '/' separated paths relative to the
+    directory of the .gitignore file, i.e.
+    - '*' and '?' match anything but '/'
+    - '**/' matches any number of leading directories, '/**' everything inside a directory
+    - patterns that are not anchored (i.e. don't contain a '/') match at any directory level
+
+    Args:
+        gitignore_pattern:
+        is_anchored:
+
+    Returns:
+
+    '''
+
+    regex_parts = []
+    i = 0
+
+    while i < len(gitignore_pattern):
+        if gitignore_pattern.startswith('**/', i):
+            regex_parts.append('(?:.*/)?')
+            i += 3
+        elif gitignore_pattern.startswith('/**', i) and i + 3 == len(gitignore_pattern):
+            regex_parts.append('/.*')
+            i += 3
+        elif gitignore_pattern.startswith('**', i):
+            regex_parts.append('.*')
+            i += 2
+        elif gitignore_pattern[i] == '*':
+            regex_parts.append('[^/]*')
+            i += 1
+        elif gitignore_pattern[i] == '?':
+            regex_parts.append('[^/]')
+            i += 1
+        elif gitignore_pattern[i] == '[' and ']' in gitignore_pattern[i + 1:]:
+            character_class_end = gitignore_pattern.index(']', i + 1)
+            character_class = gitignore_pattern[i + 1:character_class_end].replace('\\', '\\\\')
+
+            if character_class.startswith('!'):
+                character_class = '^' + character_class[1:]
+
+            regex_parts.append(f'[{character_class}]')
+            i = character_class_end + 1
+        elif gitignore_pattern[i] == '\\' and i + 1 < len(gitignore_pattern):
+            regex_parts.append(re.escape(gitignore_pattern[i + 1]))
+            i += 2
+        else:
+            regex_parts.append(re.escape(gitignore_pattern[i]))
+            i += 1
+
+    if is_anchored:
+        return '^' + ''.join(regex_parts) + '$'
+
+    return '^(?:.*/)?' + ''.join(regex_parts) + '$'
+
+
+def parse_gitignore_lines(gitignore_lines: List[str]) -> List[GitignoreRule]:
+    '''
+    Parses the lines of a .gitignore file into a list of rules. Blank lines and comments are skipped.
+
+    Args:
+        gitignore_lines:
+
+    Returns:
+
+    '''
+
+    gitignore_rules = []
+
+    for gitignore_line in gitignore_lines:
+        gitignore_pattern = gitignore_line.rstrip('\n').rstrip(' ')
+
+        if not gitignore_pattern or gitignore_pattern.startswith('#'):
+            continue
+
+        is_negated = gitignore_pattern.startswith('!')
+
+        if is_negated:
+            gitignore_pattern = gitignore_pattern[1:]
+
+        is_directory_only = gitignore_pattern.endswith('/')
+        gitignore_pattern = gitignore_pattern.rstrip('/')
+
+        # a separator anywhere but at the end anchors the pattern to the .gitignore file's directory
+        is_anchored = '/' in gitignore_pattern
+        gitignore_pattern = gitignore_pattern.lstrip('/')
+
+        if not gitignore_pattern:
+            continue
+
+        gitignore_regex = convert_gitignore_pattern_to_regex(gitignore_pattern, is_anchored=is_anchored)
+        gitignore_rules.append((re.compile(gitignore_regex), is_negated, is_directory_only))
+
+    return gitignore_rules
+
+
+def read_gitignore_rules(directory: Path) -> List[GitignoreRule]:
+    '''
+    Reads and parses the .gitignore file of the specified directory, if there is one.
+
+    Args:
+        directory:
+
+    Returns:
+
+    '''
+
+    gitignore_path = os.path.join(directory, '.gitignore')
+
+    try:
+        with open(gitignore_path, 'r', errors='replace') as f:
+            gitignore_lines = f.readlines()
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return []
+
+    logger.debug('Read .gitignore file %s.', gitignore_path)
+
+    return parse_gitignore_lines(gitignore_lines)
+
+
+def is_gitignored(relative_path: str,
+                  is_directory: bool,
+                  gitignore_rules: List[GitignoreRule],
+                  is_ignored: bool = False) -> bool:
+    '''
+    Checks the specified '/' separated path, relative to the directory of the gitignore rules, against the rules. The
+    last matching rule decides. If no rule matches, the specified is_ignored default is returned, which allows chaining
+    the rules of nested .gitignore files.
+
+    Args:
+        relative_path:
+        is_directory:
+        gitignore_rules:
+        is_ignored:
+
+    Returns:
+
+    '''
+
+    for gitignore_regex, is_negated, is_directory_only in gitignore_rules:
+        if is_directory_only and not is_directory:
+            continue
+
+        if gitignore_regex.match(relative_path):
+            is_ignored = not is_negated
+
+    return is_ignored
+
+
+def matches_glob_patterns(relative_path: str,
+                          glob_patterns: List[str]) -> bool:
+    '''
+    Checks whether the specified '/' separated relative path matches any of the specified glob patterns. Patterns
+    without a '/' are matched against the path's final component (e.g. 'venv' or 'test_*.py'), all other patterns
+    against the full relative path (e.g. 'src/legacy/*').
+
+    Args:
+        relative_path:
+        glob_patterns:
+
+    Returns:
+
+    '''
+
+    path_name = relative_path.rsplit('/', 1)[-1]
+
+    for glob_pattern in glob_patterns:
+        if '/' in glob_pattern:
+            if fnmatch.fnmatchcase(relative_path, glob_pattern.strip('/')):
+                return True
+        elif fnmatch.fnmatchcase(path_name, glob_pattern):
+            return True
+
+    return False
@@ -1,9 +1,12 @@
+from typing import Dict, List, Optional
+
 import pandas as pd
 import schemdraw
-from schemdraw import flow
+from schemdraw import elements, flow
 
 from graphit.settings import (
     logger,
+    DEBUG,
     FLOW_CHART_FONT_SIZE,
     FLOW_CHART_X_STEP_SMALL,
     FLOW_CHART_X_STEP_STANDARD,
@@ -12,10 +15,11 @@ from graphit.settings import (
     FLOW_CHART_ELEMENT_WIDTH_STANDARD,
     FLOW_CHART_SIZE_Y,
     FLOW_CHART_CIRCLE_COLOR,
-    FLOW_CHART_COLOR_PALETTE,
     FLOW_CHART_FRAME_WIDTH,
     FLOW_CHART_LINE_WIDTH
 )
+from graphit.utils.flow_chart_helpers import get_module_colors, get_function_handle_label, get_next_graph_index_nested, \
+    get_next_graph_index_sequential
 
 
 def add_color_palette(graph_meta_data: pd.DataFrame):
@@ -32,27 +36,14 @@ def add_color_palette(graph_meta_data: pd.DataFrame):
 
     '''
 
-    color_palette = pd.DataFrame(enumerate(FLOW_CHART_COLOR_PALETTE),
-                                 columns=['index','color'])
-
-    logger.debug(f'Using color palette: {color_palette}')
-
-    graph_meta_data_modules = graph_meta_data[['target_function_module_import_path']]. \
-        drop_duplicates('target_function_module_import_path'). \
-        sort_values('target_function_module_import_path',ascending=True)
+    # cycle through the color palette if there are more modules than colors
+    module_colors = get_module_colors(graph_meta_data['target_function_module_import_path'].tolist())
 
-    graph_meta_data_modules['index'] = range(len(graph_meta_data_modules))
+    logger.debug('Using module colors: %s', module_colors)
 
-    graph_meta_data_modules = graph_meta_data_modules.merge(color_palette,
-                                                            how='left',
-                                                            on='index'). \
-        drop('index',axis=1)
+    graph_meta_data = graph_meta_data.assign(color=graph_meta_data['target_function_module_import_path'].map(module_colors))
 
-    graph_meta_data = graph_meta_data.merge(graph_meta_data_modules,
-                                            how='left',
-                                            on='target_function_module_import_path')
-
-    logger.debug(f'Graph meta data with added color palette: {graph_meta_data}')
+    logger.debug('Graph meta data with added color palette: %s', graph_meta_data)
 
     return graph_meta_data
 
@@ -71,9 +62,13 @@ def draw_horizontal_elements(drawing: schemdraw.Drawing,
 
     drawn_graph_data_list = []
 
+    # checked once, so that the debug logging in the loop below costs nothing when disabled
+    is_debug_logging = logger.isEnabledFor(DEBUG)
+
     for graph_meta_data_record in graph_meta_data.itertuples():
 
-        logger.debug(f'Processing flow chart element sequence: {graph_meta_data_record}')
+        if is_debug_logging:
+            logger.debug('Processing flow chart element sequence: %s', graph_meta_data_record)
 
         drawn_graph_data_record = {'target_function_graph_index': graph_meta_data_record.target_function_graph_index}
 
@@ -88,7 +83,7 @@ def draw_horizontal_elements(drawing: schemdraw.Drawing,
             fill(color=graph_meta_data_record.color). \
             style(lw=FLOW_CHART_FRAME_WIDTH). \
             at([function_handle_box_position_x, function_handle_box_position_y]). \
-            label(fontsize=FLOW_CHART_FONT_SIZE,label=graph_meta_data_record.target_function_handle)
+            label(fontsize=FLOW_CHART_FONT_SIZE,label=get_function_handle_label(graph_meta_data_record))
 
         drawing.add(function_handle_box)
 
@@ -151,55 +146,6 @@ def draw_horizontal_elements(drawing: schemdraw.Drawing,
 
     return drawn_graph_meta_data
 
-def get_next_graph_index_nested(graph_index: str) -> str:
-    '''
-    Utility function that generates the next, nested graph index number for a given graph index. i.e., for
-    - '1.2', this function returns '1.2.1'
-    - '2.7', this function returns '2.7.1'
-    - '1', this function returns '1.1'
-    - '3.1.2.2', this function returns '3.1.2.2.1'
-
-    Args:
-        graph_index:
-
-    Returns:
-
-    '''
-
-    if graph_index:
-        next_graph_index = f'{graph_index}.1'
-    else:
-        next_graph_index = '1'
-
-    return next_graph_index
-
-def get_next_graph_index_sequential(graph_index: str) -> str:
-    '''
-    Utility function that generates the next, sequential graph index number for a given graph index. i.e., for
-    - '1.2', this function returns '1.3'
-    - '2.7', this function returns '2.8'
-    - '1', this function returns '2'
-    - '3.1.2.2', this function returns '3.1.2.3'
-
-    Args:
-        graph_index:
-
-    Returns:
-
-    '''
-
-    # generation 2 and above
-    if '.' in graph_index:
-        fixed_generations = '.'.join(graph_index.split('.')[:-1])
-        next_graph_index = f'{fixed_generations}.{int(graph_index.split(".")[-1])+1}'
-    # generation 1
-    elif graph_index:
-        next_graph_index = str(int(graph_index) + 1)
-    else:
-        next_graph_index = 'n/a'
-
-    return next_graph_index
-
 def draw_vertical_elements(drawing: schemdraw.Drawing,
                            drawn_graph_meta_data: pd.DataFrame) -> None:
     '''
@@ -235,22 +181,31 @@ def draw_vertical_elements(drawing: schemdraw.Drawing,
     '''
 
 
+    # index the drawn graph index circles by their graph index once, so that finding the successors of each record
+    # is a constant time look up. graphs consisting of only the root function don't have any graph index circles
+    if 'graph_index_node' in drawn_graph_meta_data.columns:
+        drawn_graph_index_nodes = dict(zip(drawn_graph_meta_data['target_function_graph_index'].tolist(),
+                                           drawn_graph_meta_data['graph_index_node'].tolist()))
+    else:
+        drawn_graph_index_nodes = {}
+
+    is_debug_logging = logger.isEnabledFor(DEBUG)
+
     for graph_meta_data_record in drawn_graph_meta_data.itertuples():
 
         # cover the vertical arrows going from e.g. '1.2' -> '1.2.1'
         next_graph_index_nested = get_next_graph_index_nested(graph_meta_data_record.target_function_graph_index)
 
-        if next_graph_index_nested in drawn_graph_meta_data.target_function_graph_index.tolist():
-            logger.debug(f'Next graph index (nested): {next_graph_index_nested}')
-
-            next_graph_meta_data_record = drawn_graph_meta_data.loc[
-                drawn_graph_meta_data.target_function_graph_index == next_graph_index_nested]
+        if next_graph_index_nested in drawn_graph_index_nodes:
+            if is_debug_logging:
+                logger.debug('Next graph index (nested): %s', next_graph_index_nested)
 
             # draw arrow from function handle box of current record to graph index circle of next record
             current_node = graph_meta_data_record.function_handle_node
-            next_node = next_graph_meta_data_record.graph_index_node.values[0]
+            next_node = drawn_graph_index_nodes[next_graph_index_nested]
 
-            logger.debug(f'Drawing vertical element from {current_node} to {next_node}')
+            if is_debug_logging:
+                logger.debug('Drawing vertical element from %s to %s', current_node, next_node)
 
             # draw the vertical arrow element between the identified nodes
             vertical_arrow = flow.Arrow().style(lw=FLOW_CHART_LINE_WIDTH).at(current_node.S).to(next_node.N)
@@ -260,17 +215,16 @@ def draw_vertical_elements(drawing: schemdraw.Drawing,
         next_graph_index_sequential = get_next_graph_index_sequential(
             graph_meta_data_record.target_function_graph_index)
 
-        if next_graph_index_sequential in drawn_graph_meta_data.target_function_graph_index.tolist():
-            logger.debug(f'Next graph index (sequential): {next_graph_index_sequential}')
-
-            next_graph_meta_data_record = drawn_graph_meta_data.loc[
-                drawn_graph_meta_data.target_function_graph_index == next_graph_index_sequential]
+        if next_graph_index_sequential in drawn_graph_index_nodes:
+            if is_debug_logging:
+                logger.debug('Next graph index (sequential): %s', next_graph_index_sequential)
 
             # draw arrow from graph index circle of current record to graph index circle of next record
             current_node = graph_meta_data_record.graph_index_node
-            next_node = next_graph_meta_data_record.graph_index_node.values[0]
+            next_node = drawn_graph_index_nodes[next_graph_index_sequential]
 
-            logger.debug(f'Drawing vertical element from {current_node} to {next_node}')
+            if is_debug_logging:
+                logger.debug('Drawing vertical element from %s to %s', current_node, next_node)
 
             # draw the vertical arrow element between the identified nodes
             vertical_arrow = flow.Arrow().style(lw=FLOW_CHART_LINE_WIDTH).at(current_node.S).to(next_node.N)
@@ -279,13 +233,42 @@ def draw_vertical_elements(drawing: schemdraw.Drawing,
     return drawing
 
 
-def plot_project_graph(graph_meta_data: pd.DataFrame) -> schemdraw.Drawing:
+def draw_continuation_markers(drawing: schemdraw.Drawing,
+                              continuation_markers: List[Dict]) -> None:
+    '''
+    Utility function that draws the passed continuation markers of a flow chart page onto the passed drawing object,
+    i.e. a short arrow with a label referencing the graph index and page at the other end, see
+    graphit.utils.flow_chart_helpers.split_flow_chart_into_pages.
+
+    Args:
+        drawing:
+        continuation_markers:
+
+    Returns:
+
+    '''
+
+    for continuation_marker in continuation_markers:
+        drawing.add(flow.Arrow().style(lw=FLOW_CHART_LINE_WIDTH).
+                    at(continuation_marker['start']).
+                    to(continuation_marker['end']))
+        drawing.add(elements.Label().
+                    at(continuation_marker['label_position']).
+                    label(continuation_marker['label'], fontsize=FLOW_CHART_FONT_SIZE))
+
+
+def plot_project_graph(graph_meta_data: pd.DataFrame,
+                       continuation_markers: Optional[List[Dict]] = None) -> schemdraw.Drawing:
     '''
     Utility function that takes in the graph meta data and generates a visualization of the format shown in
     https://miro.com/app/board/uXjVPNNbgDk=/
 
+    If the graph meta data is a page of a larger flow chart, the continuation markers of the page's vertical arrows to
+    and from other pages are drawn, too.
+
     Args:
         graph_meta_data:
+        continuation_markers:
 
     Returns:
 
@@ -293,18 +276,23 @@ def plot_project_graph(graph_meta_data: pd.DataFrame) -> schemdraw.Drawing:
 
     graph_meta_data = add_color_palette(graph_meta_data)
 
-    with schemdraw.Drawing() as drawing:
+    # the drawing is deliberately not used as a context manager: inside a `with` block, schemdraw checks every newly
+    # created element against all elements already added to the drawing, which makes drawing quadratic in the number
+    # of elements. all elements are explicitly added to the drawing instead, and rendering happens when saving
+    drawing = schemdraw.Drawing(show=False)
 
+    drawn_graph_meta_data = draw_horizontal_elements(drawing=drawing,
+                                                     graph_meta_data=graph_meta_data)
 
-        drawn_graph_meta_data = draw_horizontal_elements(drawing=drawing,
-                                                         graph_meta_data=graph_meta_data)
+    logger.debug('Drawn horizontal elements in graph; meta data: %s', drawn_graph_meta_data)
 
-        logger.debug(f'Drawn horizontal elements in graph; meta data: {drawn_graph_meta_data}')
+    full_drawing = draw_vertical_elements(drawing=drawing,
+                                          drawn_graph_meta_data=drawn_graph_meta_data)
 
-        full_drawing = draw_vertical_elements(drawing=drawing,
-                                              drawn_graph_meta_data=drawn_graph_meta_data)
+    logger.debug('Drawn vertical and horizontal elements in graph.')
 
-        logger.debug(f'Drawn vertical and horizontal elements in graph.')
+    draw_continuation_markers(drawing=full_drawing,
+                              continuation_markers=continuation_markers or [])
 
 
     return full_drawing
@@ -0,0 +1,589 @@
+import glob
+import os
+import shutil
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+
+import pandas as pd
+
+from graphit.settings import logger, GRAPH_EXPANSION_MODE_FULL, GRAPH_EXPANSION_MODE_MEMOIZED, \
+    GRAPH_ROOT_TASKS_IN_FLIGHT_PER_JOB, EXPORT_FORMAT_CSV, GRAPH_META_DATA_DATASET_ROWS_PER_PART, \
+    FLOW_CHART_RENDERER_SCHEMDRAW, FLOW_CHART_RENDERER_SVG, FLOW_CHART_MAX_ROWS_PER_PAGE
+from graphit.utils.export_helpers import export_graph_meta_data_part
+from graphit.utils.flow_chart_helpers import split_flow_chart_into_pages, write_flow_chart_index_page
+from graphit.utils.meta_data_helpers import create_graph_meta_data, get_exported_graph_meta_data
+
+# the meta data shared by all graph root exports of a worker process. set once per process by
+# initialize_graph_root_worker, so that the tables don't have to be sent along with every single graph root
+graph_root_worker_meta_data = {}
+
+
+def estimate_graph_sizes(graph_root_function_ids: List[str],
+                         function_adjacency_index: Dict[str, List[Tuple[str, int]]],
+                         graph_expansion_mode: str = GRAPH_EXPANSION_MODE_FULL) -> Dict[str, int]:
+    '''
+    Utility function that estimates the number of graph meta data records of each of the specified graph roots, i.e.
+    - in the 'full' expansion mode, the number of nodes of the root's (cycle free) dependency tree
+    - in the 'memoized' expansion mode, the number of dependencies reachable from the root, plus one for the root itself
+
+    Args:
+        graph_root_function_ids:
+        function_adjacency_index:
+        graph_expansion_mode:
+
+    Returns:
+
+    '''
+
+    graph_sizes = {}
+
+    if graph_expansion_mode == GRAPH_EXPANSION_MODE_MEMOIZED:
+        for graph_root_function_id in graph_root_function_ids:
+            reachable_function_ids = {graph_root_function_id}
+            function_id_stack = [graph_root_function_id]
+            n_reachable_dependencies = 0
+
+            while function_id_stack:
+                function_dependencies = function_adjacency_index.get(function_id_stack.pop(), [])
+                n_reachable_dependencies += len(function_dependencies)
+
+                for function_dependency_id, _ in function_dependencies:
+                    if function_dependency_id not in reachable_function_ids:
+                        reachable_function_ids.add(function_dependency_id)
+                        function_id_stack.append(function_dependency_id)
+
+            graph_sizes[graph_root_function_id] = n_reachable_dependencies + 1
+
+        return graph_sizes
+
+    # tree sizes are computed bottom up (post order) and shared between roots. calls back into a function whose tree
+    # size is still being computed close a cycle and count as a single node
+    tree_sizes = {}
+
+    for graph_root_function_id in graph_root_function_ids:
+        function_id_stack = [(graph_root_function_id, False)]
+        in_progress_function_ids = set()
+
+        while function_id_stack:
+            function_id, is_expanded = function_id_stack.pop()
+
+            if is_expanded:
+                tree_sizes[function_id] = 1 + sum([tree_sizes.get(function_dependency_id, 1)
+                                                   for function_dependency_id, _ in function_adjacency_index.get(function_id, [])])
+                in_progress_function_ids.discard(function_id)
+            elif function_id not in tree_sizes and function_id not in in_progress_function_ids:
+                in_progress_function_ids.add(function_id)
+                function_id_stack.append((function_id, True))
+                function_id_stack.extend([(function_dependency_id, False)
+                                          for function_dependency_id, _ in function_adjacency_index.get(function_id, [])])
+
+        graph_sizes[graph_root_function_id] = tree_sizes[graph_root_function_id]
+
+    return graph_sizes
+
+
+def get_graph_root_output_file_paths(graph_root_function_id: str,
+                                     output_directory: Path) -> Tuple[str, str]:
+    '''
+    Returns the file paths of the csv graph meta data and the diagram exported for the specified graph root.
+
+    Args:
+        graph_root_function_id:
+        output_directory:
+
+    Returns:
+
+    '''
+
+    return (os.path.join(output_directory, f'graphit_{graph_root_function_id}_graph_meta_data.csv'),
+            os.path.join(output_directory, f'graphit_{graph_root_function_id}_graph_root_diagram.svg'))
+
+
+def get_graph_root_page_file_paths(graph_root_function_id: str,
+                                   output_directory: Path,
+                                   n_pages: int) -> Tuple[List[str], str]:
+    '''
+    Returns the file paths of the diagram pages and of the index page exported for the specified graph root, if its
+    flow chart is split into the specified number of pages.
+
+    Args:
+        graph_root_function_id:
+        output_directory:
+        n_pages:
+
+    Returns:
+
+    '''
+
+    return ([os.path.join(output_directory, f'graphit_{graph_root_function_id}_graph_root_diagram_page_{page_index + 1}.svg')
+             for page_index in range(n_pages)],
+            os.path.join(output_directory, f'graphit_{graph_root_function_id}_graph_root_diagram_index.html'))
+
+
+def remove_graph_root_diagram_pages(graph_root_function_id: str,
+                                    output_directory: Path) -> None:
+    '''
+    Removes the diagram pages and the index page exported for the specified graph root, if any.
+
+    Args:
+        graph_root_function_id:
+        output_directory:
+
+    Returns:
+
+    '''
+
+    _, index_file_path = get_graph_root_page_file_paths(graph_root_function_id, output_directory, 0)
+    page_file_paths = glob.glob(os.path.join(glob.escape(str(output_directory)),
+                                             f'graphit_{graph_root_function_id}_graph_root_diagram_page_*.svg'))
+
+    for graph_root_output_file_path in page_file_paths + [index_file_path]:
+        try:
+            os.remove(graph_root_output_file_path)
+        except FileNotFoundError:
+            pass
+
+
+def remove_graph_root_outputs(graph_root_function_ids: List[str],
+                              output_directory: Path) -> None:
+    '''
+    Removes the files exported for the specified graph roots, e.g. for functions that are no longer graph roots.
+
+    Args:
+        graph_root_function_ids:
+        output_directory:
+
+    Returns:
+
+    '''
+
+    for graph_root_function_id in graph_root_function_ids:
+        for graph_root_output_file_path in get_graph_root_output_file_paths(graph_root_function_id, output_directory):
+            try:
+                os.remove(graph_root_output_file_path)
+            except FileNotFoundError:
+                pass
+
+        remove_graph_root_diagram_pages(graph_root_function_id, output_directory)
+
+        logger.debug('Removed the outputs of graph root %s.', graph_root_function_id)
+
+
+def link_graph_root_outputs(graph_root_function_id: str,
+                            baseline_directory: Path,
+                            output_directory: Path,
+                            export_diagrams: bool = True) -> bool:
+    '''
+    Reuses the files a previous run exported for the specified graph root to the baseline directory, by hard linking
+    them into the output directory (or copying them, where hard links are not possible, e.g. across filesystems).
+    Returns whether all outputs of the graph root were found in the baseline directory, i.e. its csv graph meta data
+    and, if export_diagrams is set, its diagram or diagram pages. If not, nothing is linked and the graph root needs to
+    be exported.
+
+    Args:
+        graph_root_function_id:
+        baseline_directory:
+        output_directory:
+        export_diagrams:
+
+    Returns:
+
+    '''
+
+    baseline_meta_data_file_path, baseline_diagram_file_path = get_graph_root_output_file_paths(graph_root_function_id,
+                                                                                                baseline_directory)
+    _, baseline_index_file_path = get_graph_root_page_file_paths(graph_root_function_id, baseline_directory, 0)
+
+    baseline_file_paths = [baseline_meta_data_file_path]
+
+    if export_diagrams:
+        if os.path.exists(baseline_index_file_path):
+            baseline_file_paths.append(baseline_index_file_path)
+            baseline_file_paths.extend(glob.glob(os.path.join(glob.escape(str(baseline_directory)),
+                                                              f'graphit_{graph_root_function_id}_graph_root_diagram_page_*.svg')))
+        else:
+            baseline_file_paths.append(baseline_diagram_file_path)
+
+    if not all([os.path.exists(baseline_file_path) for baseline_file_path in baseline_file_paths]):
+        return False
+
+    for baseline_file_path in baseline_file_paths:
+        output_file_path = os.path.join(output_directory, os.path.basename(baseline_file_path))
+
+        try:
+            os.link(baseline_file_path, output_file_path)
+        except OSError:
+            shutil.copy2(baseline_file_path, output_file_path)
+
+    logger.debug('Linked the outputs of graph root %s from the baseline %s.', graph_root_function_id, baseline_directory)
+
+    return True
+
+
+def initialize_graph_root_worker(module_meta_data: pd.DataFrame,
+                                 function_meta_data: pd.DataFrame,
+                                 function_adjacency_index: Dict[str, List[Tuple[str, int]]]) -> None:
+
+    graph_root_worker_meta_data.update(module_meta_data=module_meta_data,
+                                       function_meta_data=function_meta_data,
+                                       function_adjacency_index=function_adjacency_index)
+
+
+def render_flow_chart_page(flow_chart_page: Dict,
+                           diagram_file_path: str,
+                           renderer: str = FLOW_CHART_RENDERER_SCHEMDRAW,
+                           page_file_paths: Optional[List[str]] = None) -> None:
+    '''
+    Renders the specified page of a flow chart, see graphit.utils.flow_chart_helpers.split_flow_chart_into_pages, to the
+    specified svg file. Pages don't depend on each other, so they can be rendered in any order and in parallel.
+
+    Args:
+        flow_chart_page:
+        diagram_file_path:
+        renderer:
+        page_file_paths: The file paths of all pages, to link the continuation markers with (svg renderer only)
+
+    Returns:
+
+    '''
+
+    if renderer == FLOW_CHART_RENDERER_SVG:
+        from graphit.utils.svg_helpers import render_svg_flow_chart
+
+        render_svg_flow_chart(graph_meta_data=flow_chart_page['graph_meta_data'],
+                              svg_file_path=diagram_file_path,
+                              continuation_markers=flow_chart_page['continuation_markers'],
+                              page_file_paths=page_file_paths)
+    else:
+        # imported lazily, since schemdraw (and matplotlib behind it) takes long to import
+        from graphit.utils.graph_helpers import plot_project_graph
+
+        diagram = plot_project_graph(graph_meta_data=flow_chart_page['graph_meta_data'],
+                                     continuation_markers=flow_chart_page['continuation_markers'])
+        diagram.save(diagram_file_path)
+
+
+def render_flow_chart_pages(flow_chart_pages: List[Dict],
+                            diagram_file_paths: List[str],
+                            renderer: str = FLOW_CHART_RENDERER_SCHEMDRAW,
+                            n_jobs: int = 1) -> None:
+    '''
+    Renders the specified pages of a flow chart to the specified svg files, on a process pool if more than one job is
+    specified.
+
+    Args:
+        flow_chart_pages:
+        diagram_file_paths:
+        renderer:
+        n_jobs:
+
+    Returns:
+
+    '''
+
+    page_file_paths = diagram_file_paths if len(flow_chart_pages) > 1 else None
+
+    if n_jobs <= 1 or len(flow_chart_pages) <= 1:
+        for flow_chart_page, diagram_file_path in zip(flow_chart_pages, diagram_file_paths):
+            render_flow_chart_page(flow_chart_page, diagram_file_path, renderer, page_file_paths)
+
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        list(executor.map(partial(render_flow_chart_page, renderer=renderer, page_file_paths=page_file_paths),
+                          flow_chart_pages,
+                          diagram_file_paths))
+
+
+def export_graph_root(graph_root_function_id: str,
+                      output_directory: Path,
+                      graph_expansion_mode: str = GRAPH_EXPANSION_MODE_FULL,
+                      export_format: str = EXPORT_FORMAT_CSV,
+                      export_diagrams: bool = True,
+                      renderer: str = FLOW_CHART_RENDERER_SCHEMDRAW,
+                      max_rows_per_page: int = FLOW_CHART_MAX_ROWS_PER_PAGE,
+                      n_page_jobs: int = 1,
+                      max_depth: Optional[int] = None,
+                      max_nodes: Optional[int] = None,
+                      profile: bool = False) -> Dict:
+    '''
+    Creates, exports and plots the graph meta data of the specified graph root, using the meta data set by
+    initialize_graph_root_worker. Returns the number of graph meta data records and the timings of all steps. If profile
+    is set, the peak memory allocated while exporting the graph root is returned, too. If export_diagrams is not set,
+    the graph meta data is exported without plotting the flow chart, and schemdraw is never imported. The flow chart is
+    plotted with schemdraw, or streamed straight to the svg file with the svg renderer, see
+    graphit.utils.svg_helpers.render_svg_flow_chart.
+
+    Flow charts with more than max_rows_per_page rows are split into pages, which are exported as separate svg files
+    along with a html index page linking them, and rendered on n_page_jobs processes.
+
+    The graph is only expanded up to max_depth calls away from the graph root and up to max_nodes records, see
+    graphit.utils.meta_data_helpers.create_graph_meta_data.
+
+    In the csv export format, the graph meta data is exported to its own file. In the columnar export formats, the graph
+    meta data is returned instead, so that the graph meta data of many graph roots can be exported together as part of
+    the graph meta data dataset.
+
+    Args:
+        graph_root_function_id:
+        output_directory:
+        graph_expansion_mode:
+        export_format:
+        export_diagrams:
+        renderer:
+        max_rows_per_page:
+        n_page_jobs:
+        max_depth:
+        max_nodes:
+        profile:
+
+    Returns:
+
+    '''
+
+    if profile:
+        is_tracing_memory = tracemalloc.is_tracing()
+
+        if is_tracing_memory:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+
+    graph_root_export_start, graph_root_export_cpu_start = time.perf_counter(), time.process_time()
+
+    # create graph meta data for current root function node
+    graph_meta_data = create_graph_meta_data(root_function_reference_id=graph_root_function_id,
+                                             module_meta_data=graph_root_worker_meta_data['module_meta_data'],
+                                             function_meta_data=graph_root_worker_meta_data['function_meta_data'],
+                                             function_adjacency_index=graph_root_worker_meta_data['function_adjacency_index'],
+                                             graph_expansion_mode=graph_expansion_mode,
+                                             max_depth=max_depth,
+                                             max_nodes=max_nodes)
+
+    graph_root_build_end = time.perf_counter()
+
+    graph_root_meta_data_filepath, graph_root_diagram_filepath = get_graph_root_output_file_paths(graph_root_function_id,
+                                                                                                  output_directory)
+
+    exported_graph_meta_data = get_exported_graph_meta_data(graph_meta_data,
+                                                            graph_expansion_mode=graph_expansion_mode,
+                                                            max_depth=max_depth,
+                                                            max_nodes=max_nodes)
+
+    if export_format == EXPORT_FORMAT_CSV:
+        exported_graph_meta_data.to_csv(graph_root_meta_data_filepath, index=False)
+        logger.debug('Exported graph root %s meta data to: %s', graph_root_function_id, graph_root_meta_data_filepath)
+        graph_root_dataset_meta_data = None
+    else:
+        graph_root_dataset_meta_data = exported_graph_meta_data.copy()
+        graph_root_dataset_meta_data.insert(0, 'root_function_id', graph_root_function_id)
+
+    graph_root_export_end = time.perf_counter()
+
+    # plot flow chart for current root function node and export
+    n_pages = 0
+
+    if export_diagrams:
+        flow_chart_pages = split_flow_chart_into_pages(graph_meta_data, max_rows_per_page=max_rows_per_page)
+        n_pages = len(flow_chart_pages)
+
+        # a previous export of the graph root might have been split into a different number of pages
+        remove_graph_root_diagram_pages(graph_root_function_id, output_directory)
+
+        if n_pages == 1:
+            render_flow_chart_pages(flow_chart_pages, [graph_root_diagram_filepath], renderer=renderer)
+            logger.debug('Exported graph diagram for root %s to %s.', graph_root_function_id, graph_root_diagram_filepath)
+        else:
+            page_file_paths, index_file_path = get_graph_root_page_file_paths(graph_root_function_id, output_directory, n_pages)
+
+            if os.path.exists(graph_root_diagram_filepath):
+                os.remove(graph_root_diagram_filepath)
+
+            render_flow_chart_pages(flow_chart_pages, page_file_paths, renderer=renderer, n_jobs=n_page_jobs)
+            write_flow_chart_index_page(flow_chart_pages, page_file_paths, index_file_path,
+                                        title=f'graphit flow chart of {graph_meta_data["target_function_import_path"].iloc[0]}')
+            logger.debug('Exported %s graph diagram pages for root %s, indexed in %s.', n_pages, graph_root_function_id,
+                         index_file_path)
+
+    graph_root_render_end = time.perf_counter()
+
+    graph_root_export = {'graph_root_function_id': graph_root_function_id,
+                         'n_graph_records': len(graph_meta_data),
+                         'n_diagram_pages': n_pages,
+                         'build_time': graph_root_build_end - graph_root_export_start,
+                         'export_time': graph_root_export_end - graph_root_build_end,
+                         'render_time': graph_root_render_end - graph_root_export_end,
+                         'total_time': graph_root_render_end - graph_root_export_start,
+                         'cpu_time': time.process_time() - graph_root_export_cpu_start,
+                         'graph_meta_data': graph_root_dataset_meta_data}
+
+    if profile:
+        graph_root_export['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+
+        if not is_tracing_memory:
+            tracemalloc.stop()
+
+    return graph_root_export
+
+
+def log_graph_root_export(graph_root_export: Dict,
+                          n_exported_graph_roots: int,
+                          n_graph_roots: int) -> None:
+
+    logger.info(f'Exported graph root {n_exported_graph_roots}/{n_graph_roots}: '
+                f'{graph_root_export["graph_root_function_id"]} ({graph_root_export["n_graph_records"]} records) in '
+                f'{graph_root_export["total_time"]:.2f}s (build: {graph_root_export["build_time"]:.2f}s, '
+                f'export: {graph_root_export["export_time"]:.2f}s, render: {graph_root_export["render_time"]:.2f}s).')
+
+
+def export_all_graph_roots(graph_root_function_ids: List[str],
+                           module_meta_data: pd.DataFrame,
+                           function_meta_data: pd.DataFrame,
+                           function_adjacency_index: Dict[str, List[Tuple[str, int]]],
+                           output_directory: Path,
+                           graph_expansion_mode: str = GRAPH_EXPANSION_MODE_FULL,
+                           export_format: str = EXPORT_FORMAT_CSV,
+                           n_jobs: int = 1,
+                           export_diagrams: bool = True,
+                           renderer: str = FLOW_CHART_RENDERER_SCHEMDRAW,
+                           max_rows_per_page: int = FLOW_CHART_MAX_ROWS_PER_PAGE,
+                           max_depth: Optional[int] = None,
+                           max_nodes: Optional[int] = None,
+                           profile: bool = False) -> List[Dict]:
+    '''
+    Creates, exports and plots the graph meta data of all specified graph roots. With the adjacency index inverted (see
+    graphit.utils.meta_data_helpers.create_reverse_function_adjacency_index), the caller trees of the graph roots are
+    exported instead.
+
+    With more than one job, the graph roots are processed on a process pool. The shared meta data tables are sent to
+    each worker process once, when the worker starts. Graph roots are submitted largest estimated graph first, so that
+    the largest graphs don't end up holding up the end of the run, and only a bounded number of graph roots is in
+    flight at any time, which bounds the memory held by pending results. With a single graph root, the pages of its
+    flow chart are rendered on the process pool instead.
+
+    In the columnar export formats, the graph meta data of all graph roots is collected and exported as one dataset
+    with a root_function_id column, split into parts of roughly GRAPH_META_DATA_DATASET_ROWS_PER_PART rows.
+
+    Args:
+        graph_root_function_ids:
+        module_meta_data:
+        function_meta_data:
+        function_adjacency_index:
+        output_directory:
+        graph_expansion_mode:
+        export_format:
+        n_jobs:
+        export_diagrams: See export_graph_root
+        renderer: See export_graph_root
+        max_rows_per_page: See export_graph_root
+        max_depth: See export_graph_root
+        max_nodes: See export_graph_root
+        profile: See export_graph_root
+
+    Returns:
+
+    '''
+
+    graph_sizes = estimate_graph_sizes(graph_root_function_ids=graph_root_function_ids,
+                                       function_adjacency_index=function_adjacency_index,
+                                       graph_expansion_mode=graph_expansion_mode)
+
+    # graphs are never larger than the node budget
+    scheduled_graph_root_function_ids = sorted(graph_root_function_ids,
+                                               key=lambda graph_root_function_id: min(graph_sizes[graph_root_function_id],
+                                                                                      max_nodes or graph_sizes[graph_root_function_id]),
+                                               reverse=True)
+
+    graph_root_exports = []
+    graph_meta_data_buffer = []
+    n_graph_meta_data_parts = 0
+
+    def collect_graph_root_export(graph_root_export: Dict,
+                                  flush: bool = False) -> None:
+        # record and log the completed graph root, and export the buffered graph meta data tables as the next part of
+        # the dataset once there are enough rows
+        nonlocal graph_meta_data_buffer, n_graph_meta_data_parts
+
+        if graph_root_export is not None:
+            graph_meta_data = graph_root_export.pop('graph_meta_data')
+            graph_root_exports.append(graph_root_export)
+            log_graph_root_export(graph_root_export, len(graph_root_exports), len(graph_root_function_ids))
+
+            if graph_meta_data is not None:
+                graph_meta_data_buffer.append(graph_meta_data)
+
+        n_buffered_rows = sum([len(buffered_graph_meta_data) for buffered_graph_meta_data in graph_meta_data_buffer])
+
+        if graph_meta_data_buffer and (flush or n_buffered_rows >= GRAPH_META_DATA_DATASET_ROWS_PER_PART):
+            export_graph_meta_data_part(graph_meta_data_list=graph_meta_data_buffer,
+                                        output_directory=output_directory,
+                                        part_index=n_graph_meta_data_parts,
+                                        export_format=export_format)
+            graph_meta_data_buffer = []
+            n_graph_meta_data_parts += 1
+
+    # only the columns needed for the graph meta data need to be shared
+    function_meta_data = function_meta_data[['unique_reference_id', 'function_handle', 'source_module_reference_id']]
+
+    if n_jobs <= 1 or len(graph_root_function_ids) <= 1:
+        initialize_graph_root_worker(module_meta_data, function_meta_data, function_adjacency_index)
+
+        for graph_root_function_id in scheduled_graph_root_function_ids:
+            collect_graph_root_export(export_graph_root(graph_root_function_id=graph_root_function_id,
+                                                        output_directory=output_directory,
+                                                        graph_expansion_mode=graph_expansion_mode,
+                                                        export_format=export_format,
+                                                        export_diagrams=export_diagrams,
+                                                        renderer=renderer,
+                                                        max_rows_per_page=max_rows_per_page,
+                                                        n_page_jobs=n_jobs,
+                                                        max_depth=max_depth,
+                                                        max_nodes=max_nodes,
+                                                        profile=profile))
+
+        collect_graph_root_export(None, flush=True)
+
+        return graph_root_exports
+
+    logger.info(f'Exporting {len(graph_root_function_ids)} graph roots using {n_jobs} processes.')
+
+    max_in_flight = n_jobs * GRAPH_ROOT_TASKS_IN_FLIGHT_PER_JOB
+    pending_graph_root_function_ids = iter(scheduled_graph_root_function_ids)
+    in_flight_futures = set()
+
+    with ProcessPoolExecutor(max_workers=n_jobs,
+                             initializer=initialize_graph_root_worker,
+                             initargs=(module_meta_data, function_meta_data, function_adjacency_index)) as executor:
+        while True:
+            # top up the in flight window with the largest remaining graph roots
+            for graph_root_function_id in pending_graph_root_function_ids:
+                in_flight_futures.add(executor.submit(export_graph_root,
+                                                      graph_root_function_id=graph_root_function_id,
+                                                      output_directory=output_directory,
+                                                      graph_expansion_mode=graph_expansion_mode,
+                                                      export_format=export_format,
+                                                      export_diagrams=export_diagrams,
+                                                      renderer=renderer,
+                                                      max_rows_per_page=max_rows_per_page,
+                                                      max_depth=max_depth,
+                                                      max_nodes=max_nodes,
+                                                      profile=profile))
+
+                if len(in_flight_futures) >= max_in_flight:
+                    break
+
+            if not in_flight_futures:
+                break
+
+            completed_futures, in_flight_futures = wait(in_flight_futures, return_when=FIRST_COMPLETED)
+
+            for completed_future in completed_futures:
+                collect_graph_root_export(completed_future.result())
+
+    collect_graph_root_export(None, flush=True)
+
+    return graph_root_exports
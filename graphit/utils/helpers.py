@@ -1,9 +1,11 @@
+import hashlib
 import os
-import random
+from collections import Counter
 from datetime import datetime as dt
 from pathlib import Path
 from string import ascii_letters as letters
 from string import digits
+from typing import List
 
 from graphit.settings import logger
 
@@ -11,7 +13,9 @@ from graphit.settings import logger
 def create_output_directory(output_directory: Path) -> Path:
     '''
     Utility function that checks the existence of the specified directory and creates a timestamped subdirectory, where
-    possible.
+    possible. If the subdirectory already exists, e.g. because another run started within the same second, a counter
+    is appended, e.g. '2024-01-31 12-00-00_1'. Since creating a directory is atomic, concurrent runs never end up with
+    the same subdirectory.
 
     Args:
         output_directory:
@@ -23,9 +27,17 @@ def create_output_directory(output_directory: Path) -> Path:
     try:
         temp_output_subdir = f'{dt.strftime(dt.now(), "%Y-%m-%d %H-%M-%S")}'
         temp_output_dir = os.path.join(output_directory,temp_output_subdir)
-        os.mkdir(temp_output_dir)
+        n_existing_output_dirs = 0
 
-        logger.debug(f'Created the timestamped output directory {temp_output_dir}.')
+        while True:
+            try:
+                os.mkdir(temp_output_dir)
+                break
+            except FileExistsError:
+                n_existing_output_dirs += 1
+                temp_output_dir = os.path.join(output_directory, f'{temp_output_subdir}_{n_existing_output_dirs}')
+
+        logger.debug('Created the timestamped output directory %s.', temp_output_dir)
     except FileNotFoundError as e:
         logger.error(f'The specified output directory {output_directory} does not exist.')
         raise e
@@ -33,10 +45,41 @@ def create_output_directory(output_directory: Path) -> Path:
     return temp_output_dir
 
 
-def create_unique_reference_id() -> str:
+REFERENCE_ID_ALPHABET = letters + digits
+REFERENCE_ID_LENGTH = 20
+
+
+def create_unique_reference_id(reference_key: str) -> str:
     '''
-    Helper function that creates a 20 character unique id from alphanumeric characters
+    Helper function that creates a 20 character alphanumeric id from the specified reference key, e.g. a module's import
+    path or a function's qualified import path. The id is derived from the key's sha256 hash, so the same key always
+    produces the same id - across runs, machines and worker processes.
+    :param reference_key:
     :return:
     '''
 
-    return ''.join(random.choices(population=letters + digits,k=20))
\ No newline at end of file
+    reference_key_hash = int.from_bytes(hashlib.sha256(reference_key.encode()).digest(), 'big')
+
+    reference_id_characters = []
+
+    for _ in range(REFERENCE_ID_LENGTH):
+        reference_key_hash, character_index = divmod(reference_key_hash, len(REFERENCE_ID_ALPHABET))
+        reference_id_characters.append(REFERENCE_ID_ALPHABET[character_index])
+
+    return ''.join(reference_id_characters)
+
+
+def check_unique_reference_ids(reference_ids: List[str],
+                               reference_type: str = 'reference') -> None:
+    '''
+    Helper function that raises a ValueError if any of the specified reference ids occurs more than once.
+    :param reference_ids:
+    :param reference_type: Used in the error message only, e.g. 'module' or 'function'
+    :return:
+    '''
+
+    duplicate_reference_ids = [reference_id for reference_id, count in Counter(reference_ids).items() if count > 1]
+
+    if duplicate_reference_ids:
+        logger.error(f'Found {len(duplicate_reference_ids)} duplicate {reference_type} ids: {duplicate_reference_ids[:10]}')
+        raise ValueError(f'Duplicate {reference_type} ids: {duplicate_reference_ids[:10]}')
@@ -1,59 +1,88 @@
-from typing import List
+from itertools import chain
+from operator import attrgetter
+from typing import List, Dict, Optional, Union
 from typing import Tuple
 
+import numpy as np
 import pandas as pd
 
-from graphit.utils.model import RecordedModule, RecordedFunction
-from graphit.settings import logger
+from graphit.utils.records import ModuleRecord, FunctionRecord
+from graphit.settings import logger, GRAPH_EXPANSION_MODE_FULL, GRAPH_EXPANSION_MODE_MEMOIZED, \
+    GRAPH_NODE_TYPE_FUNCTION, GRAPH_NODE_TYPE_CYCLE, GRAPH_NODE_TYPE_REFERENCE, GRAPH_NODE_TYPE_TRUNCATED, GRAPH_NODE_COLUMNS
+from graphit.utils.symbol_helpers import get_module_symbol_path
 
 
-def create_function_and_module_meta_data(all_modules: List[RecordedModule],
-                                         all_functions: List[RecordedFunction]) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]:
+def create_meta_data_frame(meta_data_columns: Dict[str, Union[List, np.ndarray]]) -> pd.DataFrame:
     '''
-    Helper function that consolidates the module and function meta data in the form of lists of models into 3 data
-    frames:
-        - module_meta_data
-        - function_meta_data
-        - function_dependency_meta_data
+    Utility function that creates a meta data frame from the specified columns, in their order. Like data frames created
+    from an empty list of rows, meta data frames without rows have columns of dtype object, regardless of the columns'
+    dtypes.
+
     Args:
-        module_meta_data:
-        function_meta_data:
+        meta_data_columns:
 
     Returns:
 
     '''
 
-    # module meta data
-    module_meta_data = pd.DataFrame([record.dict() for record in all_modules])
+    meta_data = pd.DataFrame(meta_data_columns, columns=list(meta_data_columns))
 
-    # function meta data
-    function_meta_data = pd.DataFrame([record.dict() for record in all_functions])[['unique_reference_id',
-                                                                                    'function_handle',
-                                                                                    'source_module_reference_id',
-                                                                                    'definition_start_line_index',
-                                                                                    'definition_end_line_index',
-                                                                                    'definition_start_line_offset',
-                                                                                    'definition_end_line_offset',
-                                                                                    'ordered_function_calls']]
-    function_meta_data['n_dependency_functions'] = function_meta_data['ordered_function_calls'].apply(lambda x: len(x))
-    function_meta_data.drop('ordered_function_calls',inplace=True,axis=1)
+    if meta_data.empty:
+        return meta_data.astype(object)
 
-    # function meta data - with ranked function call entries
-    function_dependency_meta_data_elements = []
+    return meta_data
 
-    for function_record in all_functions:
-        function_record_dict = function_record.dict()
 
-        for function_record_calleable_index, function_record_calleable in enumerate(function_record_dict['ordered_function_calls']):
-            function_meta_data_element = function_record_dict.copy()
-            del function_meta_data_element['ordered_function_calls']
+def create_function_and_module_meta_data(all_modules: List[ModuleRecord],
+                                         all_functions: List[FunctionRecord]) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]:
+    '''
+    Helper function that consolidates the module and function meta data in the form of lists of records into 3 data
+    frames:
+        - module_meta_data
+        - function_meta_data
+        - function_dependency_meta_data
+    Args:
+        module_meta_data:
+        function_meta_data:
 
-            function_meta_data_element['function_dependency_index'] = function_record_calleable_index
-            function_meta_data_element['function_dependency_reference_id'] = function_record_calleable
+    Returns:
 
-            function_dependency_meta_data_elements.append(function_meta_data_element)
+    '''
 
-    function_dependency_meta_data = pd.DataFrame(function_dependency_meta_data_elements)[['unique_reference_id','function_dependency_reference_id','function_dependency_index']]
+    # module meta data
+    module_meta_data = create_meta_data_frame(dict([(column, list(map(attrgetter(column), all_modules)))
+                                                    for column in ['unique_reference_id',
+                                                                   'file_path',
+                                                                   'import_path',
+                                                                   'reference_directory']]))
+
+    # function meta data. the number of dependency functions is the length of each function's call list
+    function_calls = list(map(attrgetter('ordered_function_calls'), all_functions))
+    n_dependency_functions = np.fromiter(map(len, function_calls), dtype=np.int64, count=len(function_calls))
+
+    function_meta_data_columns = dict([(column, list(map(attrgetter(column), all_functions)))
+                                       for column in ['unique_reference_id',
+                                                      'function_handle',
+                                                      'source_module_reference_id',
+                                                      'definition_start_line_index',
+                                                      'definition_end_line_index',
+                                                      'definition_start_line_offset',
+                                                      'definition_end_line_offset']])
+    function_meta_data_columns['n_dependency_functions'] = n_dependency_functions
+    function_meta_data_columns['is_approximate'] = list(map(attrgetter('is_approximate'), all_functions))
+
+    function_meta_data = create_meta_data_frame(function_meta_data_columns)
+
+    # function meta data - with ranked function call entries. all call lists are flattened into a single array, along
+    # which each function's id is repeated once per call. the rank of each call is its position in the flattened array,
+    # minus the position of its function's first call
+    n_function_dependencies = int(n_dependency_functions.sum())
+    first_function_dependency_positions = np.cumsum(n_dependency_functions) - n_dependency_functions
+
+    function_dependency_meta_data = create_meta_data_frame(
+        {'unique_reference_id': np.repeat(np.array(function_meta_data_columns['unique_reference_id'], dtype=object), n_dependency_functions),
+         'function_dependency_reference_id': list(chain.from_iterable(function_calls)),
+         'function_dependency_index': np.arange(n_function_dependencies) - np.repeat(first_function_dependency_positions, n_dependency_functions)})
 
     logger.debug('Created all function and module meta data files for export.')
 
@@ -84,86 +113,219 @@ def get_graph_function_roots(function_meta_data: pd.DataFrame,
     return standalone_function_ids
 
 
+def get_target_function_ids(module_meta_data: pd.DataFrame,
+                            function_meta_data: pd.DataFrame,
+                            targets: List[str]) -> List[str]:
+    '''
+    Utility function that selects the function reference ids of the specified target functions. Each target is matched
+    against the trailing components of the functions' import paths, so it can be a full import path, e.g.
+    'graphit.utils.helpers.load' or 'utils.helpers.load' for the module 'utils.helpers', a partial one, e.g.
+    'helpers.load', or just the function handle, e.g. 'load'. A target matches all functions it fits, e.g. all 'load'
+    functions of the project.
+
+    Raises a ValueError if any of the targets doesn't match any function.
+
+    Args:
+        module_meta_data:
+        function_meta_data:
+        targets:
+
+    Returns:
+
+    '''
+
+    module_symbol_paths = dict([(module_id, get_module_symbol_path(module_import_path))
+                                for module_id, module_import_path in zip(module_meta_data['unique_reference_id'].tolist(),
+                                                                         module_meta_data['import_path'].tolist())])
+
+    # the import path of each function, split into its components, e.g. ['utils', 'helpers', 'load']
+    function_import_path_parts = [(function_id, [function_import_path_part for function_import_path_part in
+                                                 f'{module_symbol_paths.get(module_id, "")}.{function_handle}'.split('.')
+                                                 if function_import_path_part])
+                                  for function_id, function_handle, module_id in zip(function_meta_data['unique_reference_id'].tolist(),
+                                                                                     function_meta_data['function_handle'].tolist(),
+                                                                                     function_meta_data['source_module_reference_id'].tolist())]
+
+    target_function_ids = []
+
+    for target in targets:
+        target_parts = [target_part for target_part in target.split('.') if target_part]
+        matched_function_ids = [function_id for function_id, import_path_parts in function_import_path_parts
+                                if target_parts and import_path_parts[-len(target_parts):] == target_parts]
+
+        if not matched_function_ids:
+            raise ValueError(f'Target {target} does not match any function of the project.')
+
+        logger.debug('Target %s matches %s functions.', target, len(matched_function_ids))
+
+        target_function_ids.extend([function_id for function_id in matched_function_ids if function_id not in target_function_ids])
+
+    return target_function_ids
+
+
+def create_function_adjacency_index(function_dependency_meta_data: pd.DataFrame) -> Dict[str, List[Tuple[str, int]]]:
+    '''
+    Utility function that creates an index mapping each function reference id onto the ordered list of its
+    dependencies, i.e. (function_dependency_reference_id, function_dependency_index) tuples sorted by the dependency
+    index. Functions without dependencies are not included.
+
+    The index only needs to be built once per run and can then be shared by all graph roots.
+
+    Args:
+        function_dependency_meta_data:
+
+    Returns:
+
+    '''
+
+    function_adjacency_index = {}
+
+    for function_id, function_dependency_id, function_dependency_index in zip(
+            function_dependency_meta_data['unique_reference_id'].tolist(),
+            function_dependency_meta_data['function_dependency_reference_id'].tolist(),
+            function_dependency_meta_data['function_dependency_index'].tolist()):
+        function_adjacency_index.setdefault(function_id, []).append((function_dependency_id, function_dependency_index))
+
+    for function_dependencies in function_adjacency_index.values():
+        function_dependencies.sort(key=lambda function_dependency: function_dependency[1])
+
+    return function_adjacency_index
+
+
+def create_reverse_function_adjacency_index(function_adjacency_index: Dict[str, List[Tuple[str, int]]]) -> Dict[str, List[Tuple[str, int]]]:
+    '''
+    Utility function that inverts a function adjacency index (see create_function_adjacency_index), i.e. maps each
+    function reference id onto the ordered list of the functions calling it, as (caller_function_reference_id,
+    caller_index) tuples. Functions calling the same function more than once are only listed once, and callers are
+    ordered like the functions of the adjacency index. Functions that are not called by any function are not included.
+
+    Passed to create_graph_meta_data instead of the adjacency index, it creates the inverted caller tree of a function.
+
+    Args:
+        function_adjacency_index:
+
+    Returns:
+
+    '''
+
+    reverse_function_adjacency_index = {}
+
+    for function_id, function_dependencies in function_adjacency_index.items():
+        for function_dependency_id in dict.fromkeys([function_dependency_id for function_dependency_id, _ in function_dependencies]):
+            function_callers = reverse_function_adjacency_index.setdefault(function_dependency_id, [])
+            function_callers.append((function_id, len(function_callers)))
+
+    return reverse_function_adjacency_index
+
+
 def create_graph_meta_data(root_function_reference_id: str,
                            module_meta_data: pd.DataFrame,
                            function_meta_data: pd.DataFrame,
-                           function_dependency_meta_data: pd.DataFrame) -> pd.DataFrame:
+                           function_dependency_meta_data: pd.DataFrame = None,
+                           function_adjacency_index: Dict[str, List[Tuple[str, int]]] = None,
+                           graph_expansion_mode: str = GRAPH_EXPANSION_MODE_FULL,
+                           max_depth: Optional[int] = None,
+                           max_nodes: Optional[int] = None) -> pd.DataFrame:
     '''
     Utility function that creates the meta data needed for the structure visualization of a project based on functions
     and their relationshups, as shown here: https://miro.com/app/board/uXjVPNNbgDk=/
+
+    Calls back into a function that is already being expanded further up the same branch (i.e. (mutual) recursion)
+    are not expanded again. Instead, a 'cycle' node referencing the graph index of the recursively called function is
+    added. In the 'memoized' expansion mode, functions with dependencies are only expanded on their first occurrence,
+    and every later occurrence is added as a 'reference' node pointing to the graph index of that first occurrence.
+    The size of the graph meta data then is linear in the number of distinct function dependencies.
+
+    The expansion can be limited to functions at most max_depth calls away from the root, and to at most max_nodes
+    graph meta data records. Functions with dependencies that are not expanded because of these limits are added as
+    'truncated' nodes. A function is only expanded if all of its dependencies fit into the remaining node budget, so
+    no function is ever expanded partially.
+
     Args:
         root_function_reference_id:
         function_meta_data:
-        function_dependency_meta_data:
+        function_dependency_meta_data: Only needed if no function_adjacency_index is specified
+        function_adjacency_index: See create_function_adjacency_index. Should be built once and passed in when creating
+            the graph meta data of multiple roots.
+        graph_expansion_mode: Either 'full' or 'memoized'.
+        max_depth: If set, the maximum generation of expanded functions, the root being generation 0
+        max_nodes: If set, the maximum number of graph meta data records. Should be at least 1
 
     Returns:
 
     '''
 
-    # create first generation
-    previous_generation = pd.DataFrame(data = [('',root_function_reference_id,0,0,''),],
-                                    columns = ['source_function_id','target_function_id','target_function_dependency_index','target_function_generation','target_function_graph_index'])
-
-    all_generations = [previous_generation,]
-
-    logger.debug(f'First generation: {previous_generation}')
+    if graph_expansion_mode not in (GRAPH_EXPANSION_MODE_FULL, GRAPH_EXPANSION_MODE_MEMOIZED):
+        raise ValueError(f'Unknown graph expansion mode {graph_expansion_mode}.')
 
-    # create remaining generations
-    while True:
+    if function_adjacency_index is None:
+        function_adjacency_index = create_function_adjacency_index(function_dependency_meta_data)
 
-        current_generation_list = []
+    # walk the tree depth first. each stack entry is a (source_function_id, target_function_id,
+    # target_function_dependency_index, target_function_generation, target_function_graph_index) record
+    graph_records = []
+    graph_record_stack = [('', root_function_reference_id, 0, 0, '')]
 
-        for previous_generation_record in previous_generation.itertuples():
+    # the function ids (and their graph indices) on the branch leading to the current record, and the graph indices of
+    # all functions expanded so far
+    ancestor_graph_indices = {}
+    ancestor_function_ids = []
+    expanded_graph_indices = {}
 
-            logger.debug(f'Previous generation\'s record: {previous_generation_record}')
+    while graph_record_stack:
+        graph_record = graph_record_stack.pop()
 
-            # the previous generations connection's target is the source for this generation
-            current_source_function_id = previous_generation_record.target_function_id
+        _, current_source_function_id, _, current_source_function_generation, current_source_function_graph_index = graph_record
 
-            # get all dependencies for this source function
-            current_generation_slice = function_dependency_meta_data.loc[
-                function_dependency_meta_data['unique_reference_id'] == current_source_function_id].sort_values('function_dependency_index',ascending=True)
+        # drop the ancestors of previously visited branches
+        while len(ancestor_function_ids) > current_source_function_generation:
+            del ancestor_graph_indices[ancestor_function_ids.pop()]
 
-            if current_generation_slice.empty:
-                # no dependencies recorded for this source function; move on to next element of previous generation
-                continue
-            else:
-                # format the non-trivial dependencies of this source function
-                current_generation_slice.rename(columns={'unique_reference_id': 'source_function_id',
-                                                         'function_dependency_reference_id': 'target_function_id',
-                                                         'function_dependency_index': 'target_function_dependency_index'},
-                                                inplace=True)
+        current_function_dependencies = function_adjacency_index.get(current_source_function_id, [])
 
-                # generation counter simply increases by 1 compared to previous generation
-                current_generation_slice['target_function_generation'] = previous_generation_record.target_function_generation + 1
+        if current_source_function_id in ancestor_graph_indices:
+            graph_records.append(graph_record + (GRAPH_NODE_TYPE_CYCLE, ancestor_graph_indices[current_source_function_id]))
+            continue
 
-                # graph index is an additional level to the previous generations target function, with the new value
-                # being dependency_index + 1. the nested version number is a string type
-                current_generation_slice['target_function_graph_index'] = current_generation_slice['target_function_dependency_index'].apply(lambda index: f'{previous_generation_record.target_function_graph_index}.{index+1}')
+        if graph_expansion_mode == GRAPH_EXPANSION_MODE_MEMOIZED and current_function_dependencies and \
+                current_source_function_id in expanded_graph_indices:
+            graph_records.append(graph_record + (GRAPH_NODE_TYPE_REFERENCE, expanded_graph_indices[current_source_function_id]))
+            continue
 
-                logger.debug(f'Current generation slice: {current_generation_slice}')
+        # all records on the stack will be added, so only expand if the dependencies fit into what is left of the budget
+        if current_function_dependencies and \
+                ((max_depth is not None and current_source_function_generation >= max_depth) or
+                 (max_nodes is not None and len(graph_records) + 1 + len(graph_record_stack) + len(current_function_dependencies) > max_nodes)):
+            graph_records.append(graph_record + (GRAPH_NODE_TYPE_TRUNCATED, ''))
+            continue
 
-                current_generation_list.append(current_generation_slice)
+        graph_records.append(graph_record + (GRAPH_NODE_TYPE_FUNCTION, ''))
 
-        if not current_generation_list:
-            # no element of the previous generation had dependencies (= offsprings), so the current generation is
-            # trivial
-            break
-        else:
-            # save this generation
-            current_generation = pd.concat(current_generation_list)
+        ancestor_function_ids.append(current_source_function_id)
+        ancestor_graph_indices[current_source_function_id] = current_source_function_graph_index
+        expanded_graph_indices.setdefault(current_source_function_id, current_source_function_graph_index)
 
-            logger.debug(f'Current generation after assembly: {current_generation}')
+        # graph index is an additional level to the source function's graph index, with the new value being
+        # dependency_index + 1. the nested version number is a string type
+        graph_index_prefix = f'{current_source_function_graph_index}.' if current_source_function_graph_index else ''
 
-            all_generations.append(current_generation)
+        offspring_graph_records = [
+            (current_source_function_id,
+             function_dependency_id,
+             function_dependency_index,
+             current_source_function_generation + 1,
+             f'{graph_index_prefix}{function_dependency_index+1}')
+            for function_dependency_id, function_dependency_index in current_function_dependencies
+        ]
 
-            # update generation placeholder variable for next iteration
-            previous_generation = current_generation
+        # the records are sorted by their (string type) graph index, so visit offsprings in that order, too. since '.'
+        # sorts before all digits, the depth first order then already is the sorted order, e.g. '1' < '1.1' < '10'
+        offspring_graph_records.sort(key=lambda offspring_graph_record: offspring_graph_record[4], reverse=True)
 
-    graph_meta_data = pd.concat(all_generations).sort_values('target_function_graph_index',ascending=True)
+        graph_record_stack.extend(offspring_graph_records)
 
-    # clean graph index: remove leading '.'
-    graph_meta_data['target_function_graph_index'] = graph_meta_data['target_function_graph_index'].apply(lambda x: x[1:] if (x and x[0] == '.') else x)
+    graph_meta_data = pd.DataFrame(data=graph_records,
+                                   columns=['source_function_id','target_function_id','target_function_dependency_index','target_function_generation','target_function_graph_index','target_function_node_type','target_function_reference_graph_index'])
 
     # add coordinates for plot function
     graph_meta_data['graph_plot_x_coordinate'] = graph_meta_data['target_function_generation'] # 1,2,...
@@ -186,7 +348,32 @@ def create_graph_meta_data(root_function_reference_id: str,
                         'import_path':'target_function_module_import_path'}). \
         drop(['unique_reference_id','source_module_reference_id'],axis=1)
 
-    graph_meta_data['target_function_import_path'] = graph_meta_data[['target_function_module_import_path','target_function_handle']].apply(lambda x: '.'.join(x), axis=1)
+    graph_meta_data['target_function_import_path'] = graph_meta_data['target_function_module_import_path'] + '.' + graph_meta_data['target_function_handle']
     graph_meta_data.drop(['source_function_id','target_function_id'],axis=1,inplace=True)
 
-    return graph_meta_data
\ No newline at end of file
+    return graph_meta_data
+
+def get_exported_graph_meta_data(graph_meta_data: pd.DataFrame,
+                                 graph_expansion_mode: str = GRAPH_EXPANSION_MODE_FULL,
+                                 max_depth: Optional[int] = None,
+                                 max_nodes: Optional[int] = None) -> pd.DataFrame:
+    '''
+    Utility function that returns the graph meta data to export. The node type and reference graph index columns are
+    only exported if the graph was expanded in the 'memoized' mode or with a depth or node limit, i.e. if it can contain
+    reference or truncated nodes. Otherwise the exported graph meta data keeps the columns of the fully expanded graph,
+    and cycle nodes are only marked in the flow chart diagrams.
+
+    Args:
+        graph_meta_data:
+        graph_expansion_mode:
+        max_depth:
+        max_nodes:
+
+    Returns:
+
+    '''
+
+    if graph_expansion_mode == GRAPH_EXPANSION_MODE_FULL and max_depth is None and max_nodes is None:
+        return graph_meta_data.drop(GRAPH_NODE_COLUMNS, axis=1)
+
+    return graph_meta_data
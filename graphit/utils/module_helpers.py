@@ -1,72 +1,216 @@
-import itertools
 import os
-import re
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional, Tuple
 
-from graphit.utils.model import RecordedModule
-from graphit.utils.helpers import create_unique_reference_id
-from graphit.settings import logger
+from graphit.utils.records import ModuleRecord
+from graphit.utils.helpers import create_unique_reference_id, check_unique_reference_ids
+from graphit.settings import logger, PYTHON_MODULE_FILE_REGEX, DEFAULT_EXCLUDE_PATTERNS
+from graphit.utils.gitignore_helpers import GitignoreRule, read_gitignore_rules, is_gitignored, matches_glob_patterns
 
 
-def record_all_module_file_paths(reference_directory: Path,
-                                scope: List[Path] = [],
-                                ignore_scope: List[Path] = []) -> List[Path]:
+def list_directory(directory: str,
+                   read_gitignore: bool = True) -> Tuple[List[str], List[str], List[GitignoreRule]]:
     '''
-    Crawls the specified content inside the reference_directory and returns all relative file paths to files that are
-    best guesses of actual python files.
-    :param reference_directory:
-    :param scope: A list of subdirectories that should be crawled. If not specified, defaults to reference_directory
-    :param ignore_scope: A list of subdirectories that should not get crawled. If not specified, will default to the
-        empty list.
-    :return: relevant_content: A list of file paths to best guess python modules, relative to the reference_directory
+    Lists the specified directory's content. Returns the sorted names of all files and (non symlinked) subdirectories,
+    and the rules of the directory's .gitignore file, if specified.
+
+    Args:
+        directory:
+        read_gitignore:
+
+    Returns:
+
+    '''
+
+    file_names = []
+    subdirectory_names = []
+
+    try:
+        with os.scandir(directory) as directory_entries:
+            for directory_entry in directory_entries:
+                try:
+                    if directory_entry.is_dir():
+                        # like os.walk, don't follow symlinked directories
+                        if not directory_entry.is_symlink():
+                            subdirectory_names.append(directory_entry.name)
+                    else:
+                        file_names.append(directory_entry.name)
+                except OSError:
+                    continue
+    except OSError as e:
+        logger.warning(f'Could not list directory {directory}: {e}')
+
+    gitignore_rules = read_gitignore_rules(directory) if read_gitignore else []
+
+    return sorted(file_names), sorted(subdirectory_names), gitignore_rules
+
+
+def is_path_in_scope(absolute_path: str,
+                     absolute_paths_scope: List[str]) -> bool:
+    '''
+    Checks whether the specified absolute path is, or is located inside, any of the specified absolute scope paths.
+
+    Args:
+        absolute_path:
+        absolute_paths_scope:
+
+    Returns:
+
     '''
 
-    content = os.walk(reference_directory)
+    return any([absolute_path == absolute_path_scope or absolute_path.startswith(absolute_path_scope.rstrip(os.sep) + os.sep)
+                for absolute_path_scope in absolute_paths_scope])
+
+
+def iterate_all_module_file_paths(reference_directory: Path,
+                                  scope: List[Path] = [],
+                                  ignore_scope: List[Path] = [],
+                                  include_patterns: List[str] = [],
+                                  exclude_patterns: List[str] = DEFAULT_EXCLUDE_PATTERNS,
+                                  use_gitignore: bool = True,
+                                  n_threads: int = 1) -> Iterator[Path]:
+    '''
+    Crawls the specified content inside the reference_directory and yields all relative file paths to files that are
+    best guesses of actual python files, as soon as their directory is listed.
+
+    Ignored subdirectories are pruned before they are descended into, i.e. their content is never listed. Subdirectories
+    are crawled depth first in alphabetical order, so the yielded file paths are deterministic. With more than one
+    thread, the listings of all subdirectories of a crawled directory are requested right away, so that they are
+    (mostly) ready by the time the crawl descends into them.
+    :param reference_directory:
+    :param scope: A list of subdirectories and files that should be crawled. If not specified, defaults to
+        reference_directory
+    :param ignore_scope: A list of subdirectories and files that should not get crawled. If not specified, will default
+        to the empty list.
+    :param include_patterns: A list of glob patterns. If specified, only files matching any of the patterns are
+        recorded. Patterns are matched against the file paths relative to the reference_directory, or against the file
+        names if they don't contain a '/'.
+    :param exclude_patterns: A list of glob patterns of files and subdirectories that should not get crawled. Matched
+        like the include patterns.
+    :param use_gitignore: Whether the files and subdirectories ignored by any .gitignore file inside the
+        reference_directory should not get crawled.
+    :param n_threads: The number of threads used to list directories. Using more than one thread can help on network
+        filesystems, where listing a directory mostly means waiting.
+    :return: The file paths of best guess python modules, relative to the reference_directory
+    '''
 
     if scope:
         absolute_paths_scope = [os.path.abspath(scope_entry) for scope_entry in scope]
     else:
         absolute_paths_scope = [os.path.abspath(reference_directory)]
 
-    logger.debug(f'Scope: {absolute_paths_scope}')
+    logger.debug('Scope: %s', absolute_paths_scope)
 
     if ignore_scope:
         absolute_paths_ignore_scope = [os.path.abspath(ignore_scope_entry) for ignore_scope_entry in ignore_scope]
     else:
         absolute_paths_ignore_scope = []
 
-    logger.debug(f'Ignore scope: {absolute_paths_ignore_scope}')
+    logger.debug('Ignore scope: %s', absolute_paths_ignore_scope)
+
+    def is_directory_crawled(relative_directory_path: str,
+                             gitignore_rules: List[Tuple[str, List[GitignoreRule]]]) -> bool:
+        # a directory needs to be crawled if it is in scope, or if it contains (parts of) the scope
+        absolute_directory_path = os.path.abspath(os.path.join(reference_directory, relative_directory_path))
+
+        if not is_path_in_scope(absolute_directory_path, absolute_paths_scope) and \
+                not any([is_path_in_scope(absolute_path_scope, [absolute_directory_path]) for absolute_path_scope in absolute_paths_scope]):
+            return False
+
+        return not is_path_ignored(relative_directory_path, absolute_directory_path, True, gitignore_rules)
+
+    def is_path_ignored(relative_path: str,
+                        absolute_path: str,
+                        is_directory: bool,
+                        gitignore_rules: List[Tuple[str, List[GitignoreRule]]]) -> bool:
+        relative_posix_path = relative_path.replace(os.sep, '/')
+
+        if is_path_in_scope(absolute_path, absolute_paths_ignore_scope):
+            return True
+
+        if matches_glob_patterns(relative_posix_path, exclude_patterns):
+            return True
+
+        # apply the rules of all .gitignore files from the top directory downwards. the rules of each .gitignore file
+        # apply to the paths relative to its own directory
+        is_ignored = False
+
+        for gitignore_directory, directory_gitignore_rules in gitignore_rules:
+            is_ignored = is_gitignored(relative_posix_path[len(gitignore_directory):].lstrip('/'),
+                                       is_directory,
+                                       directory_gitignore_rules,
+                                       is_ignored=is_ignored)
+
+        return is_ignored
+
+    def list_crawled_directory(relative_directory_path: str) -> Tuple[List[str], List[str], List[GitignoreRule]]:
+        return list_directory(os.path.join(reference_directory, relative_directory_path), read_gitignore=use_gitignore)
+
+    # crawl the directory tree depth first, i.e. the files of a directory, followed by the content of each of its
+    # subdirectories. each directory is identified by its path relative to the reference directory, '' being the
+    # reference directory itself, and stacked along with the .gitignore rules of its parent directories and its listing
+    with ThreadPoolExecutor(max_workers=max(n_threads, 1)) as executor:
 
-    relevant_content = []
+        def request_directory_listing(relative_directory_path: str) -> Optional[Future]:
+            # with a single thread, directories are only listed once the crawl descends into them
+            return executor.submit(list_crawled_directory, relative_directory_path) if n_threads > 1 else None
 
-    for content_record in content:
-        root_dir, sub_dir, files = content_record
+        directory_stack = [('', [], request_directory_listing(''))] if is_directory_crawled('', []) else []
 
-        # only retain those files that are inside the specified directory scope
-        if not any([absolute_path_scope in os.path.abspath(root_dir) for absolute_path_scope in absolute_paths_scope]):
-            continue
+        while directory_stack:
+            relative_directory_path, directory_gitignore_rules, directory_listing = directory_stack.pop()
+            file_names, subdirectory_names, gitignore_rules = directory_listing.result() if directory_listing is not None \
+                else list_crawled_directory(relative_directory_path)
 
-        # also skip those files that are specifically ignored via the ignore scope
-        if any([absolute_path_ignore_scope in os.path.abspath(root_dir) for absolute_path_ignore_scope in absolute_paths_ignore_scope]):
-            continue
+            if gitignore_rules:
+                directory_gitignore_rules = directory_gitignore_rules + [(relative_directory_path.replace(os.sep, '/'), gitignore_rules)]
 
-        # filter out any non- .py files
-        python_module_pattern = '[a-zA-Z0-9_]{1,50}.py$'
-        python_module_regex_pattern = re.compile(python_module_pattern)
+            crawled_subdirectories = []
 
-        relevant_python_module_files = list(itertools.chain.from_iterable([python_module_regex_pattern.findall(file) for file in files]))
+            for subdirectory_name in subdirectory_names:
+                relative_subdirectory_path = os.path.join(relative_directory_path, subdirectory_name)
 
-        # construct full absolute python module file path, then truncate to create relative file paths w.r.t reference
-        # directory
-        if relevant_python_module_files:
-            relevant_absolute_file_paths = [os.path.join(root_dir,relevant_python_module_file) for relevant_python_module_file in relevant_python_module_files]
-            relevant_relative_file_paths = [os.path.relpath(relevant_absolute_file_path,reference_directory) for relevant_absolute_file_path in relevant_absolute_file_paths]
-            relevant_referenced_file_paths = [os.path.join(reference_directory,relevant_relative_file_path) for relevant_relative_file_path in relevant_relative_file_paths]
-        else:
-            relevant_referenced_file_paths = []
+                if is_directory_crawled(relative_subdirectory_path, directory_gitignore_rules):
+                    crawled_subdirectories.append((relative_subdirectory_path, directory_gitignore_rules,
+                                                   request_directory_listing(relative_subdirectory_path)))
 
-        relevant_content.extend(relevant_referenced_file_paths)
+            for file_name in file_names:
+                # filter out any non- .py files
+                if not PYTHON_MODULE_FILE_REGEX.fullmatch(file_name):
+                    continue
+
+                relative_file_path = os.path.join(relative_directory_path, file_name)
+                absolute_file_path = os.path.abspath(os.path.join(reference_directory, relative_file_path))
+
+                # only retain those files that are inside the specified scope and not specifically ignored
+                if not is_path_in_scope(absolute_file_path, absolute_paths_scope):
+                    continue
+
+                if is_path_ignored(relative_file_path, absolute_file_path, False, directory_gitignore_rules):
+                    continue
+
+                if include_patterns and not matches_glob_patterns(relative_file_path.replace(os.sep, '/'), include_patterns):
+                    continue
+
+                # construct file paths w.r.t reference directory
+                yield os.path.join(reference_directory, relative_file_path)
+
+            directory_stack.extend(reversed(crawled_subdirectories))
+
+
+def record_all_module_file_paths(reference_directory: Path,
+                                 **crawl_kwargs) -> List[Path]:
+    '''
+    Crawls the specified content inside the reference_directory and returns all relative file paths to files that are
+    best guesses of actual python files, see iterate_all_module_file_paths.
+
+    :param reference_directory:
+    :param crawl_kwargs: Passed on to iterate_all_module_file_paths, e.g. scope, include_patterns or n_threads
+    :return: relevant_content: A list of file paths to best guess python modules, relative to the reference_directory
+    '''
+
+    relevant_content = list(iterate_all_module_file_paths(reference_directory=reference_directory, **crawl_kwargs))
 
     return relevant_content
 
@@ -88,38 +232,74 @@ def record_module_import_path_from_module(module_path: Path,
     return relative_module_import_path
 
 
+def record_module(module_file_path: Path,
+                  reference_directory: Path) -> ModuleRecord:
+    '''
+    Creates the ModuleRecord record of the specified module file. The module's reference id is derived from its import
+    path, so it is identical across runs.
+
+    :param module_file_path:
+    :param reference_directory:
+    :return:
+    '''
+
+    import_path = record_module_import_path_from_module(module_path=module_file_path,
+                                                        reference_directory=reference_directory)
+
+    return ModuleRecord(unique_reference_id=create_unique_reference_id(f'module:{import_path}'),
+                        file_path=module_file_path,
+                        import_path=import_path,
+                        reference_directory=reference_directory)
+
+
+def iterate_all_modules(reference_directory: Path,
+                        scope: List[Path] = [],
+                        ignore_scope: List[Path] = [],
+                        **crawl_kwargs) -> Iterator[ModuleRecord]:
+    '''
+    Helper function that yields the ModuleRecord records of the crawled target directory using the specified scope, as
+    soon as they are found. Unlike record_all_modules, doesn't check the uniqueness of the modules' reference ids.
+
+    :param reference_directory:
+    :param scope:
+    :param ignore_scope:
+    :param crawl_kwargs: Passed on to iterate_all_module_file_paths, e.g. include_patterns or n_threads
+    :return:
+    '''
+
+    for module_file_path in iterate_all_module_file_paths(reference_directory=reference_directory,
+                                                          scope=scope,
+                                                          ignore_scope=ignore_scope,
+                                                          **crawl_kwargs):
+        yield record_module(module_file_path=module_file_path,
+                            reference_directory=reference_directory)
+
+
 def record_all_modules(reference_directory: Path,
                        scope: List[Path] = [],
-                       ignore_scope: List[Path] = []) -> List[RecordedModule]:
+                       ignore_scope: List[Path] = [],
+                       **crawl_kwargs) -> List[ModuleRecord]:
     '''
-    Helper function that creates list of RecordedModule models with the result of the crawled target directory using the
+    Helper function that creates list of ModuleRecord records with the result of the crawled target directory using the
     specified scope.
 
     :param reference_directory:
-    :param args:
-    :param kwargs:
+    :param scope:
+    :param ignore_scope:
+    :param crawl_kwargs: Passed on to iterate_all_module_file_paths, e.g. include_patterns or n_threads
     :return:
     '''
 
-    # record all module file paths
-    recorded_module_file_paths = record_all_module_file_paths(reference_directory=reference_directory,
-                                                         scope=scope,
-                                                         ignore_scope=ignore_scope)
-
-    # convert all module file paths to import paths
-    recorded_import_paths = [record_module_import_path_from_module(module_path=recorded_module_file_path,reference_directory=reference_directory) for recorded_module_file_path in recorded_module_file_paths]
-
-    # create unique reference ids for all modules
-    recorded_module_ids = [create_unique_reference_id() for module in recorded_module_file_paths]
+    # create all module records, with unique reference ids derived from their import paths
+    recorded_modules = list(iterate_all_modules(reference_directory=reference_directory,
+                                                scope=scope,
+                                                ignore_scope=ignore_scope,
+                                                **crawl_kwargs))
 
-    # create all module models
-    recorded_modules = [RecordedModule(
-        unique_reference_id=module_id,
-        file_path=file_path,
-        import_path=import_path,
-        reference_directory=reference_directory) for module_id, file_path, import_path in zip(recorded_module_ids,recorded_module_file_paths,recorded_import_paths)]
+    check_unique_reference_ids([recorded_module.unique_reference_id for recorded_module in recorded_modules],
+                               reference_type='module')
 
     logger.info('Recorded all modules.')
-    logger.debug(f'Recorded modules: {recorded_modules}')
+    logger.debug('Recorded modules: %s', recorded_modules)
 
-    return recorded_modules
\ No newline at end of file
+    return recorded_modules
@@ -0,0 +1,128 @@
+import json
+import os
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from graphit import __version__
+from graphit.settings import logger, PROFILE_REPORT_FILE_NAME
+
+
+def start_profile(trace_memory: bool = True) -> Dict:
+    '''
+    Creates an empty profile and, if trace_memory is set, starts tracing memory allocations, so that profile_stage can
+    record the peak memory of each stage. Tracing the memory slows down all stages considerably.
+
+    Args:
+        trace_memory:
+
+    Returns:
+
+    '''
+
+    if trace_memory:
+        tracemalloc.start()
+
+    return {'graphit_version': __version__,
+            'python_version': platform.python_version(),
+            'start_time': time.perf_counter(),
+            'start_cpu_time': time.process_time(),
+            'stages': [],
+            'graph_roots': []}
+
+
+@contextmanager
+def profile_stage(profile: Optional[Dict],
+                  stage_name: str):
+    '''
+    Context manager that records the wall time, cpu time and (if memory is being traced) the peak memory of the stage
+    it wraps in the specified profile. Yields the stage's profile record, so that the stage can add e.g. its item count
+    as 'n_items'. Does nothing if the profile is None, i.e. if profiling is disabled.
+
+    Note that only the current process is measured, i.e. not the work done by worker processes.
+
+    Args:
+        profile:
+        stage_name:
+
+    Returns:
+
+    '''
+
+    if profile is None:
+        yield {}
+        return
+
+    stage_profile = {'stage': stage_name}
+
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+    stage_start, stage_cpu_start = time.perf_counter(), time.process_time()
+
+    try:
+        yield stage_profile
+    finally:
+        stage_profile['wall_time_s'] = time.perf_counter() - stage_start
+        stage_profile['cpu_time_s'] = time.process_time() - stage_cpu_start
+
+        if tracemalloc.is_tracing():
+            stage_profile.setdefault('peak_memory_mb', tracemalloc.get_traced_memory()[1] / 1024 ** 2)
+
+        profile['stages'].append(stage_profile)
+
+
+def add_graph_root_profiles(profile: Optional[Dict],
+                            graph_root_exports: List[Dict]) -> None:
+    '''
+    Adds the per graph root measurements returned by graphit.utils.graph_root_helpers.export_all_graph_roots to the
+    specified profile, if profiling is enabled.
+
+    Args:
+        profile:
+        graph_root_exports:
+
+    Returns:
+
+    '''
+
+    if profile is None:
+        return
+
+    profile['graph_roots'].extend([dict([(key, value) for key, value in graph_root_export.items() if key != 'graph_meta_data'])
+                                   for graph_root_export in graph_root_exports])
+
+
+def write_profile_report(profile: Dict,
+                         output_directory: Path) -> str:
+    '''
+    Stops tracing memory allocations and writes the specified profile, including the total wall and cpu time since
+    start_profile, as a json report to the specified output directory. Returns the report's file path.
+
+    Args:
+        profile:
+        output_directory:
+
+    Returns:
+
+    '''
+
+    profile_report = dict([(key, value) for key, value in profile.items() if key not in ('start_time', 'start_cpu_time')])
+    profile_report['total_wall_time_s'] = time.perf_counter() - profile['start_time']
+    profile_report['total_cpu_time_s'] = time.process_time() - profile['start_cpu_time']
+
+    if tracemalloc.is_tracing():
+        profile_report['total_peak_memory_mb'] = max([stage_profile.get('peak_memory_mb', 0) for stage_profile in profile['stages']] + [0])
+        tracemalloc.stop()
+
+    profile_report_file_path = os.path.join(output_directory, PROFILE_REPORT_FILE_NAME)
+
+    with open(profile_report_file_path, 'w') as f:
+        json.dump(profile_report, f, indent=2)
+
+    logger.info('Exported profile report to: %s', profile_report_file_path)
+
+    return profile_report_file_path
@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+from typing import List
+
+
+class ModuleRecord:
+    '''
+    Compact, validation free record of a python module, used throughout the graphit pipeline. See
+    graphit.utils.model.RecordedModule for the equivalent pydantic model, which can be created via to_model.
+    '''
+
+    __slots__ = ('unique_reference_id', 'file_path', 'import_path', 'reference_directory')
+
+    def __init__(self,
+                 unique_reference_id: str,
+                 file_path: str,
+                 import_path: str,
+                 reference_directory: str = ''):
+        self.unique_reference_id = unique_reference_id
+        # normalized the same way as the pydantic model's Path type file path, e.g. './a/b.py' -> 'a/b.py'
+        self.file_path = sys.intern(str(Path(file_path)))
+        self.import_path = sys.intern(import_path)
+        self.reference_directory = sys.intern(str(reference_directory))
+
+    def __repr__(self):
+        return f'ModuleRecord(unique_reference_id={self.unique_reference_id!r}, import_path={self.import_path!r})'
+
+    def to_model(self):
+
+        from graphit.utils.model import RecordedModule
+
+        return RecordedModule(unique_reference_id=self.unique_reference_id,
+                              file_path=self.file_path,
+                              import_path=self.import_path,
+                              reference_directory=self.reference_directory)
+
+
+class FunctionRecord:
+    '''
+    Compact, validation free record of a module level function or class definition, used throughout the graphit
+    pipeline. All handles are interned, so that the many repeated call handles share their string objects. Records
+    created by the fast scan (see graphit.utils.function_helpers.scan_module_source) are flagged as approximate. See
+    graphit.utils.model.RecordedFunction and RecordedClass for the equivalent pydantic models, which can be created via
+    to_model.
+    '''
+
+    __slots__ = ('unique_reference_id', 'function_handle', 'source_module_reference_id', 'definition_start_line_index',
+                 'definition_start_line_offset', 'definition_end_line_index', 'definition_end_line_offset',
+                 'ordered_function_calls', 'is_class', 'is_approximate')
+
+    def __init__(self,
+                 unique_reference_id: str,
+                 function_handle: str,
+                 source_module_reference_id: str,
+                 definition_start_line_index: int,
+                 definition_start_line_offset: int,
+                 definition_end_line_index: int,
+                 definition_end_line_offset: int,
+                 ordered_function_calls: List[str],
+                 is_class: bool = False,
+                 is_approximate: bool = False):
+        self.unique_reference_id = unique_reference_id
+        self.function_handle = sys.intern(function_handle)
+        self.source_module_reference_id = source_module_reference_id
+        self.definition_start_line_index = definition_start_line_index
+        self.definition_start_line_offset = definition_start_line_offset
+        self.definition_end_line_index = definition_end_line_index
+        self.definition_end_line_offset = definition_end_line_offset
+        self.ordered_function_calls = [sys.intern(function_call) for function_call in ordered_function_calls]
+        self.is_class = is_class
+        self.is_approximate = is_approximate
+
+    def __repr__(self):
+        return f'FunctionRecord(unique_reference_id={self.unique_reference_id!r}, function_handle={self.function_handle!r})'
+
+    def to_model(self):
+
+        from graphit.utils.model import RecordedFunction, RecordedClass
+
+        recorded_definition_type = RecordedClass if self.is_class else RecordedFunction
+
+        return recorded_definition_type(unique_reference_id=self.unique_reference_id,
+                                        function_handle=self.function_handle,
+                                        source_module_reference_id=self.source_module_reference_id,
+                                        definition_start_line_index=self.definition_start_line_index,
+                                        definition_start_line_offset=self.definition_start_line_offset,
+                                        definition_end_line_index=self.definition_end_line_index,
+                                        definition_end_line_offset=self.definition_end_line_offset,
+                                        ordered_function_calls=list(self.ordered_function_calls))
+
@@ -1,19 +1,32 @@
 import os
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
+from typing import List, Optional
 
-from graphit.settings import logger
-from graphit.utils.function_helpers import record_all_functions_from_modules
-from graphit.utils.graph_helpers import plot_project_graph
+from graphit.settings import logger, PARSE_CACHE_DIRECTORY, PARSE_CACHE_SIZE_LIMIT_MB, GRAPH_EXPANSION_MODES, \
+    GRAPH_EXPANSION_MODE_FULL, EXPORT_FORMATS, EXPORT_FORMAT_CSV, DEFAULT_EXCLUDE_PATTERNS, WATCH_POLL_INTERVAL_SECONDS, \
+    FLOW_CHART_RENDERERS, FLOW_CHART_RENDERER_SCHEMDRAW, FLOW_CHART_MAX_ROWS_PER_PAGE, GRAPH_DIRECTIONS, \
+    GRAPH_DIRECTION_CALLEES, GRAPH_DIRECTION_CALLERS, SERVE_HOST, SERVE_PORT, SERVE_RESPONSE_CACHE_SIZE_LIMIT_MB, \
+    PARSING_MODES, PARSING_MODE_AST
+from graphit.utils.cache_helpers import prepare_parse_cache_directory, evict_parse_cache_entries
+from graphit.utils.function_helpers import record_all_functions_from_modules, record_unresolved_functions_from_modules, \
+    record_unresolved_functions_from_module_stream, resolve_all_function_calls
 from graphit.utils.helpers import create_output_directory
-from graphit.utils.meta_data_helpers import create_function_and_module_meta_data, get_graph_function_roots, \
-    create_graph_meta_data
-from graphit.utils.module_helpers import record_all_modules
+from graphit.utils.module_helpers import record_all_modules, iterate_all_modules
+from graphit.utils.profile_helpers import start_profile, profile_stage, add_graph_root_profiles, write_profile_report
+from graphit.utils.shard_helpers import parse_shard_specification, get_module_shard_number, write_shard_artifact, \
+    merge_shard_artifacts
 
+# the helpers building, exporting and plotting the meta data tables depend on pandas (and schemdraw), which take long to
+# import. they are imported by the stages that need them, so that e.g. `run_graphit --help` doesn't pay for them
 
-def parse_graphit_arguments() -> Namespace:
+
+def parse_graphit_arguments(args: Optional[List[str]] = None) -> Namespace:
     '''
     Utility function that parses the command line arguments needed to run the graphit package on a given project
+    Args:
+        args: The arguments to parse instead of the command line arguments, e.g. when running graphit programmatically
+
     Returns:
 
     '''
@@ -44,73 +57,602 @@ def parse_graphit_arguments() -> Namespace:
                         type=str,
                         default=['venv', 'tests'],
                         )
+    parser.add_argument('--include',
+                        dest='include_patterns',
+                        help='Set glob patterns of the python module files that should be considered, e.g. '
+                             '\'src/*\'. Patterns without a \'/\' are matched against file names, all others against '
+                             'file paths relative to the reference directory. If not set, all python module files are '
+                             'considered.',
+                        nargs='+',
+                        type=str,
+                        default=[],
+                        )
+    parser.add_argument('--exclude',
+                        dest='exclude_patterns',
+                        help='Set glob patterns of the files and directories that should be ignored when looking for '
+                             'python modules, e.g. \'node_modules\' or \'*_pb2.py\'. Matched like the include patterns.',
+                        nargs='+',
+                        type=str,
+                        default=DEFAULT_EXCLUDE_PATTERNS,
+                        )
+    parser.add_argument('--no-gitignore',
+                        dest='use_gitignore',
+                        help='Also consider the files and directories ignored by .gitignore files when looking for '
+                             'python modules.',
+                        action='store_false',
+                        )
+    parser.add_argument('--crawler-threads',
+                        dest='n_crawler_threads',
+                        help='Set the number of threads used to list directories when looking for python modules. '
+                             'More than one thread can speed up the search on network filesystems.',
+                        type=int,
+                        default=1,
+                        )
     parser.add_argument('--meta-data-export-directory',
                         '-m',
                         dest='meta_data_export_directory',
                         type=Path,
                         default=os.path.join(os.getcwd(), './output')
                         )
+    parser.add_argument('--jobs',
+                        '-j',
+                        dest='n_jobs',
+                        help='Set the number of worker processes used to parse the python modules of this project, '
+                             'and to export and plot the dependency graphs of all root functions.',
+                        type=int,
+                        default=1,
+                        )
+    parser.add_argument('--mode',
+                        dest='parsing_mode',
+                        help='Set how the python modules of this project are read. \'ast\' parses each module into its '
+                             'syntax tree and fails on modules with syntax errors. \'fast\' scans each module\'s source '
+                             'with regular expressions instead, which is considerably faster and never fails, but only '
+                             'finds the definitions and function calls approximately. Recorded functions are flagged '
+                             'as approximate in the function meta data.',
+                        choices=PARSING_MODES,
+                        default=PARSING_MODE_AST,
+                        )
+    parser.add_argument('--io-threads',
+                        dest='n_io_threads',
+                        help='Set the number of threads that read the python modules of this project ahead of parsing '
+                             'them. With at least one thread, finding, reading and parsing the modules overlap in a '
+                             'streaming pipeline with a bounded number of modules in flight, instead of running one '
+                             'after the other. Defaults to 0, i.e. no streaming pipeline.',
+                        type=int,
+                        default=0,
+                        )
+    parser.add_argument('--cache-directory',
+                        dest='parse_cache_directory',
+                        help='Set the directory of the parse cache, which stores the recorded definitions of all '
+                             'parsed modules so that unchanged modules do not need to be parsed again.',
+                        type=Path,
+                        default=PARSE_CACHE_DIRECTORY,
+                        )
+    parser.add_argument('--cache-size-limit',
+                        dest='parse_cache_size_limit',
+                        help='Set the maximum size of the parse cache in MB. The least recently used entries are '
+                             'evicted once the cache exceeds this size.',
+                        type=float,
+                        default=PARSE_CACHE_SIZE_LIMIT_MB,
+                        )
+    parser.add_argument('--no-cache',
+                        dest='no_cache',
+                        help='Parse all modules without reading from or writing to the parse cache.',
+                        action='store_true',
+                        )
+    parser.add_argument('--rebuild-cache',
+                        dest='rebuild_cache',
+                        help='Discard all existing parse cache entries before parsing the modules.',
+                        action='store_true',
+                        )
+    parser.add_argument('--graph-expansion',
+                        dest='graph_expansion_mode',
+                        help='Set how the dependency graph of each root function is expanded. \'full\' expands every '
+                             'function call into its own branch, \'memoized\' expands each function only once and '
+                             'references that branch from all later calls. Recursive calls are never expanded.',
+                        choices=GRAPH_EXPANSION_MODES,
+                        default=GRAPH_EXPANSION_MODE_FULL,
+                        )
+    parser.add_argument('--target',
+                        '-t',
+                        dest='targets',
+                        help='Only export the dependency graphs of the specified functions instead of those of all '
+                             'root functions. Each target can be a function\'s full import path, e.g. '
+                             '\'utils.helpers.load\', a trailing part of it, e.g. \'helpers.load\', or just its handle, '
+                             'e.g. \'load\', and selects all functions it matches.',
+                        nargs='+',
+                        type=str,
+                        default=[],
+                        )
+    parser.add_argument('--direction',
+                        dest='graph_direction',
+                        help='Set whether the dependency graphs show the functions called by the graph roots '
+                             '(\'callees\'), or the functions calling the targets (\'callers\'). The \'callers\' '
+                             'direction requires --target.',
+                        choices=GRAPH_DIRECTIONS,
+                        default=GRAPH_DIRECTION_CALLEES,
+                        )
+    parser.add_argument('--max-depth',
+                        dest='max_depth',
+                        help='Only expand the dependency graphs up to the specified number of calls away from the '
+                             'graph root. Functions that are not expanded because of this limit are marked as '
+                             'truncated.',
+                        type=int,
+                        default=None,
+                        )
+    parser.add_argument('--max-nodes',
+                        dest='max_nodes',
+                        help='Stop expanding each dependency graph once it has the specified number of nodes. '
+                             'Functions that are not expanded because of this limit are marked as truncated.',
+                        type=int,
+                        default=None,
+                        )
+    parser.add_argument('--format',
+                        dest='export_format',
+                        help='Set the file format of all exported meta data. The columnar \'parquet\' and \'arrow\' '
+                             'formats require the pyarrow package, and export the graph meta data of all root '
+                             'functions as one dataset.',
+                        choices=EXPORT_FORMATS,
+                        default=EXPORT_FORMAT_CSV,
+                        )
+    parser.add_argument('--store',
+                        dest='export_store',
+                        help='Also write the module, function and function dependency meta data to an indexed sqlite '
+                             'database graphit_graph_store.sqlite in the output directory, which can be queried '
+                             'without parsing the project again.',
+                        action='store_true',
+                        )
+    parser.add_argument('--no-diagrams',
+                        dest='no_diagrams',
+                        help='Only export the meta data, including the graph meta data, without plotting the flow '
+                             'chart diagrams of the graph roots.',
+                        action='store_true',
+                        )
+    parser.add_argument('--renderer',
+                        dest='renderer',
+                        help='Set the renderer of the flow chart diagrams. The svg renderer streams the diagrams '
+                             'straight to file and is considerably faster and leaner for large graphs.',
+                        choices=FLOW_CHART_RENDERERS,
+                        type=str,
+                        default=FLOW_CHART_RENDERER_SCHEMDRAW,
+                        )
+    parser.add_argument('--max-rows-per-page',
+                        dest='max_rows_per_page',
+                        help='Set the maximum number of rows of a flow chart diagram. Larger diagrams are split into '
+                             'pages, which are linked by continuation markers and an html index page. Set to 0 to '
+                             'never split diagrams.',
+                        type=int,
+                        default=FLOW_CHART_MAX_ROWS_PER_PAGE,
+                        )
+    parser.add_argument('--baseline',
+                        dest='baseline',
+                        help='Set the output directory of a previous run to compare this run with. A diff report of '
+                             'the added, removed and rewired functions and dependencies is exported, and only the graph '
+                             'roots whose dependency graph changed are exported again. The outputs of all other graph '
+                             'roots are hard linked from the previous run, which should have been made with the same '
+                             'options. Only supports the csv format.',
+                        type=Path,
+                        default=None,
+                        )
+    parser.add_argument('--shard',
+                        dest='shard',
+                        help='Only record the modules of the i-th of N shards of this project, e.g. \'2/8\', and export '
+                             'them as the shard artifact graphit_shard_{i}_of_{N}.json straight to the meta data export '
+                             'directory, so that all shards can write to the same (shared) directory. Modules are '
+                             'assigned to shards deterministically. Use --merge to combine the artifacts of all shards.',
+                        type=parse_shard_specification,
+                        default=None,
+                        )
+    parser.add_argument('--merge',
+                        dest='merge_shard_paths',
+                        help='Instead of recording the project, merge the specified shard artifacts (or all shard '
+                             'artifacts in the specified directories) written by --shard, resolve their function calls '
+                             'and export the outputs as usual.',
+                        nargs='+',
+                        type=Path,
+                        default=[],
+                        )
+    parser.add_argument('--profile',
+                        dest='profile',
+                        help='Export a json report with the wall time, cpu time, peak memory and item count of each '
+                             'stage of the run and of each graph root to the output directory. Tracing the memory '
+                             'slows down the run.',
+                        action='store_true',
+                        )
+    parser.add_argument('--no-profile-memory',
+                        dest='profile_memory',
+                        help='Skip tracing the memory when profiling, so that the reported times are closer to those '
+                             'of runs without --profile. The report then contains no peak memory.',
+                        action='store_false',
+                        )
+    parser.add_argument('--watch',
+                        dest='watch',
+                        help='Keep running after the first run, and update the outputs whenever python modules of '
+                             'this project change. Only the changed modules are parsed again, and only the graph roots '
+                             'affected by the changes are exported again. Only supports the csv format.',
+                        action='store_true',
+                        )
+    parser.add_argument('--watch-interval',
+                        dest='watch_interval',
+                        help='Set the number of seconds between two checks for changed python modules in watch mode.',
+                        type=float,
+                        default=WATCH_POLL_INTERVAL_SECONDS,
+                        )
+    parser.add_argument('--serve',
+                        dest='serve',
+                        help='Record the project once and keep its call graph in memory, answering json queries about '
+                             'functions, their callers and callees, subtrees and roots, and rendering subtrees to svg '
+                             'on a local http server instead of exporting any outputs.',
+                        action='store_true',
+                        )
+    parser.add_argument('--host',
+                        dest='serve_host',
+                        help='Set the host the query server binds to.',
+                        type=str,
+                        default=SERVE_HOST,
+                        )
+    parser.add_argument('--port',
+                        dest='serve_port',
+                        help='Set the port the query server listens on.',
+                        type=int,
+                        default=SERVE_PORT,
+                        )
+    parser.add_argument('--response-cache-size-limit',
+                        dest='response_cache_size_limit',
+                        help='Set the maximum size in MB of the query server\'s cache of rendered subtrees. The least '
+                             'recently used responses are evicted once the cache exceeds this size.',
+                        type=float,
+                        default=SERVE_RESPONSE_CACHE_SIZE_LIMIT_MB,
+                        )
+
+    command_line_args = parser.parse_args(args)
+
+    if command_line_args.serve and command_line_args.watch:
+        parser.error('--serve and --watch can not be combined.')
+
+    if command_line_args.shard is not None and (command_line_args.watch or command_line_args.serve or command_line_args.merge_shard_paths):
+        parser.error('--shard can not be combined with --watch, --serve or --merge.')
+
+    if command_line_args.merge_shard_paths and (command_line_args.watch or command_line_args.serve):
+        parser.error('--merge can not be combined with --watch or --serve.')
+
+    if command_line_args.baseline is not None and command_line_args.export_format != EXPORT_FORMAT_CSV:
+        parser.error('--baseline only supports the csv format.')
+
+    if command_line_args.baseline is not None and not os.path.isdir(command_line_args.baseline):
+        parser.error(f'The baseline directory {command_line_args.baseline} does not exist.')
+
+    if command_line_args.watch and command_line_args.export_format != EXPORT_FORMAT_CSV:
+        parser.error('--watch only supports the csv format.')
+
+    if command_line_args.watch and (command_line_args.targets or command_line_args.graph_direction != GRAPH_DIRECTION_CALLEES):
+        parser.error('--watch does not support --target and --direction.')
+
+    if command_line_args.graph_direction == GRAPH_DIRECTION_CALLERS and not command_line_args.targets:
+        parser.error('--direction callers requires --target.')
 
-    command_line_args = parser.parse_args()
+    if command_line_args.max_depth is not None and command_line_args.max_depth < 0:
+        parser.error('--max-depth must not be negative.')
 
-    logger.debug(f'Command line args: {command_line_args}')
+    if command_line_args.max_nodes is not None and command_line_args.max_nodes < 1:
+        parser.error('--max-nodes must be at least 1.')
+
+    logger.debug('Command line args: %s', command_line_args)
 
     return command_line_args
 
 
-def run_configured_graphit(command_line_args: Namespace):
+def run_configured_graphit(command_line_args: Namespace) -> Path:
+
+    from graphit.utils.diff_helpers import read_baseline_meta_data, create_graph_diff, export_graph_diff, \
+        export_graph_export_settings, read_baseline_graph_export_settings
+    from graphit.utils.export_helpers import export_meta_data
+    from graphit.utils.graph_root_helpers import export_all_graph_roots, link_graph_root_outputs
+    from graphit.utils.meta_data_helpers import create_function_and_module_meta_data, get_graph_function_roots, \
+        create_function_adjacency_index, create_reverse_function_adjacency_index, get_target_function_ids
+    from graphit.utils.watch_helpers import get_affected_function_ids
+
+    # start profiling, if enabled
+    profile = start_profile(trace_memory=command_line_args.profile_memory) if command_line_args.profile else None
 
     # prepare output directory
     temp_output_dir = create_output_directory(command_line_args.meta_data_export_directory)
 
-    # create pydantic models containing meta data on all found modules
-    all_modules = record_all_modules(reference_directory=command_line_args.reference_directory,
-                                     scope=command_line_args.module_scope,
-                                     ignore_scope=command_line_args.module_ignore_scope)
+    if command_line_args.merge_shard_paths:
+        # the modules and functions were recorded by the shards, so only their function calls need to be resolved
+        with profile_stage(profile, 'shard_merge') as stage_profile:
+            all_modules, all_functions, module_symbol_tables = merge_shard_artifacts(command_line_args.merge_shard_paths)
+            all_functions = resolve_all_function_calls(all_functions, all_modules, module_symbol_tables)
+            stage_profile['n_items'] = len(all_functions)
+    else:
+        # prepare the parse cache, unless disabled
+        if command_line_args.no_cache:
+            parse_cache_directory = None
+        else:
+            parse_cache_directory = prepare_parse_cache_directory(command_line_args.parse_cache_directory,
+                                                                  rebuild=command_line_args.rebuild_cache)
+
+        crawl_kwargs = dict(reference_directory=command_line_args.reference_directory,
+                            scope=command_line_args.module_scope,
+                            ignore_scope=command_line_args.module_ignore_scope,
+                            include_patterns=command_line_args.include_patterns,
+                            exclude_patterns=command_line_args.exclude_patterns,
+                            use_gitignore=command_line_args.use_gitignore,
+                            n_threads=command_line_args.n_crawler_threads)
+
+        if command_line_args.n_io_threads > 0:
+            # find, read and parse all modules in one streaming pipeline, then resolve the function calls
+            with profile_stage(profile, 'module_streaming') as stage_profile:
+                all_modules, all_functions, module_symbol_tables = record_unresolved_functions_from_module_stream(
+                    iterate_all_modules(**crawl_kwargs),
+                    n_jobs=command_line_args.n_jobs,
+                    n_io_threads=command_line_args.n_io_threads,
+                    parse_cache_directory=parse_cache_directory,
+                    parsing_mode=command_line_args.parsing_mode)
+                all_functions = resolve_all_function_calls(all_functions, all_modules, module_symbol_tables)
+                stage_profile['n_items'] = len(all_functions)
+        else:
+            # create records containing meta data on all found modules
+            with profile_stage(profile, 'module_discovery') as stage_profile:
+                all_modules = record_all_modules(**crawl_kwargs)
+                stage_profile['n_items'] = len(all_modules)
 
-    # create pydantic models containing meta data on all found functions
-    all_functions = record_all_functions_from_modules(recorded_modules=all_modules)
+            # create records containing meta data on all found functions
+            with profile_stage(profile, 'function_recording') as stage_profile:
+                all_functions = record_all_functions_from_modules(recorded_modules=all_modules,
+                                                                  n_jobs=command_line_args.n_jobs,
+                                                                  parse_cache_directory=parse_cache_directory,
+                                                                  parsing_mode=command_line_args.parsing_mode)
+                stage_profile['n_items'] = len(all_functions)
+
+        if parse_cache_directory is not None:
+            with profile_stage(profile, 'parse_cache_eviction') as stage_profile:
+                stage_profile['n_items'] = evict_parse_cache_entries(parse_cache_directory,
+                                                                     size_limit_mb=command_line_args.parse_cache_size_limit)
 
     # create all non-graph meta data & export
-    module_meta_data, function_meta_data, function_dependency_meta_data = create_function_and_module_meta_data(all_modules,
-                                                                                                               all_functions)
+    with profile_stage(profile, 'meta_data') as stage_profile:
+        module_meta_data, function_meta_data, function_dependency_meta_data = create_function_and_module_meta_data(all_modules,
+                                                                                                                   all_functions)
+        stage_profile['n_items'] = len(function_dependency_meta_data)
+
+    with profile_stage(profile, 'meta_data_export') as stage_profile:
+        for meta_data, meta_data_name in ((module_meta_data, 'module_meta_data'),
+                                          (function_meta_data, 'function_meta_data'),
+                                          (function_dependency_meta_data, 'function_dependency_meta_data')):
+            meta_data_filepath = export_meta_data(meta_data=meta_data,
+                                                  output_directory=temp_output_dir,
+                                                  meta_data_name=meta_data_name,
+                                                  export_format=command_line_args.export_format)
+            logger.info(f'Exported {meta_data_name.replace("_", " ")} to: {meta_data_filepath}')
 
-    module_meta_data_filepath = os.path.join(temp_output_dir,'graphit_module_meta_data.csv')
-    module_meta_data.to_csv(module_meta_data_filepath, index=False)
-    logger.info(f'Exported module meta data to: {module_meta_data_filepath}')
+        if command_line_args.export_store:
+            from graphit.utils.store_helpers import get_graph_store_file_path, write_graph_store
 
-    function_meta_data_filepath = os.path.join(temp_output_dir,'graphit_function_meta_data.csv')
-    function_meta_data.to_csv(function_meta_data_filepath, index=False)
-    logger.info(f'Exported function meta data to: {function_meta_data_filepath}')
+            graph_store_filepath = write_graph_store(store_file_path=get_graph_store_file_path(temp_output_dir),
+                                                     module_meta_data=module_meta_data,
+                                                     function_meta_data=function_meta_data,
+                                                     function_dependency_meta_data=function_dependency_meta_data)
+            logger.info(f'Exported graph store to: {graph_store_filepath}')
 
-    function_dependency_meta_data_filepath = os.path.join(temp_output_dir,'graphit_function_dependency_meta_data.csv')
-    function_dependency_meta_data.to_csv(function_dependency_meta_data_filepath, index=False)
-    logger.info(f'Exported function dependency meta data to: {function_dependency_meta_data_filepath}')
+        stage_profile['n_items'] = len(module_meta_data) + len(function_meta_data) + len(function_dependency_meta_data)
 
     # create all graph meta data, plot flowchart & export
-    graph_root_function_ids = get_graph_function_roots(function_meta_data=function_meta_data,
-                                                       function_dependency_meta_data=function_dependency_meta_data)
+    with profile_stage(profile, 'graph_roots') as stage_profile:
+        # only the graphs of the targets are built, if any are set
+        if command_line_args.targets:
+            graph_root_function_ids = get_target_function_ids(module_meta_data=module_meta_data,
+                                                              function_meta_data=function_meta_data,
+                                                              targets=command_line_args.targets)
+        else:
+            graph_root_function_ids = get_graph_function_roots(function_meta_data=function_meta_data,
+                                                               function_dependency_meta_data=function_dependency_meta_data)
+
+        # index the function dependencies once for all graph roots. the caller trees are built by walking the index
+        # the other way round
+        function_adjacency_index = create_function_adjacency_index(function_dependency_meta_data)
+
+        if command_line_args.graph_direction == GRAPH_DIRECTION_CALLERS:
+            function_adjacency_index = create_reverse_function_adjacency_index(function_adjacency_index)
+
+        stage_profile['n_items'] = len(graph_root_function_ids)
+
+    # the graph root outputs depend on these settings, too, so the outputs of a baseline exported with other settings
+    # can not be reused
+    graph_export_settings = {'graph_expansion_mode': command_line_args.graph_expansion_mode,
+                             'graph_direction': command_line_args.graph_direction,
+                             'max_depth': command_line_args.max_depth,
+                             'max_nodes': command_line_args.max_nodes,
+                             'renderer': command_line_args.renderer,
+                             'max_rows_per_page': command_line_args.max_rows_per_page}
+
+    if command_line_args.baseline is not None:
+        with profile_stage(profile, 'graph_diff') as stage_profile:
+            baseline_meta_data = read_baseline_meta_data(command_line_args.baseline)
+            graph_diff, changed_function_ids = create_graph_diff(baseline_meta_data,
+                                                                 (module_meta_data, function_meta_data, function_dependency_meta_data))
 
-    for graph_root_function_id in graph_root_function_ids:
-        # create graph meta data for current root function node
-        graph_meta_data = create_graph_meta_data(root_function_reference_id=graph_root_function_id,
-                                                 module_meta_data=module_meta_data,
-                                                 function_meta_data=function_meta_data,
-                                                 function_dependency_meta_data=function_dependency_meta_data)
+            baseline_function_adjacency_index = create_function_adjacency_index(baseline_meta_data[2])
 
-        graph_root_meta_data_filepath = os.path.join(temp_output_dir,
-                                                              f'graphit_{graph_root_function_id}_graph_meta_data.csv')
-        graph_meta_data.to_csv(graph_root_meta_data_filepath, index=False)
-        logger.info(f'Exported graph root {graph_root_function_id} meta data to: {graph_root_meta_data_filepath}')
+            if command_line_args.graph_direction == GRAPH_DIRECTION_CALLERS:
+                baseline_function_adjacency_index = create_reverse_function_adjacency_index(baseline_function_adjacency_index)
 
-        # plot flow chart for current root function node and export
-        full_diagram = plot_project_graph(graph_meta_data=graph_meta_data)
+            # the graph roots whose graph includes a changed function, before or after the change
+            affected_function_ids = get_affected_function_ids(changed_function_ids,
+                                                              [baseline_function_adjacency_index, function_adjacency_index])
 
-        graph_root_diagram_filepath = os.path.join(temp_output_dir,
-                                                     f'graphit_{graph_root_function_id}_graph_root_diagram.svg')
-        full_diagram.save(graph_root_diagram_filepath)
-        logger.info(f'Exported graph diagram for root {graph_root_function_id} to {graph_root_diagram_filepath}.')
+            is_baseline_reusable = read_baseline_graph_export_settings(command_line_args.baseline) == graph_export_settings
+
+            if not is_baseline_reusable:
+                logger.warning('The baseline %s was exported with other graph settings, all graph roots are exported again.',
+                               command_line_args.baseline)
+
+            reused_graph_root_function_ids = set([graph_root_function_id for graph_root_function_id in graph_root_function_ids
+                                                  if is_baseline_reusable and graph_root_function_id not in affected_function_ids and
+                                                  link_graph_root_outputs(graph_root_function_id=graph_root_function_id,
+                                                                          baseline_directory=command_line_args.baseline,
+                                                                          output_directory=temp_output_dir,
+                                                                          export_diagrams=not command_line_args.no_diagrams)])
+            graph_root_function_ids = [graph_root_function_id for graph_root_function_id in graph_root_function_ids
+                                       if graph_root_function_id not in reused_graph_root_function_ids]
+
+            graph_diff['baseline_directory'] = str(command_line_args.baseline)
+            graph_diff['n_exported_graph_roots'] = len(graph_root_function_ids)
+            graph_diff['n_reused_graph_roots'] = len(reused_graph_root_function_ids)
+            export_graph_diff(graph_diff, temp_output_dir)
+
+            stage_profile['n_items'] = len(changed_function_ids)
+
+    with profile_stage(profile, 'graph_root_export') as stage_profile:
+        export_graph_export_settings(graph_export_settings, temp_output_dir)
+
+        graph_root_exports = export_all_graph_roots(graph_root_function_ids=graph_root_function_ids,
+                                                    module_meta_data=module_meta_data,
+                                                    function_meta_data=function_meta_data,
+                                                    function_adjacency_index=function_adjacency_index,
+                                                    output_directory=temp_output_dir,
+                                                    graph_expansion_mode=command_line_args.graph_expansion_mode,
+                                                    export_format=command_line_args.export_format,
+                                                    n_jobs=command_line_args.n_jobs,
+                                                    export_diagrams=not command_line_args.no_diagrams,
+                                                    renderer=command_line_args.renderer,
+                                                    max_rows_per_page=command_line_args.max_rows_per_page,
+                                                    max_depth=command_line_args.max_depth,
+                                                    max_nodes=command_line_args.max_nodes,
+                                                    profile=profile is not None and command_line_args.profile_memory)
+        stage_profile['n_items'] = sum([graph_root_export['n_graph_records'] for graph_root_export in graph_root_exports])
+
+        # each graph root export resets the peak memory, so the stage's peak is the largest of the graph roots' peaks
+        if profile is not None and command_line_args.profile_memory and graph_root_exports:
+            stage_profile['peak_memory_mb'] = max([graph_root_export['peak_memory_mb'] for graph_root_export in graph_root_exports])
+
+    if profile is not None:
+        add_graph_root_profiles(profile, graph_root_exports)
+        write_profile_report(profile, temp_output_dir)
 
     logger.info('Done.')
 
+    return temp_output_dir
+
+
+def watch_configured_graphit(command_line_args: Namespace):
+
+    from graphit.utils.watch_helpers import watch_project
+
+    # prepare output directory. all updates are written to the same directory
+    temp_output_dir = create_output_directory(command_line_args.meta_data_export_directory)
+
+    # prepare the parse cache, unless disabled
+    if command_line_args.no_cache:
+        parse_cache_directory = None
+    else:
+        parse_cache_directory = prepare_parse_cache_directory(command_line_args.parse_cache_directory,
+                                                              rebuild=command_line_args.rebuild_cache)
+
+    watch_project(reference_directory=command_line_args.reference_directory,
+                  output_directory=temp_output_dir,
+                  scope=command_line_args.module_scope,
+                  ignore_scope=command_line_args.module_ignore_scope,
+                  crawl_kwargs={'include_patterns': command_line_args.include_patterns,
+                                'exclude_patterns': command_line_args.exclude_patterns,
+                                'use_gitignore': command_line_args.use_gitignore,
+                                'n_threads': command_line_args.n_crawler_threads},
+                  parse_cache_directory=parse_cache_directory,
+                  parsing_mode=command_line_args.parsing_mode,
+                  graph_expansion_mode=command_line_args.graph_expansion_mode,
+                  n_jobs=command_line_args.n_jobs,
+                  export_diagrams=not command_line_args.no_diagrams,
+                  renderer=command_line_args.renderer,
+                  max_rows_per_page=command_line_args.max_rows_per_page,
+                  max_depth=command_line_args.max_depth,
+                  max_nodes=command_line_args.max_nodes,
+                  export_store=command_line_args.export_store,
+                  poll_interval=command_line_args.watch_interval)
+
+    if parse_cache_directory is not None:
+        evict_parse_cache_entries(parse_cache_directory, size_limit_mb=command_line_args.parse_cache_size_limit)
+
+    return
+
+
+def serve_configured_graphit(command_line_args: Namespace):
+
+    from graphit.utils.meta_data_helpers import create_function_and_module_meta_data
+    from graphit.utils.serve_helpers import create_query_index, serve_query_index
+
+    # prepare the parse cache, unless disabled
+    if command_line_args.no_cache:
+        parse_cache_directory = None
+    else:
+        parse_cache_directory = prepare_parse_cache_directory(command_line_args.parse_cache_directory,
+                                                              rebuild=command_line_args.rebuild_cache)
+
+    # record the project once, and keep its index in memory for all queries
+    all_modules = record_all_modules(reference_directory=command_line_args.reference_directory,
+                                     scope=command_line_args.module_scope,
+                                     ignore_scope=command_line_args.module_ignore_scope,
+                                     include_patterns=command_line_args.include_patterns,
+                                     exclude_patterns=command_line_args.exclude_patterns,
+                                     use_gitignore=command_line_args.use_gitignore,
+                                     n_threads=command_line_args.n_crawler_threads)
+
+    all_functions = record_all_functions_from_modules(recorded_modules=all_modules,
+                                                      n_jobs=command_line_args.n_jobs,
+                                                      parse_cache_directory=parse_cache_directory,
+                                                      parsing_mode=command_line_args.parsing_mode)
+
+    if parse_cache_directory is not None:
+        evict_parse_cache_entries(parse_cache_directory, size_limit_mb=command_line_args.parse_cache_size_limit)
+
+    query_index = create_query_index(*create_function_and_module_meta_data(all_modules, all_functions))
+
+    serve_query_index(query_index,
+                      host=command_line_args.serve_host,
+                      port=command_line_args.serve_port,
+                      response_cache_size_limit_mb=command_line_args.response_cache_size_limit)
+
+    return
+
+
+def shard_configured_graphit(command_line_args: Namespace):
+
+    shard_number, n_shards = command_line_args.shard
+
+    # all shards find all modules, so that each module is assigned to exactly one shard
+    all_modules = record_all_modules(reference_directory=command_line_args.reference_directory,
+                                     scope=command_line_args.module_scope,
+                                     ignore_scope=command_line_args.module_ignore_scope,
+                                     include_patterns=command_line_args.include_patterns,
+                                     exclude_patterns=command_line_args.exclude_patterns,
+                                     use_gitignore=command_line_args.use_gitignore,
+                                     n_threads=command_line_args.n_crawler_threads)
+
+    shard_module_indices = [module_index for module_index, module in enumerate(all_modules)
+                            if get_module_shard_number(module, n_shards) == shard_number]
+
+    # prepare the parse cache, unless disabled
+    if command_line_args.no_cache:
+        parse_cache_directory = None
+    else:
+        parse_cache_directory = prepare_parse_cache_directory(command_line_args.parse_cache_directory,
+                                                              rebuild=command_line_args.rebuild_cache)
+
+    # function calls can only be resolved once all shards' symbol tables are merged
+    shard_functions, shard_module_symbol_tables = record_unresolved_functions_from_modules(
+        recorded_modules=[all_modules[module_index] for module_index in shard_module_indices],
+        n_jobs=command_line_args.n_jobs,
+        parse_cache_directory=parse_cache_directory,
+        parsing_mode=command_line_args.parsing_mode)
+
+    if parse_cache_directory is not None:
+        evict_parse_cache_entries(parse_cache_directory, size_limit_mb=command_line_args.parse_cache_size_limit)
+
+    write_shard_artifact(output_directory=command_line_args.meta_data_export_directory,
+                         shard_number=shard_number,
+                         n_shards=n_shards,
+                         all_modules=all_modules,
+                         shard_module_indices=shard_module_indices,
+                         shard_functions=shard_functions,
+                         shard_module_symbol_tables=shard_module_symbol_tables)
+
     return
\ No newline at end of file
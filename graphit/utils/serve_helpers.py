@@ -0,0 +1,457 @@
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from graphit.settings import logger, GRAPH_EXPANSION_MODE_FULL, GRAPH_EXPANSION_MODES, GRAPH_DIRECTION_CALLEES, \
+    GRAPH_DIRECTION_CALLERS, GRAPH_DIRECTIONS, SERVE_HOST, SERVE_PORT, SERVE_RESPONSE_CACHE_SIZE_LIMIT_MB, \
+    SERVE_SUBTREE_MAX_NODES
+from graphit.utils.meta_data_helpers import create_function_adjacency_index, create_reverse_function_adjacency_index, \
+    create_graph_meta_data, get_graph_function_roots, get_target_function_ids
+
+
+def create_query_index(module_meta_data: pd.DataFrame,
+                       function_meta_data: pd.DataFrame,
+                       function_dependency_meta_data: pd.DataFrame) -> Dict:
+    '''
+    Creates the in memory index of a project that all queries of the query server are answered from:
+    - module_meta_data, function_meta_data: the meta data tables, see
+        graphit.utils.meta_data_helpers.create_function_and_module_meta_data
+    - functions: function id -> the function's handle, import path, module import path, file path and definition lines
+    - adjacency_indices: graph direction -> the function adjacency index walked for that direction, i.e. the callee
+        index (see create_function_adjacency_index) or the caller index (see create_reverse_function_adjacency_index)
+    - graph_root_function_ids: the ids of the functions that are not called by any other function
+
+    Args:
+        module_meta_data:
+        function_meta_data:
+        function_dependency_meta_data:
+
+    Returns:
+
+    '''
+
+    module_records = module_meta_data.set_index('unique_reference_id')[['import_path', 'file_path']].to_dict('index')
+
+    functions = {}
+
+    for function_id, function_handle, module_id, definition_start_line_index, definition_end_line_index in zip(
+            function_meta_data['unique_reference_id'].tolist(),
+            function_meta_data['function_handle'].tolist(),
+            function_meta_data['source_module_reference_id'].tolist(),
+            function_meta_data['definition_start_line_index'].tolist(),
+            function_meta_data['definition_end_line_index'].tolist()):
+        module_record = module_records.get(module_id, {'import_path': '', 'file_path': ''})
+
+        functions[function_id] = {'function_id': function_id,
+                                  'function_handle': function_handle,
+                                  'import_path': f'{module_record["import_path"]}.{function_handle}',
+                                  'module_import_path': module_record['import_path'],
+                                  'file_path': module_record['file_path'],
+                                  'definition_start_line_index': definition_start_line_index,
+                                  'definition_end_line_index': definition_end_line_index}
+
+    function_adjacency_index = create_function_adjacency_index(function_dependency_meta_data)
+
+    return {'module_meta_data': module_meta_data,
+            'function_meta_data': function_meta_data,
+            'functions': functions,
+            'adjacency_indices': {GRAPH_DIRECTION_CALLEES: function_adjacency_index,
+                                  GRAPH_DIRECTION_CALLERS: create_reverse_function_adjacency_index(function_adjacency_index)},
+            'graph_root_function_ids': get_graph_function_roots(function_meta_data=function_meta_data,
+                                                                function_dependency_meta_data=function_dependency_meta_data)}
+
+
+def get_query_function_ids(query_index: Dict,
+                           target: str) -> List[str]:
+    '''
+    Returns the ids of the functions the specified target refers to, i.e. the target itself if it is a function id, and
+    otherwise all functions it matches, see graphit.utils.meta_data_helpers.get_target_function_ids. Raises a
+    LookupError if the target doesn't match any function.
+
+    Args:
+        query_index:
+        target:
+
+    Returns:
+
+    '''
+
+    if target in query_index['functions']:
+        return [target]
+
+    try:
+        return get_target_function_ids(module_meta_data=query_index['module_meta_data'],
+                                       function_meta_data=query_index['function_meta_data'],
+                                       targets=[target])
+    except ValueError as e:
+        raise LookupError(str(e))
+
+
+def query_functions(query_index: Dict,
+                    target: str) -> List[Dict]:
+    '''
+    Looks up the functions the specified target refers to, see get_query_function_ids.
+
+    Args:
+        query_index:
+        target:
+
+    Returns:
+
+    '''
+
+    return [query_index['functions'][function_id] for function_id in get_query_function_ids(query_index, target)]
+
+
+def query_neighbours(query_index: Dict,
+                     target: str,
+                     graph_direction: str = GRAPH_DIRECTION_CALLEES) -> List[Dict]:
+    '''
+    Looks up the functions the specified target refers to, along with their direct callees or callers, in the order of
+    the adjacency index of the specified graph direction.
+
+    Args:
+        query_index:
+        target:
+        graph_direction: Either 'callees' or 'callers'
+
+    Returns:
+
+    '''
+
+    function_adjacency_index = query_index['adjacency_indices'][graph_direction]
+
+    return [dict(query_index['functions'][function_id],
+                 **{graph_direction: [query_index['functions'][neighbour_function_id]
+                                      for neighbour_function_id, _ in function_adjacency_index.get(function_id, [])]})
+            for function_id in get_query_function_ids(query_index, target)]
+
+
+def query_subtree(query_index: Dict,
+                  function_id: str,
+                  graph_direction: str = GRAPH_DIRECTION_CALLEES,
+                  max_depth: Optional[int] = None,
+                  max_nodes: Optional[int] = SERVE_SUBTREE_MAX_NODES,
+                  graph_expansion_mode: str = GRAPH_EXPANSION_MODE_FULL) -> pd.DataFrame:
+    '''
+    Creates the graph meta data of the callee or caller tree of the specified function, see
+    graphit.utils.meta_data_helpers.create_graph_meta_data.
+
+    Args:
+        query_index:
+        function_id:
+        graph_direction: Either 'callees' or 'callers'
+        max_depth:
+        max_nodes:
+        graph_expansion_mode:
+
+    Returns:
+
+    '''
+
+    return create_graph_meta_data(root_function_reference_id=function_id,
+                                  module_meta_data=query_index['module_meta_data'],
+                                  function_meta_data=query_index['function_meta_data'],
+                                  function_adjacency_index=query_index['adjacency_indices'][graph_direction],
+                                  graph_expansion_mode=graph_expansion_mode,
+                                  max_depth=max_depth,
+                                  max_nodes=max_nodes)
+
+
+def render_subtree_svg(graph_meta_data: pd.DataFrame) -> bytes:
+    '''
+    Renders the flow chart of the specified graph meta data with the svg renderer, and returns the svg document.
+
+    Args:
+        graph_meta_data:
+
+    Returns:
+
+    '''
+
+    from graphit.utils.svg_helpers import render_svg_flow_chart
+
+    with tempfile.TemporaryDirectory() as temp_directory:
+        svg_file_path = os.path.join(temp_directory, 'graph_root_diagram.svg')
+        render_svg_flow_chart(graph_meta_data, svg_file_path)
+
+        with open(svg_file_path, 'rb') as svg_file:
+            return svg_file.read()
+
+
+def create_response_cache(size_limit_mb: float = SERVE_RESPONSE_CACHE_SIZE_LIMIT_MB) -> Dict:
+    '''
+    Creates an empty response cache, which holds the bodies of the most recently used responses up to the specified
+    total size. The cache is shared by all request handler threads, and guarded by its lock.
+
+    Args:
+        size_limit_mb:
+
+    Returns:
+
+    '''
+
+    return {'responses': OrderedDict(),
+            'size_bytes': 0,
+            'size_limit_bytes': size_limit_mb * 1024 ** 2,
+            'lock': threading.Lock()}
+
+
+def get_cached_response(response_cache: Dict,
+                        cache_key: Tuple) -> Optional[bytes]:
+    '''
+    Returns the cached response body of the specified key and marks it as most recently used, or None if it is not
+    cached.
+
+    Args:
+        response_cache:
+        cache_key:
+
+    Returns:
+
+    '''
+
+    with response_cache['lock']:
+        response_body = response_cache['responses'].get(cache_key)
+
+        if response_body is not None:
+            response_cache['responses'].move_to_end(cache_key)
+
+    return response_body
+
+
+def cache_response(response_cache: Dict,
+                   cache_key: Tuple,
+                   response_body: bytes) -> None:
+    '''
+    Adds the specified response body to the response cache, evicting the least recently used responses until the cache
+    is within its size limit again. Responses larger than the whole cache are not cached at all.
+
+    Args:
+        response_cache:
+        cache_key:
+        response_body:
+
+    Returns:
+
+    '''
+
+    if len(response_body) > response_cache['size_limit_bytes']:
+        return
+
+    with response_cache['lock']:
+        if cache_key in response_cache['responses']:
+            response_cache['size_bytes'] -= len(response_cache['responses'].pop(cache_key))
+
+        response_cache['responses'][cache_key] = response_body
+        response_cache['size_bytes'] += len(response_body)
+
+        while response_cache['size_bytes'] > response_cache['size_limit_bytes']:
+            _, evicted_response_body = response_cache['responses'].popitem(last=False)
+            response_cache['size_bytes'] -= len(evicted_response_body)
+
+
+def get_query_parameter(query_parameters: Dict[str, List[str]],
+                        parameter_name: str,
+                        parameter_type: type = str,
+                        default=None,
+                        choices: Optional[List] = None,
+                        required: bool = False):
+    '''
+    Returns the (last) value of the specified url query parameter, converted to the specified type, or the default if
+    the parameter is not set. Raises a ValueError if the parameter is required but missing, can't be converted or is
+    not one of the choices.
+
+    Args:
+        query_parameters: See urllib.parse.parse_qs
+        parameter_name:
+        parameter_type:
+        default:
+        choices:
+        required:
+
+    Returns:
+
+    '''
+
+    if parameter_name not in query_parameters:
+        if required:
+            raise ValueError(f'Missing query parameter {parameter_name}.')
+
+        return default
+
+    try:
+        parameter_value = parameter_type(query_parameters[parameter_name][-1])
+    except ValueError:
+        raise ValueError(f'Invalid value for query parameter {parameter_name}: {query_parameters[parameter_name][-1]}.')
+
+    if choices is not None and parameter_value not in choices:
+        raise ValueError(f'Query parameter {parameter_name} must be one of {", ".join(choices)}.')
+
+    return parameter_value
+
+
+def handle_query(query_index: Dict,
+                 response_cache: Dict,
+                 query_path: str,
+                 query_parameters: Dict[str, List[str]]) -> Tuple[int, str, bytes]:
+    '''
+    Answers a query of the query server, and returns the response's status code, content type and body. The routes are
+    - /functions?target=...: the functions the target refers to, see get_query_function_ids
+    - /callees?target=..., /callers?target=...: the functions the target refers to, with their direct callees/callers
+    - /roots: the functions that are not called by any other function
+    - /subtree?target=...: the graph meta data of the callee (or with &direction=callers, the caller) tree of each of the
+        functions the target refers to, optionally limited with &depth=... and &max_nodes=...
+    - /svg?target=...: the flow chart of the tree of the single function the target refers to, with the same options
+        as /subtree
+
+    The responses of /subtree and /svg are cached, see create_response_cache. Malformed queries are answered with a
+    400, and targets that don't match any function with a 404.
+
+    Args:
+        query_index: See create_query_index
+        response_cache: See create_response_cache
+        query_path:
+        query_parameters: See urllib.parse.parse_qs
+
+    Returns:
+
+    '''
+
+    try:
+        if query_path == '/roots':
+            return 200, 'application/json', json.dumps([query_index['functions'][function_id] for function_id in
+                                                        query_index['graph_root_function_ids']]).encode()
+
+        if query_path in ('/functions', '/callees', '/callers'):
+            target = get_query_parameter(query_parameters, 'target', required=True)
+
+            if query_path == '/functions':
+                response = query_functions(query_index, target)
+            else:
+                response = query_neighbours(query_index, target, graph_direction=query_path.lstrip('/'))
+
+            return 200, 'application/json', json.dumps(response).encode()
+
+        if query_path in ('/subtree', '/svg'):
+            target = get_query_parameter(query_parameters, 'target', required=True)
+            subtree_kwargs = {'graph_direction': get_query_parameter(query_parameters, 'direction', str,
+                                                                     GRAPH_DIRECTION_CALLEES, GRAPH_DIRECTIONS),
+                              'max_depth': get_query_parameter(query_parameters, 'depth', int),
+                              'max_nodes': get_query_parameter(query_parameters, 'max_nodes', int, SERVE_SUBTREE_MAX_NODES),
+                              'graph_expansion_mode': get_query_parameter(query_parameters, 'expansion', str,
+                                                                          GRAPH_EXPANSION_MODE_FULL, GRAPH_EXPANSION_MODES)}
+
+            if subtree_kwargs['max_depth'] is not None and subtree_kwargs['max_depth'] < 0:
+                raise ValueError('Query parameter depth must not be negative.')
+
+            if subtree_kwargs['max_nodes'] < 1:
+                raise ValueError('Query parameter max_nodes must be at least 1.')
+
+            cache_key = (query_path, target) + tuple(sorted(subtree_kwargs.items()))
+            response_body = get_cached_response(response_cache, cache_key)
+
+            if response_body is not None:
+                logger.debug('Answering query %s for %s from the response cache.', query_path, target)
+                return 200, 'image/svg+xml' if query_path == '/svg' else 'application/json', response_body
+
+            function_ids = get_query_function_ids(query_index, target)
+
+            if query_path == '/svg':
+                if len(function_ids) > 1:
+                    raise ValueError(f'Target {target} matches {len(function_ids)} functions, but /svg needs exactly one.')
+
+                response_body = render_subtree_svg(query_subtree(query_index, function_ids[0], **subtree_kwargs))
+                content_type = 'image/svg+xml'
+            else:
+                response_body = json.dumps([{'function_id': function_id,
+                                             'graph_meta_data': json.loads(query_subtree(query_index, function_id, **subtree_kwargs).to_json(orient='records'))}
+                                            for function_id in function_ids]).encode()
+                content_type = 'application/json'
+
+            cache_response(response_cache, cache_key, response_body)
+
+            return 200, content_type, response_body
+    except LookupError as e:
+        return 404, 'application/json', json.dumps({'error': str(e)}).encode()
+    except ValueError as e:
+        return 400, 'application/json', json.dumps({'error': str(e)}).encode()
+
+    return 404, 'application/json', json.dumps({'error': f'Unknown route {query_path}.'}).encode()
+
+
+def create_query_server(query_index: Dict,
+                        host: str = SERVE_HOST,
+                        port: int = SERVE_PORT,
+                        response_cache_size_limit_mb: float = SERVE_RESPONSE_CACHE_SIZE_LIMIT_MB) -> ThreadingHTTPServer:
+    '''
+    Creates the local http server answering json queries about the specified query index, see handle_query. Each
+    request is handled on its own thread. Port 0 binds any free port, see the returned server's server_address.
+
+    Args:
+        query_index: See create_query_index
+        host:
+        port:
+        response_cache_size_limit_mb:
+
+    Returns:
+
+    '''
+
+    response_cache = create_response_cache(response_cache_size_limit_mb)
+
+    class QueryRequestHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            parsed_url = urlparse(self.path)
+            status_code, content_type, response_body = handle_query(query_index, response_cache, parsed_url.path,
+                                                                    parse_qs(parsed_url.query))
+
+            self.send_response(status_code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(response_body)))
+            self.end_headers()
+            self.wfile.write(response_body)
+
+        def log_message(self, format, *args):
+            logger.debug('Query server: ' + format, *args)
+
+    return ThreadingHTTPServer((host, port), QueryRequestHandler)
+
+
+def serve_query_index(query_index: Dict,
+                      host: str = SERVE_HOST,
+                      port: int = SERVE_PORT,
+                      response_cache_size_limit_mb: float = SERVE_RESPONSE_CACHE_SIZE_LIMIT_MB) -> None:
+    '''
+    Serves queries about the specified query index until interrupted, see create_query_server.
+
+    Args:
+        query_index: See create_query_index
+        host:
+        port:
+        response_cache_size_limit_mb:
+
+    Returns:
+
+    '''
+
+    query_server = create_query_server(query_index, host=host, port=port,
+                                       response_cache_size_limit_mb=response_cache_size_limit_mb)
+
+    logger.info(f'Serving queries about {len(query_index["functions"])} functions on '
+                f'http://{query_server.server_address[0]}:{query_server.server_address[1]}. Press Ctrl+C to stop.')
+
+    try:
+        query_server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info('Stopped serving.')
+    finally:
+        query_server.server_close()
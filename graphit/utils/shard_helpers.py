@@ -0,0 +1,196 @@
+import glob
+import hashlib
+import json
+import os
+from argparse import ArgumentTypeError
+from pathlib import Path
+from typing import List, Dict, Tuple
+
+from graphit.settings import logger, SHARD_ARTIFACT_FORMAT_VERSION
+from graphit.utils.cache_helpers import write_json_atomically
+from graphit.utils.records import ModuleRecord, FunctionRecord
+
+
+def parse_shard_specification(shard_specification: str) -> Tuple[int, int]:
+    '''
+    Parses a shard specification of the form 'i/N', i.e. the i-th of N shards, counting from 1. Used as the argparse
+    type of the --shard option, so raises an ArgumentTypeError for invalid specifications.
+
+    Args:
+        shard_specification: E.g. '2/8'
+
+    Returns:
+
+    '''
+
+    try:
+        shard_number, n_shards = [int(shard_specification_part) for shard_specification_part in shard_specification.split('/')]
+    except ValueError:
+        raise ArgumentTypeError(f'Invalid shard {shard_specification}, expected the form i/N, e.g. 2/8.')
+
+    if not 1 <= shard_number <= n_shards:
+        raise ArgumentTypeError(f'Invalid shard {shard_specification}, i must be between 1 and N.')
+
+    return shard_number, n_shards
+
+
+def get_module_shard_number(recorded_module: ModuleRecord,
+                            n_shards: int) -> int:
+    '''
+    Assigns the specified module to one of n_shards shards (counting from 1), based on a hash of the module's id. The
+    assignment only depends on the module's import path, so every shard assigns every module the same way, regardless
+    of the machine, the order the modules are found in or the other modules of the project.
+
+    Args:
+        recorded_module:
+        n_shards:
+
+    Returns:
+
+    '''
+
+    return int.from_bytes(hashlib.sha256(recorded_module.unique_reference_id.encode()).digest()[:8], 'big') % n_shards + 1
+
+
+def get_shard_artifact_file_path(output_directory: Path,
+                                 shard_number: int,
+                                 n_shards: int) -> str:
+
+    return os.path.join(output_directory, f'graphit_shard_{shard_number}_of_{n_shards}.json')
+
+
+def write_shard_artifact(output_directory: Path,
+                         shard_number: int,
+                         n_shards: int,
+                         all_modules: List[ModuleRecord],
+                         shard_module_indices: List[int],
+                         shard_functions: List[FunctionRecord],
+                         shard_module_symbol_tables: Dict[str, Dict]) -> str:
+    '''
+    Writes the artifact of a shard, i.e. the shard's modules (along with their positions among all found modules), their
+    functions with unresolved function calls and their symbol tables, to the file graphit_shard_{i}_of_{N}.json in the
+    specified output directory. The artifact is written atomically, so a merge never reads a partially written artifact.
+    Returns the artifact's file path.
+
+    Args:
+        output_directory:
+        shard_number:
+        n_shards:
+        all_modules: All found modules, not just the shard's
+        shard_module_indices: The positions of the shard's modules in all_modules
+        shard_functions: See graphit.utils.function_helpers.record_unresolved_functions_from_modules
+        shard_module_symbol_tables: See graphit.utils.function_helpers.record_unresolved_functions_from_modules
+
+    Returns:
+
+    '''
+
+    shard_artifact = {'format_version': SHARD_ARTIFACT_FORMAT_VERSION,
+                      'shard_number': shard_number,
+                      'n_shards': n_shards,
+                      'n_modules': len(all_modules),
+                      'modules': [[module_index] + [getattr(all_modules[module_index], slot) for slot in ModuleRecord.__slots__]
+                                  for module_index in shard_module_indices],
+                      'functions': [[getattr(shard_function, slot) for slot in FunctionRecord.__slots__] for shard_function in shard_functions],
+                      'module_symbol_tables': shard_module_symbol_tables}
+
+    shard_artifact_file_path = get_shard_artifact_file_path(output_directory, shard_number, n_shards)
+    write_json_atomically(shard_artifact_file_path, shard_artifact)
+
+    logger.info(f'Exported shard {shard_number}/{n_shards} with {len(shard_module_indices)} modules and '
+                f'{len(shard_functions)} functions to: {shard_artifact_file_path}')
+
+    return shard_artifact_file_path
+
+
+def find_shard_artifact_file_paths(shard_artifact_paths: List[Path]) -> List[str]:
+    '''
+    Returns the shard artifact files among the specified paths. Directories are searched for shard artifacts, so that
+    all shards can simply write to the same directory.
+
+    Args:
+        shard_artifact_paths: Shard artifact files and/or directories containing them
+
+    Returns:
+
+    '''
+
+    shard_artifact_file_paths = []
+
+    for shard_artifact_path in shard_artifact_paths:
+        if os.path.isdir(shard_artifact_path):
+            shard_artifact_file_paths.extend(sorted(glob.glob(os.path.join(glob.escape(str(shard_artifact_path)),
+                                                                           'graphit_shard_*_of_*.json'))))
+        else:
+            shard_artifact_file_paths.append(str(shard_artifact_path))
+
+    return shard_artifact_file_paths
+
+
+def merge_shard_artifacts(shard_artifact_paths: List[Path]) -> Tuple[List[ModuleRecord], List[FunctionRecord], Dict[str, Dict]]:
+    '''
+    Reads and merges the artifacts of all shards of a sharded run, see write_shard_artifact. Modules and functions are
+    returned in the order the modules were found in, i.e. the same order as in an unsharded run, along with the symbol
+    tables of all modules. The function calls are still unresolved, see
+    graphit.utils.function_helpers.resolve_all_function_calls.
+
+    Raises a ValueError if the artifacts don't make up exactly one complete set of shards.
+
+    Args:
+        shard_artifact_paths: See find_shard_artifact_file_paths
+
+    Returns:
+
+    '''
+
+    shard_artifacts = {}
+
+    for shard_artifact_file_path in find_shard_artifact_file_paths(shard_artifact_paths):
+        with open(shard_artifact_file_path, 'r') as f:
+            shard_artifact = json.load(f)
+
+        if shard_artifact.get('format_version') != SHARD_ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f'The shard artifact {shard_artifact_file_path} was written by an incompatible graphit version.')
+
+        if shard_artifact['shard_number'] in shard_artifacts:
+            raise ValueError(f'Found shard {shard_artifact["shard_number"]}/{shard_artifact["n_shards"]} more than once.')
+
+        shard_artifacts[shard_artifact['shard_number']] = shard_artifact
+
+    if not shard_artifacts:
+        raise ValueError(f'Found no shard artifacts in {", ".join([str(path) for path in shard_artifact_paths])}.')
+
+    n_shards = set([(shard_artifact['n_shards'], shard_artifact['n_modules']) for shard_artifact in shard_artifacts.values()])
+
+    if len(n_shards) > 1:
+        raise ValueError('The shard artifacts belong to different sharded runs.')
+
+    n_shards, n_modules = n_shards.pop()
+    missing_shard_numbers = sorted(set(range(1, n_shards + 1)).difference(shard_artifacts))
+
+    if missing_shard_numbers:
+        raise ValueError(f'Missing the artifacts of shards {", ".join([f"{shard_number}/{n_shards}" for shard_number in missing_shard_numbers])}.')
+
+    # restore the order the modules were found in, and that of their functions
+    indexed_modules = sorted([(module_row[0], ModuleRecord(*module_row[1:]))
+                              for shard_artifact in shard_artifacts.values() for module_row in shard_artifact['modules']],
+                             key=lambda indexed_module: indexed_module[0])
+
+    if [module_index for module_index, _ in indexed_modules] != list(range(n_modules)):
+        raise ValueError('The shard artifacts do not cover all modules of the sharded run.')
+
+    module_functions = {}
+
+    for shard_artifact in shard_artifacts.values():
+        for function_row in shard_artifact['functions']:
+            function_record = FunctionRecord(*function_row)
+            module_functions.setdefault(function_record.source_module_reference_id, []).append(function_record)
+
+    all_modules = [module for _, module in indexed_modules]
+    all_functions = [function_record for module in all_modules for function_record in module_functions.get(module.unique_reference_id, [])]
+    module_symbol_tables = dict([(module_id, module_symbol_table) for shard_artifact in shard_artifacts.values()
+                                 for module_id, module_symbol_table in shard_artifact['module_symbol_tables'].items()])
+
+    logger.info(f'Merged {n_shards} shards with {len(all_modules)} modules and {len(all_functions)} functions.')
+
+    return all_modules, all_functions, module_symbol_tables
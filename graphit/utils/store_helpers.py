@@ -0,0 +1,285 @@
+import os
+import sqlite3
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from graphit.settings import logger, GRAPH_STORE_FILE_NAME, GRAPH_DIRECTION_CALLEES, GRAPH_DIRECTION_CALLERS
+from graphit.utils.symbol_helpers import get_module_symbol_path
+
+# the tables of the graph store mirror the module, function and function dependency meta data. functions additionally
+# store their import path, so that they can be looked up by it
+GRAPH_STORE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS modules (
+    unique_reference_id TEXT PRIMARY KEY,
+    file_path TEXT,
+    import_path TEXT,
+    reference_directory TEXT
+);
+CREATE TABLE IF NOT EXISTS functions (
+    unique_reference_id TEXT PRIMARY KEY,
+    function_handle TEXT,
+    source_module_reference_id TEXT,
+    definition_start_line_index INTEGER,
+    definition_end_line_index INTEGER,
+    definition_start_line_offset INTEGER,
+    definition_end_line_offset INTEGER,
+    n_dependency_functions INTEGER,
+    import_path TEXT
+);
+CREATE TABLE IF NOT EXISTS function_dependencies (
+    unique_reference_id TEXT,
+    function_dependency_reference_id TEXT,
+    function_dependency_index INTEGER
+);
+CREATE INDEX IF NOT EXISTS modules_import_path ON modules (import_path);
+CREATE INDEX IF NOT EXISTS functions_function_handle ON functions (function_handle);
+CREATE INDEX IF NOT EXISTS functions_import_path ON functions (import_path);
+CREATE INDEX IF NOT EXISTS functions_source_module_reference_id ON functions (source_module_reference_id);
+CREATE INDEX IF NOT EXISTS function_dependencies_callees ON function_dependencies (unique_reference_id, function_dependency_index);
+CREATE INDEX IF NOT EXISTS function_dependencies_callers ON function_dependencies (function_dependency_reference_id);
+'''
+
+GRAPH_STORE_TABLES = {'modules': ['unique_reference_id', 'file_path', 'import_path', 'reference_directory'],
+                      'functions': ['unique_reference_id', 'function_handle', 'source_module_reference_id',
+                                    'definition_start_line_index', 'definition_end_line_index',
+                                    'definition_start_line_offset', 'definition_end_line_offset',
+                                    'n_dependency_functions'],
+                      'function_dependencies': ['unique_reference_id', 'function_dependency_reference_id',
+                                                'function_dependency_index']}
+
+# the columns walked by the recursive queries, i.e. (from, to) of each dependency edge, for each graph direction
+GRAPH_STORE_EDGE_COLUMNS = {GRAPH_DIRECTION_CALLEES: ('unique_reference_id', 'function_dependency_reference_id'),
+                            GRAPH_DIRECTION_CALLERS: ('function_dependency_reference_id', 'unique_reference_id')}
+
+
+def get_graph_store_file_path(output_directory: Path) -> str:
+
+    return os.path.join(output_directory, GRAPH_STORE_FILE_NAME)
+
+
+def open_graph_store(store_file_path: str) -> sqlite3.Connection:
+    '''
+    Opens (and if needed, creates) the sqlite graph store at the specified file path, including its tables and indexes.
+
+    Args:
+        store_file_path:
+
+    Returns:
+
+    '''
+
+    connection = sqlite3.connect(store_file_path)
+    connection.executescript(GRAPH_STORE_SCHEMA)
+
+    return connection
+
+
+def write_graph_store(store_file_path: str,
+                      module_meta_data: pd.DataFrame,
+                      function_meta_data: pd.DataFrame,
+                      function_dependency_meta_data: pd.DataFrame) -> str:
+    '''
+    Writes the module, function and function dependency meta data to the sqlite graph store at the specified file path,
+    replacing any previous contents. All tables are written in bulk, in a single transaction, so readers never see a
+    partially written store. Returns the store's file path.
+
+    Args:
+        store_file_path:
+        module_meta_data:
+        function_meta_data:
+        function_dependency_meta_data:
+
+    Returns:
+
+    '''
+
+    module_symbol_paths = dict([(module_id, get_module_symbol_path(module_import_path))
+                                for module_id, module_import_path in zip(module_meta_data['unique_reference_id'].tolist(),
+                                                                         module_meta_data['import_path'].tolist())])
+
+    function_import_paths = ['.'.join([import_path_part for import_path_part in (module_symbol_paths.get(module_id, ''), function_handle) if import_path_part])
+                             for module_id, function_handle in zip(function_meta_data['source_module_reference_id'].tolist(),
+                                                                   function_meta_data['function_handle'].tolist())]
+
+    table_rows = {'modules': zip(*[module_meta_data[column].tolist() for column in GRAPH_STORE_TABLES['modules']]),
+                  'functions': zip(*[function_meta_data[column].tolist() for column in GRAPH_STORE_TABLES['functions']] + [function_import_paths]),
+                  'function_dependencies': zip(*[function_dependency_meta_data[column].tolist() for column in GRAPH_STORE_TABLES['function_dependencies']])}
+
+    connection = open_graph_store(store_file_path)
+
+    try:
+        with connection:
+            for table_name, table_columns in GRAPH_STORE_TABLES.items():
+                if table_name == 'functions':
+                    table_columns = table_columns + ['import_path']
+
+                connection.execute(f'DELETE FROM {table_name}')
+                connection.executemany(f'INSERT INTO {table_name} ({", ".join(table_columns)}) '
+                                       f'VALUES ({", ".join(["?"] * len(table_columns))})',
+                                       table_rows[table_name])
+    finally:
+        connection.close()
+
+    logger.debug('Wrote %s modules, %s functions and %s function dependencies to the graph store %s.', len(module_meta_data),
+                 len(function_meta_data), len(function_dependency_meta_data), store_file_path)
+
+    return store_file_path
+
+
+def read_graph_store(connection: sqlite3.Connection) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    '''
+    Reads the module, function and function dependency meta data back from a graph store, with the same columns as
+    graphit.utils.meta_data_helpers.create_function_and_module_meta_data creates them.
+
+    Args:
+        connection: See open_graph_store
+
+    Returns:
+
+    '''
+
+    return tuple([pd.read_sql_query(f'SELECT {", ".join(table_columns)} FROM {table_name} ORDER BY rowid', connection)
+                  for table_name, table_columns in GRAPH_STORE_TABLES.items()])
+
+
+def query_store_functions(connection: sqlite3.Connection,
+                          target: str) -> pd.DataFrame:
+    '''
+    Looks up the functions the specified target matches in a graph store, like
+    graphit.utils.meta_data_helpers.get_target_function_ids does, i.e. by their full import path, a trailing part of it
+    or their handle. Candidates are looked up by their handle via its index, so the store is never scanned.
+
+    Args:
+        connection: See open_graph_store
+        target:
+
+    Returns:
+
+    '''
+
+    target_parts = [target_part for target_part in target.split('.') if target_part]
+
+    if not target_parts:
+        return pd.DataFrame(columns=GRAPH_STORE_TABLES['functions'] + ['import_path'])
+
+    functions = pd.read_sql_query('SELECT * FROM functions WHERE function_handle = ? ORDER BY rowid', connection,
+                                  params=(target_parts[-1],))
+
+    is_target_function = [import_path.split('.')[-len(target_parts):] == target_parts for import_path in functions['import_path'].tolist()]
+
+    return functions.loc[is_target_function].reset_index(drop=True)
+
+
+def query_store_subtree(connection: sqlite3.Connection,
+                        function_id: str,
+                        graph_direction: str = GRAPH_DIRECTION_CALLEES,
+                        max_depth: Optional[int] = None) -> pd.DataFrame:
+    '''
+    Returns the function dependencies of the callee (or caller) tree of the specified function in a graph store, i.e.
+    all dependencies (source_function_id, target_function_id, function_dependency_index) reachable from the function,
+    using a recursive query. With max_depth, only dependencies at most max_depth calls away from the function are
+    returned, along with the smallest number of calls to reach each of them as depth.
+
+    For the callers direction, the source function is the called function and the target function the calling
+    function, i.e. the dependencies are inverted.
+
+    Args:
+        connection: See open_graph_store
+        function_id:
+        graph_direction: Either 'callees' or 'callers'
+        max_depth:
+
+    Returns:
+
+    '''
+
+    from_column, to_column = GRAPH_STORE_EDGE_COLUMNS[graph_direction]
+
+    # without a depth limit, the union deduplicates the dependencies themselves, which guarantees termination on cycles
+    if max_depth is None:
+        subtree_query = f'''
+            WITH RECURSIVE subtree(source_function_id, target_function_id, function_dependency_index) AS (
+                SELECT {from_column}, {to_column}, function_dependency_index
+                FROM function_dependencies WHERE {from_column} = ?
+                UNION
+                SELECT edge.{from_column}, edge.{to_column}, edge.function_dependency_index
+                FROM subtree JOIN function_dependencies AS edge ON edge.{from_column} = subtree.target_function_id
+            )
+            SELECT source_function_id, target_function_id, function_dependency_index FROM subtree'''
+        query_parameters = (function_id,)
+    else:
+        subtree_query = f'''
+            WITH RECURSIVE subtree(source_function_id, target_function_id, function_dependency_index, depth) AS (
+                SELECT {from_column}, {to_column}, function_dependency_index, 1
+                FROM function_dependencies WHERE {from_column} = ? AND ? >= 1
+                UNION
+                SELECT edge.{from_column}, edge.{to_column}, edge.function_dependency_index, subtree.depth + 1
+                FROM subtree JOIN function_dependencies AS edge ON edge.{from_column} = subtree.target_function_id
+                WHERE subtree.depth < ?
+            )
+            SELECT source_function_id, target_function_id, function_dependency_index, MIN(depth) AS depth FROM subtree
+            GROUP BY source_function_id, target_function_id, function_dependency_index
+            ORDER BY depth, source_function_id, function_dependency_index'''
+        query_parameters = (function_id, max_depth, max_depth)
+
+    return pd.read_sql_query(subtree_query, connection, params=query_parameters)
+
+
+def query_store_reachable_function_ids(connection: sqlite3.Connection,
+                                       function_id: str,
+                                       graph_direction: str = GRAPH_DIRECTION_CALLEES) -> List[str]:
+    '''
+    Returns the ids of all functions reachable from the specified function in a graph store, i.e. called by it directly
+    or indirectly (or for the callers direction, calling it directly or indirectly), using a recursive query. The
+    function itself is only included if it is part of a cycle.
+
+    Args:
+        connection: See open_graph_store
+        function_id:
+        graph_direction: Either 'callees' or 'callers'
+
+    Returns:
+
+    '''
+
+    from_column, to_column = GRAPH_STORE_EDGE_COLUMNS[graph_direction]
+
+    reachable_query = f'''
+        WITH RECURSIVE reachable(function_id) AS (
+            SELECT {to_column} FROM function_dependencies WHERE {from_column} = ?
+            UNION
+            SELECT edge.{to_column} FROM reachable JOIN function_dependencies AS edge ON edge.{from_column} = reachable.function_id
+        )
+        SELECT function_id FROM reachable'''
+
+    return [function_id for function_id, in connection.execute(reachable_query, (function_id,))]
+
+
+def query_store_is_reachable(connection: sqlite3.Connection,
+                             source_function_id: str,
+                             target_function_id: str) -> bool:
+    '''
+    Returns whether the source function calls the target function, directly or indirectly, in a graph store, using a
+    recursive query.
+
+    Args:
+        connection: See open_graph_store
+        source_function_id:
+        target_function_id:
+
+    Returns:
+
+    '''
+
+    is_reachable_query = '''
+        WITH RECURSIVE reachable(function_id) AS (
+            SELECT function_dependency_reference_id FROM function_dependencies WHERE unique_reference_id = ?
+            UNION
+            SELECT edge.function_dependency_reference_id
+            FROM reachable JOIN function_dependencies AS edge ON edge.unique_reference_id = reachable.function_id
+        )
+        SELECT 1 FROM reachable WHERE function_id = ? LIMIT 1'''
+
+    return connection.execute(is_reachable_query, (source_function_id, target_function_id)).fetchone() is not None
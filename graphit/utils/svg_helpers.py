@@ -0,0 +1,279 @@
+import os
+from typing import Dict, List, Optional, TextIO
+from xml.sax.saxutils import escape
+
+import pandas as pd
+
+from graphit.settings import (
+    logger,
+    DEBUG,
+    FLOW_CHART_FONT_SIZE,
+    FLOW_CHART_FONT_FAMILY,
+    FLOW_CHART_X_STEP_SMALL,
+    FLOW_CHART_X_STEP_STANDARD,
+    FLOW_CHART_Y_STEP_STANDARD,
+    FLOW_CHART_ELEMENT_HEIGHT_STANDARD,
+    FLOW_CHART_ELEMENT_WIDTH_STANDARD,
+    FLOW_CHART_SIZE_Y,
+    FLOW_CHART_CIRCLE_COLOR,
+    FLOW_CHART_FRAME_WIDTH,
+    FLOW_CHART_LINE_WIDTH,
+    FLOW_CHART_ROUND_BOX_CORNER_RADIUS,
+    FLOW_CHART_ARROW_HEAD_LENGTH,
+    FLOW_CHART_ARROW_HEAD_WIDTH,
+    FLOW_CHART_SVG_POINTS_PER_UNIT,
+    FLOW_CHART_SVG_MARGIN
+)
+from graphit.utils.flow_chart_helpers import get_module_colors, get_function_handle_label, get_next_graph_index_nested, \
+    get_next_graph_index_sequential
+
+
+def format_svg_length(flow_chart_length: float) -> str:
+    '''
+    Utility function that converts a length (or coordinate) of the flow chart layout into svg user units, i.e. points.
+
+    Args:
+        flow_chart_length:
+
+    Returns:
+
+    '''
+
+    return f'{flow_chart_length * FLOW_CHART_SVG_POINTS_PER_UNIT:.2f}'
+
+
+def write_svg_definitions(svg_file: TextIO,
+                          module_colors: Dict[str, str],
+                          module_classes: Dict[str, str]) -> None:
+    '''
+    Utility function that writes the definitions shared by all elements of a flow chart to the passed svg file:
+    - one css class per style, i.e. frames, lines, arrows, labels and the fill color of each module
+    - the arrow head marker
+    - one symbol for the function handle box and the graph index circle, which are reused by every record
+    - one symbol per module for the box with the module's import path, which is reused by every record of that module
+
+    Args:
+        svg_file:
+        module_colors: Module import path -> fill color
+        module_classes: Module import path -> css class (and symbol id) of that module
+
+    Returns:
+
+    '''
+
+    element_width = format_svg_length(FLOW_CHART_ELEMENT_WIDTH_STANDARD)
+    element_height = format_svg_length(FLOW_CHART_ELEMENT_HEIGHT_STANDARD)
+    circle_radius = format_svg_length(FLOW_CHART_ELEMENT_HEIGHT_STANDARD / 2)
+    arrow_head_length = format_svg_length(FLOW_CHART_ARROW_HEAD_LENGTH)
+    arrow_head_width = format_svg_length(FLOW_CHART_ARROW_HEAD_WIDTH)
+    arrow_head_half_width = format_svg_length(FLOW_CHART_ARROW_HEAD_WIDTH / 2)
+
+    svg_file.write('<defs>\n<style>\n')
+    svg_file.write(f'.frame{{stroke:black;stroke-width:{FLOW_CHART_FRAME_WIDTH};stroke-linejoin:round}}\n')
+    svg_file.write(f'.line{{stroke:black;stroke-width:{FLOW_CHART_LINE_WIDTH};fill:none;stroke-linecap:round}}\n')
+    svg_file.write(f'.arrow{{stroke:black;stroke-width:{FLOW_CHART_LINE_WIDTH};fill:none;marker-end:url(#arrow-head)}}\n')
+    svg_file.write(f'.label{{font-size:{FLOW_CHART_FONT_SIZE}px;font-family:{FLOW_CHART_FONT_FAMILY};fill:black;'
+                   f'text-anchor:middle;dominant-baseline:central}}\n')
+    svg_file.write(f'.graph-index{{fill:{FLOW_CHART_CIRCLE_COLOR}}}\n')
+
+    for module_import_path, module_class in module_classes.items():
+        svg_file.write(f'.{module_class}{{fill:{module_colors[module_import_path]}}}\n')
+
+    svg_file.write('</style>\n')
+    svg_file.write(f'<marker id="arrow-head" markerUnits="userSpaceOnUse" markerWidth="{arrow_head_length}" '
+                   f'markerHeight="{arrow_head_width}" refX="{arrow_head_length}" refY="{arrow_head_half_width}" '
+                   f'orient="auto"><path d="M 0 0 L {arrow_head_length} {arrow_head_half_width} L 0 {arrow_head_width} Z" '
+                   f'fill="black"/></marker>\n')
+
+    # the function handle boxes take the fill color of the module class set on each <use>
+    svg_file.write(f'<symbol id="function-box" overflow="visible"><rect class="frame" width="{element_width}" '
+                   f'height="{element_height}" rx="{format_svg_length(FLOW_CHART_ROUND_BOX_CORNER_RADIUS)}"/></symbol>\n')
+    svg_file.write(f'<symbol id="graph-index-circle" overflow="visible"><circle class="frame graph-index" '
+                   f'cx="{circle_radius}" cy="{circle_radius}" r="{circle_radius}"/></symbol>\n')
+
+    for module_import_path, module_class in module_classes.items():
+        svg_file.write(f'<symbol id="{module_class}-box" overflow="visible"><rect class="frame {module_class}" '
+                       f'width="{element_width}" height="{element_height}"/><text class="label" '
+                       f'x="{format_svg_length(FLOW_CHART_ELEMENT_WIDTH_STANDARD / 2)}" '
+                       f'y="{format_svg_length(FLOW_CHART_ELEMENT_HEIGHT_STANDARD / 2)}">{escape(module_import_path)}</text>'
+                       f'</symbol>\n')
+
+    svg_file.write('</defs>\n')
+
+
+def write_svg_continuation_markers(svg_file: TextIO,
+                                   continuation_markers: List[Dict],
+                                   page_file_paths: Optional[List[str]] = None) -> None:
+    '''
+    Utility function that writes the passed continuation markers of a flow chart page to the passed svg file, i.e. a
+    short arrow with a label referencing the graph index and page at the other end, see
+    graphit.utils.flow_chart_helpers.split_flow_chart_into_pages. If the file paths of all pages are specified, each
+    label links to the page it references.
+
+    Args:
+        svg_file:
+        continuation_markers:
+        page_file_paths:
+
+    Returns:
+
+    '''
+
+    for continuation_marker in continuation_markers:
+        start_x, start_y = continuation_marker['start']
+        end_y = continuation_marker['end'][1]
+        label_x, label_y = continuation_marker['label_position']
+
+        svg_file.write(f'<path class="arrow" d="M {format_svg_length(start_x)} {format_svg_length(-start_y)} '
+                       f'V {format_svg_length(-end_y)}"/>\n')
+
+        label = f'<text class="label" x="{format_svg_length(label_x)}" y="{format_svg_length(-label_y)}">' \
+                f'{escape(continuation_marker["label"])}</text>'
+
+        if page_file_paths is not None:
+            linked_page_file_name = os.path.basename(page_file_paths[continuation_marker['linked_page_index']])
+            label = f'<a xlink:href="{escape(linked_page_file_name)}">{label}</a>'
+
+        svg_file.write(f'{label}\n')
+
+
+def render_svg_flow_chart(graph_meta_data: pd.DataFrame,
+                          svg_file_path: str,
+                          continuation_markers: Optional[List[Dict]] = None,
+                          page_file_paths: Optional[List[str]] = None) -> None:
+    '''
+    Utility function that renders the same flow chart as graphit.utils.graph_helpers.plot_project_graph, but streams
+    the svg elements of each graph meta data record straight to the specified file instead of building the whole
+    drawing in memory first. Styles are defined once as css classes, and the boxes and circles repeated by many
+    records are defined once as symbols and then only referenced, which keeps the svg files of large graphs small.
+
+    If the graph meta data is a page of a larger flow chart, the continuation markers of the page's vertical arrows to
+    and from other pages are written, too, see write_svg_continuation_markers.
+
+    Args:
+        graph_meta_data:
+        svg_file_path:
+        continuation_markers:
+        page_file_paths:
+
+    Returns:
+
+    '''
+
+    continuation_markers = continuation_markers or []
+
+    element_width = FLOW_CHART_ELEMENT_WIDTH_STANDARD
+    element_height = FLOW_CHART_ELEMENT_HEIGHT_STANDARD
+    circle_radius = FLOW_CHART_ELEMENT_HEIGHT_STANDARD / 2
+
+    module_colors = get_module_colors(graph_meta_data['target_function_module_import_path'].tolist())
+    module_classes = dict([(module_import_path, f'module-{module_index}')
+                           for module_index, module_import_path in enumerate(module_colors)])
+
+    # the position of each record's function handle box, i.e. the left end of its center line, in flow chart units.
+    # the graph index circles are needed up front to draw the vertical arrows pointing down to later records
+    record_positions = dict([(graph_index, (x_coordinate * FLOW_CHART_X_STEP_STANDARD,
+                                            FLOW_CHART_SIZE_Y - y_coordinate * FLOW_CHART_Y_STEP_STANDARD))
+                             for graph_index, x_coordinate, y_coordinate in zip(graph_meta_data['target_function_graph_index'].tolist(),
+                                                                                graph_meta_data['graph_plot_x_coordinate'].tolist(),
+                                                                                graph_meta_data['graph_plot_y_coordinate'].tolist())])
+    graph_index_circle_centers = dict([(graph_index, (record_positions[graph_index][0] - FLOW_CHART_X_STEP_SMALL + circle_radius,
+                                                      record_positions[graph_index][1]))
+                                       for graph_index, generation in zip(graph_meta_data['target_function_graph_index'].tolist(),
+                                                                          graph_meta_data['target_function_generation'].tolist())
+                                       if generation != 0])
+
+    # the root's function handle box is the left most element, and the module boxes of the deepest records the right most
+    if len(graph_meta_data):
+        view_box_x = -FLOW_CHART_SVG_MARGIN
+        view_box_y = -(FLOW_CHART_SIZE_Y - graph_meta_data['graph_plot_y_coordinate'].min() * FLOW_CHART_Y_STEP_STANDARD
+                       + element_height / 2 + FLOW_CHART_SVG_MARGIN)
+        view_box_width = graph_meta_data['graph_plot_x_coordinate'].max() * FLOW_CHART_X_STEP_STANDARD + \
+            FLOW_CHART_X_STEP_STANDARD + element_width + 2 * FLOW_CHART_SVG_MARGIN
+        view_box_height = (graph_meta_data['graph_plot_y_coordinate'].max() - graph_meta_data['graph_plot_y_coordinate'].min()) * \
+            FLOW_CHART_Y_STEP_STANDARD + element_height + 2 * FLOW_CHART_SVG_MARGIN
+    else:
+        view_box_x, view_box_y, view_box_width, view_box_height = 0, 0, 2 * FLOW_CHART_SVG_MARGIN, 2 * FLOW_CHART_SVG_MARGIN
+
+    # the continuation markers reach above the first and below the last row of a page
+    if continuation_markers:
+        marker_top_y = -max([max(continuation_marker['start'][1], continuation_marker['label_position'][1])
+                             for continuation_marker in continuation_markers]) - element_height / 2 - FLOW_CHART_SVG_MARGIN
+        marker_bottom_y = -min([min(continuation_marker['end'][1], continuation_marker['label_position'][1])
+                                for continuation_marker in continuation_markers]) + element_height / 2 + FLOW_CHART_SVG_MARGIN
+        view_box_height = max(view_box_y + view_box_height, marker_bottom_y) - min(view_box_y, marker_top_y)
+        view_box_y = min(view_box_y, marker_top_y)
+
+    is_debug_logging = logger.isEnabledFor(DEBUG)
+
+    with open(svg_file_path, 'w') as svg_file:
+        svg_file.write(f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+                       f'xml:lang="en" width="{format_svg_length(view_box_width)}pt" '
+                       f'height="{format_svg_length(view_box_height)}pt" viewBox="{format_svg_length(view_box_x)} '
+                       f'{format_svg_length(view_box_y)} {format_svg_length(view_box_width)} '
+                       f'{format_svg_length(view_box_height)}">\n')
+
+        write_svg_definitions(svg_file, module_colors, module_classes)
+
+        for graph_meta_data_record in graph_meta_data.itertuples(index=False):
+
+            if is_debug_logging:
+                logger.debug('Writing flow chart element sequence: %s', graph_meta_data_record)
+
+            graph_index = graph_meta_data_record.target_function_graph_index
+            module_class = module_classes[graph_meta_data_record.target_function_module_import_path]
+            function_handle_box_x, center_y = record_positions[graph_index]
+            module_box_x = function_handle_box_x + FLOW_CHART_X_STEP_STANDARD
+
+            # svg's y axis points down, so all y coordinates of the flow chart layout are flipped
+            box_top_y = format_svg_length(-(center_y + element_height / 2))
+            svg_center_y = format_svg_length(-center_y)
+
+            record_elements = [
+                f'<use xlink:href="#function-box" class="{module_class}" x="{format_svg_length(function_handle_box_x)}" y="{box_top_y}"/>',
+                f'<text class="label" x="{format_svg_length(function_handle_box_x + element_width / 2)}" y="{svg_center_y}">'
+                f'{escape(get_function_handle_label(graph_meta_data_record))}</text>',
+                f'<use xlink:href="#{module_class}-box" x="{format_svg_length(module_box_x)}" y="{box_top_y}"/>',
+            ]
+            line_path = f'M {format_svg_length(function_handle_box_x + element_width)} {svg_center_y} H {format_svg_length(module_box_x)}'
+
+            # for all but the root generation, the circle with the graph index and the line to the function handle box
+            if graph_index in graph_index_circle_centers:
+                circle_center_x, _ = graph_index_circle_centers[graph_index]
+
+                record_elements.append(f'<use xlink:href="#graph-index-circle" x="{format_svg_length(circle_center_x - circle_radius)}" '
+                                       f'y="{format_svg_length(-(center_y + circle_radius))}"/>')
+                record_elements.append(f'<text class="label" x="{format_svg_length(circle_center_x)}" y="{svg_center_y}">'
+                                       f'{escape(graph_index)}</text>')
+                line_path = f'M {format_svg_length(circle_center_x + circle_radius)} {svg_center_y} ' \
+                            f'H {format_svg_length(function_handle_box_x)} {line_path}'
+
+            record_elements.append(f'<path class="line" d="{line_path}"/>')
+
+            # the vertical arrows from the function handle box down to the record's first dependency, and from the
+            # graph index circle down to the record's next sibling. see graph_helpers.draw_vertical_elements
+            next_graph_index_nested = get_next_graph_index_nested(graph_index)
+
+            if next_graph_index_nested in graph_index_circle_centers:
+                next_circle_center_x, next_circle_center_y = graph_index_circle_centers[next_graph_index_nested]
+                record_elements.append(f'<path class="arrow" d="M {format_svg_length(function_handle_box_x + element_width / 2)} '
+                                       f'{format_svg_length(-(center_y - element_height / 2))} '
+                                       f'V {format_svg_length(-(next_circle_center_y + circle_radius))}"/>')
+
+            next_graph_index_sequential = get_next_graph_index_sequential(graph_index)
+
+            if graph_index in graph_index_circle_centers and next_graph_index_sequential in graph_index_circle_centers:
+                circle_center_x, _ = graph_index_circle_centers[graph_index]
+                _, next_circle_center_y = graph_index_circle_centers[next_graph_index_sequential]
+                record_elements.append(f'<path class="arrow" d="M {format_svg_length(circle_center_x)} '
+                                       f'{format_svg_length(-(center_y - circle_radius))} '
+                                       f'V {format_svg_length(-(next_circle_center_y + circle_radius))}"/>')
+
+            svg_file.write('\n'.join(record_elements))
+            svg_file.write('\n')
+
+        write_svg_continuation_markers(svg_file, continuation_markers, page_file_paths)
+
+        svg_file.write('</svg>\n')
+
+    return
@@ -0,0 +1,353 @@
+import ast
+import os
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from graphit.settings import logger, SYMBOL_RESOLUTION_MAX_IMPORT_HOPS, SYMBOL_RESOLUTION_METHOD_QUALIFIERS
+from graphit.utils.records import ModuleRecord, FunctionRecord
+
+
+def get_function_call_qualifier(call_function_node: ast.AST) -> Optional[str]:
+    '''
+    Returns the dotted name a function is called by, e.g. 'load' for `load(...)` and 'json.decoder.load' for
+    `json.decoder.load(...)`. Calls on objects that can't be named statically, e.g. `get_loader().load(...)`, are
+    returned with a leading '.', i.e. '.load'. Returns None for calls that have no name at all, e.g. `handlers[0](...)`.
+
+    Args:
+        call_function_node: The func attribute of an ast.Call node
+
+    Returns:
+
+    '''
+
+    if isinstance(call_function_node, ast.Name):
+        return call_function_node.id
+
+    if not isinstance(call_function_node, ast.Attribute):
+        return None
+
+    qualifier_parts = [call_function_node.attr]
+    value_node = call_function_node.value
+
+    while isinstance(value_node, ast.Attribute):
+        qualifier_parts.append(value_node.attr)
+        value_node = value_node.value
+
+    if isinstance(value_node, ast.Name):
+        qualifier_parts.append(value_node.id)
+    else:
+        qualifier_parts.append('')
+
+    return '.'.join(reversed(qualifier_parts))
+
+
+def record_module_symbol_table(module_ast: ast.AST) -> Dict:
+    '''
+    Records the names a module binds via its import statements, i.e.
+    - imports: local name -> qualified name, e.g. {'np': 'numpy', 'load': 'utils.helpers.load'}. Relative imports keep
+        their leading dots, e.g. {'load': '..helpers.load'}, since they can only be resolved against the module's import
+        path, which is not part of the parse results.
+    - star_imports: the (possibly relative) modules imported via `from ... import *`
+
+    Imports anywhere in the module are recorded, including those local to functions. Together with the module's level
+    definitions, this is the symbol table the module's function calls are resolved with. It only depends on the module's
+    source and can therefore be cached.
+
+    Args:
+        module_ast:
+
+    Returns:
+
+    '''
+
+    imports = {}
+    star_imports = []
+
+    for node in ast.walk(module_ast):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname is not None:
+                    imports[alias.asname] = alias.name
+                else:
+                    # `import a.b` binds 'a', and calls like a.b.f(...) are qualified by the full path anyway
+                    imports[alias.name.split('.')[0]] = alias.name.split('.')[0]
+        elif isinstance(node, ast.ImportFrom):
+            imported_module = '.' * node.level + (node.module or '')
+
+            for alias in node.names:
+                if alias.name == '*':
+                    star_imports.append(imported_module)
+                elif imported_module.endswith('.'):
+                    imports[alias.asname or alias.name] = f'{imported_module}{alias.name}'
+                else:
+                    imports[alias.asname or alias.name] = f'{imported_module}.{alias.name}'
+
+    return {'imports': imports, 'star_imports': star_imports}
+
+
+def get_module_symbol_path(module_import_path: str) -> str:
+    '''
+    Returns the dotted path other modules import the specified module by, i.e. the import path without a trailing
+    '__init__' for packages.
+
+    Args:
+        module_import_path:
+
+    Returns:
+
+    '''
+
+    if module_import_path == '__init__':
+        return ''
+
+    if module_import_path.endswith('.__init__'):
+        return module_import_path[:-len('.__init__')]
+
+    return module_import_path
+
+
+def resolve_relative_import(qualified_name: str,
+                            module_import_path: str) -> str:
+    '''
+    Resolves a relative qualified name recorded by record_module_symbol_table against the import path of the importing
+    module, e.g. '..helpers.load' in module 'utils.io.readers' -> 'utils.helpers.load'. Absolute names are returned
+    unchanged.
+
+    Args:
+        qualified_name:
+        module_import_path: The import path as recorded, i.e. including a trailing '__init__' for packages
+
+    Returns:
+
+    '''
+
+    relative_name = qualified_name.lstrip('.')
+    import_level = len(qualified_name) - len(relative_name)
+
+    if not import_level:
+        return qualified_name
+
+    # each leading '.' strips one component, the first one being the module itself (or the '__init__' of a package)
+    package_parts = module_import_path.split('.')[:-import_level]
+
+    return '.'.join(package_parts + [relative_name]) if relative_name else '.'.join(package_parts)
+
+
+def create_symbol_resolution_index(recorded_modules: List[ModuleRecord],
+                                   recorded_functions: List[FunctionRecord],
+                                   module_symbol_tables: Dict[str, Dict]) -> Dict:
+    '''
+    Creates the lookup tables used by resolve_function_call:
+    - module_import_paths: module id -> import path
+    - module_symbol_tables: module id -> symbol table, see record_module_symbol_table
+    - module_path_index: every dotted suffix of every module's absolute symbol path -> module ids, so that imports can
+        be matched regardless of the directory the project is recorded from (e.g. 'graphit.utils.helpers' and
+        'utils.helpers' for the module 'utils.helpers' recorded from the directory 'graphit')
+    - module_definitions: module id -> function handle -> function id of the module's (last) definition of that handle
+    - global_handle_index: function handle -> function ids across all modules
+    - resolved_calls: module id -> function call -> resolved function id, filled as calls get resolved
+
+    Args:
+        recorded_modules:
+        recorded_functions:
+        module_symbol_tables:
+
+    Returns:
+
+    '''
+
+    module_path_index = {}
+
+    for recorded_module in recorded_modules:
+        # the reference directory's own path is included, since the project's modules might be imported relative to
+        # one of its parent directories, e.g. module 'utils.helpers' recorded from 'graphit' as 'graphit.utils.helpers'
+        reference_directory_parts = list(Path(os.path.abspath(recorded_module.reference_directory)).parts[1:])
+        module_symbol_path_parts = [module_symbol_path_part for module_symbol_path_part in
+                                    get_module_symbol_path(recorded_module.import_path).split('.') if module_symbol_path_part]
+        module_path_parts = reference_directory_parts + module_symbol_path_parts
+
+        for i in range(len(module_path_parts)):
+            module_path_index.setdefault('.'.join(module_path_parts[i:]), []).append(recorded_module.unique_reference_id)
+
+    module_definitions = {}
+    global_handle_index = {}
+
+    for recorded_function in recorded_functions:
+        module_definitions.setdefault(recorded_function.source_module_reference_id, {})[recorded_function.function_handle] = \
+            recorded_function.unique_reference_id
+        global_handle_index.setdefault(recorded_function.function_handle, []).append(recorded_function.unique_reference_id)
+
+    return {'module_import_paths': dict([(recorded_module.unique_reference_id, recorded_module.import_path) for recorded_module in recorded_modules]),
+            'module_symbol_tables': module_symbol_tables,
+            'module_path_index': module_path_index,
+            'module_definitions': module_definitions,
+            'global_handle_index': global_handle_index,
+            'resolved_calls': {}}
+
+
+def resolve_qualified_name(qualified_name: str,
+                           symbol_resolution_index: Dict,
+                           n_import_hops: int = 0) -> Optional[str]:
+    '''
+    Resolves an absolute qualified name, e.g. 'utils.helpers.load', to the id of the project function it refers to.
+    Names defined in one project module and imported into another (e.g. re-exported by a package's __init__) are
+    followed through the importing module's symbol table.
+
+    Returns
+    - the function id, if the name refers to exactly one project function
+    - '' if the name can't refer to any project function, e.g. 'numpy.load'
+    - None if the name is ambiguous, e.g. because several project modules match or it refers to a class' method
+
+    Args:
+        qualified_name:
+        symbol_resolution_index:
+        n_import_hops:
+
+    Returns:
+
+    '''
+
+    if '.' not in qualified_name:
+        return None
+
+    module_path, function_handle = qualified_name.rsplit('.', 1)
+    module_ids = symbol_resolution_index['module_path_index'].get(module_path, [])
+
+    if not module_ids:
+        # the module path might itself name a project class, e.g. 'utils.helpers.Loader.load'. methods are not recorded
+        # though, so the best that can be done is falling back onto the handle
+        if '.' in module_path and resolve_qualified_name(module_path, symbol_resolution_index, n_import_hops):
+            return None
+
+        return ''
+
+    if len(module_ids) > 1:
+        return None
+
+    module_id = module_ids[0]
+    function_id = symbol_resolution_index['module_definitions'].get(module_id, {}).get(function_handle)
+
+    if function_id is not None:
+        return function_id
+
+    module_symbol_table = symbol_resolution_index['module_symbol_tables'].get(module_id)
+
+    if module_symbol_table is None or n_import_hops >= SYMBOL_RESOLUTION_MAX_IMPORT_HOPS:
+        return None
+
+    if function_handle in module_symbol_table['imports']:
+        reexported_name = resolve_relative_import(module_symbol_table['imports'][function_handle],
+                                                  symbol_resolution_index['module_import_paths'][module_id])
+
+        return resolve_qualified_name(reexported_name, symbol_resolution_index, n_import_hops + 1)
+
+    for star_imported_module in module_symbol_table['star_imports']:
+        star_imported_module = resolve_relative_import(star_imported_module,
+                                                       symbol_resolution_index['module_import_paths'][module_id])
+
+        function_id = resolve_qualified_name(f'{star_imported_module}.{function_handle}', symbol_resolution_index,
+                                             n_import_hops + 1)
+
+        if function_id:
+            return function_id
+
+    return ''
+
+
+def resolve_function_call_by_handle(function_handle: str,
+                                    symbol_resolution_index: Dict) -> Optional[str]:
+    '''
+    Fallback for calls that can't be resolved via the calling module's symbol table, e.g. method calls like
+    `self.load(...)`: resolves the call by its handle only, provided exactly one project function has that handle.
+
+    Args:
+        function_handle:
+        symbol_resolution_index:
+
+    Returns:
+
+    '''
+
+    function_ids = symbol_resolution_index['global_handle_index'].get(function_handle, [])
+
+    if len(function_ids) == 1:
+        return function_ids[0]
+
+    return None
+
+
+def resolve_function_call(function_call: str,
+                          module_id: str,
+                          symbol_resolution_index: Dict) -> Optional[str]:
+    '''
+    Resolves a function call recorded in the specified module (see get_function_call_qualifier) to the id of the called
+    project function, or None if the call doesn't refer to a (unique) project function. In order,
+    1. calls by a name defined at the module's level resolve to that definition
+    2. calls by an imported name, e.g. `load(...)` after `from utils.helpers import load` or `helpers.load(...)` after
+       `from utils import helpers`, resolve to the imported project function. Calls into modules outside of the project
+       are not resolved at all
+    3. calls by a name that might come from a `from ... import *` resolve to the star imported project function
+    4. ambiguous calls fall back onto the handle, see resolve_function_call_by_handle. A call is ambiguous if it is a
+       method call on the instance or class (see SYMBOL_RESOLUTION_METHOD_QUALIFIERS) or on a class defined in the
+       module, or if the imported name it is called by matches several project modules or a class
+    All other calls, e.g. calls of builtins or of methods of local variables, are not resolved.
+
+    Results are memoized per module, so each distinct call is only resolved once per module.
+
+    Args:
+        function_call:
+        module_id:
+        symbol_resolution_index:
+
+    Returns:
+
+    '''
+
+    module_resolved_calls = symbol_resolution_index['resolved_calls'].setdefault(module_id, {})
+
+    if function_call in module_resolved_calls:
+        return module_resolved_calls[function_call]
+
+    call_head, _, call_tail = function_call.partition('.')
+    function_handle = function_call.rsplit('.', 1)[-1]
+
+    module_definitions = symbol_resolution_index['module_definitions'].get(module_id, {})
+    module_symbol_table = symbol_resolution_index['module_symbol_tables'].get(module_id, {'imports': {}, 'star_imports': []})
+    module_import_path = symbol_resolution_index['module_import_paths'].get(module_id, '')
+
+    function_id = None
+    is_ambiguous_call = False
+
+    if not call_tail and call_head in module_definitions:
+        function_id = module_definitions[call_head]
+    elif call_head in module_symbol_table['imports']:
+        qualified_name = resolve_relative_import(module_symbol_table['imports'][call_head], module_import_path)
+
+        if call_tail:
+            qualified_name = f'{qualified_name}.{call_tail}'
+
+        function_id = resolve_qualified_name(qualified_name, symbol_resolution_index)
+        is_ambiguous_call = function_id is None
+    elif not call_tail:
+        for star_imported_module in module_symbol_table['star_imports']:
+            star_imported_module = resolve_relative_import(star_imported_module, module_import_path)
+            function_id = resolve_qualified_name(f'{star_imported_module}.{call_head}', symbol_resolution_index)
+
+            if function_id:
+                break
+
+            is_ambiguous_call = is_ambiguous_call or function_id is None
+    else:
+        is_ambiguous_call = call_head in SYMBOL_RESOLUTION_METHOD_QUALIFIERS or call_head in module_definitions
+
+    if not function_id and is_ambiguous_call:
+        function_id = resolve_function_call_by_handle(function_handle, symbol_resolution_index)
+    elif not function_id:
+        if function_id == '':
+            logger.debug('Not resolving call %s in module %s into a module outside the project.', function_call, module_import_path)
+
+        function_id = None
+
+    module_resolved_calls[function_call] = function_id
+
+    return function_id
@@ -0,0 +1,453 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, Set
+
+from graphit.settings import logger, GRAPH_EXPANSION_MODE_FULL, WATCH_POLL_INTERVAL_SECONDS, FLOW_CHART_RENDERER_SCHEMDRAW, \
+    FLOW_CHART_MAX_ROWS_PER_PAGE, PARSING_MODE_AST
+from graphit.utils.cache_helpers import get_module_file_stat
+from graphit.utils.export_helpers import export_meta_data
+from graphit.utils.function_helpers import record_functions_and_symbol_table_from_module, get_parsing_chunk_size, \
+    resolve_recorded_function_calls
+from graphit.utils.graph_root_helpers import export_all_graph_roots, remove_graph_root_outputs
+from graphit.utils.meta_data_helpers import create_function_and_module_meta_data, get_graph_function_roots, \
+    create_function_adjacency_index
+from graphit.utils.module_helpers import record_all_module_file_paths, record_module
+from graphit.utils.records import ModuleRecord, FunctionRecord
+from graphit.utils.store_helpers import get_graph_store_file_path, write_graph_store
+from graphit.utils.symbol_helpers import create_symbol_resolution_index
+
+
+def create_watch_state() -> Dict:
+    '''
+    Creates the (empty) in memory index of a watched project, which update_watched_project keeps up to date:
+    - module_file_paths: the file paths of all recorded modules, in the order they were found
+    - module_file_stats: module file path -> modification time and size when the module was last parsed
+    - modules: module file path -> ModuleRecord
+    - module_functions: module file path -> the module's FunctionRecords, with resolved function calls
+    - module_symbol_tables: module id -> symbol table
+    - function_calls: function id -> the function's unresolved function calls
+    - function_signatures: function id -> everything about the function that ends up in the graph outputs, i.e. its
+        handle, its module and the ids of the functions it calls
+    - symbol_resolution_index: see graphit.utils.symbol_helpers.create_symbol_resolution_index
+    - function_adjacency_index: see graphit.utils.meta_data_helpers.create_function_adjacency_index
+    - graph_root_function_ids: the ids of the current graph roots
+
+    Returns:
+
+    '''
+
+    return {'module_file_paths': [],
+            'module_file_stats': {},
+            'modules': {},
+            'module_functions': {},
+            'module_symbol_tables': {},
+            'function_calls': {},
+            'function_signatures': {},
+            'symbol_resolution_index': None,
+            'function_adjacency_index': {},
+            'graph_root_function_ids': set()}
+
+
+def detect_module_changes(watch_state: Dict,
+                          module_file_paths: List[str]) -> Tuple[List[str], List[str], Dict[str, Dict]]:
+    '''
+    Compares the modification times and sizes of the specified module files with the ones recorded in the watch state.
+    Returns the file paths of new and changed modules, the file paths of removed modules and the current file stats.
+
+    Args:
+        watch_state:
+        module_file_paths:
+
+    Returns:
+
+    '''
+
+    module_file_stats = {}
+
+    for module_file_path in module_file_paths:
+        try:
+            module_file_stats[module_file_path] = get_module_file_stat(module_file_path)
+        except FileNotFoundError:
+            continue
+
+    changed_module_file_paths = [module_file_path for module_file_path in module_file_paths
+                                 if module_file_path in module_file_stats and
+                                 module_file_stats[module_file_path] != watch_state['module_file_stats'].get(module_file_path)]
+    removed_module_file_paths = [module_file_path for module_file_path in watch_state['module_file_stats']
+                                 if module_file_path not in module_file_stats]
+
+    return changed_module_file_paths, removed_module_file_paths, module_file_stats
+
+
+def parse_watched_module(recorded_module: ModuleRecord,
+                         parse_cache_directory: Optional[Path] = None,
+                         parsing_mode: str = PARSING_MODE_AST) -> Optional[Tuple[List[FunctionRecord], Dict]]:
+    '''
+    Records the functions and the symbol table of the specified module. Returns None if the module can't be parsed, e.g.
+    because it is being edited and has a syntax error at the moment.
+
+    Args:
+        recorded_module:
+        parse_cache_directory:
+        parsing_mode:
+
+    Returns:
+
+    '''
+
+    try:
+        return record_functions_and_symbol_table_from_module(recorded_module, parse_cache_directory=parse_cache_directory,
+                                                             parsing_mode=parsing_mode)
+    except (SyntaxError, ValueError, OSError) as e:
+        logger.warning(f'Could not parse module {recorded_module.file_path}, keeping its previous definitions: {e}')
+
+    return None
+
+
+def parse_watched_modules(recorded_modules: List[ModuleRecord],
+                          parse_cache_directory: Optional[Path] = None,
+                          n_jobs: int = 1,
+                          parsing_mode: str = PARSING_MODE_AST) -> List[Optional[Tuple[List[FunctionRecord], Dict]]]:
+
+    parse_module = partial(parse_watched_module, parse_cache_directory=parse_cache_directory, parsing_mode=parsing_mode)
+
+    if n_jobs > 1 and len(recorded_modules) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            return list(executor.map(parse_module, recorded_modules,
+                                     chunksize=get_parsing_chunk_size(n_modules=len(recorded_modules), n_jobs=n_jobs)))
+
+    return [parse_module(recorded_module) for recorded_module in recorded_modules]
+
+
+def get_affected_function_ids(function_ids: Set[str],
+                              function_adjacency_indices: List[Dict[str, List[Tuple[str, int]]]]) -> Set[str]:
+    '''
+    Returns the specified function ids and the ids of all functions calling any of them, directly or indirectly, in any
+    of the specified function adjacency indices. Passing the adjacency indices before and after a change gives all
+    functions whose dependency graphs might have been affected by the change.
+
+    Args:
+        function_ids:
+        function_adjacency_indices:
+
+    Returns:
+
+    '''
+
+    function_caller_index = {}
+
+    for function_adjacency_index in function_adjacency_indices:
+        for function_id, function_dependencies in function_adjacency_index.items():
+            for function_dependency_id, _ in function_dependencies:
+                function_caller_index.setdefault(function_dependency_id, set()).add(function_id)
+
+    affected_function_ids = set(function_ids)
+    function_id_stack = list(function_ids)
+
+    while function_id_stack:
+        for function_caller_id in function_caller_index.get(function_id_stack.pop(), ()):
+            if function_caller_id not in affected_function_ids:
+                affected_function_ids.add(function_caller_id)
+                function_id_stack.append(function_caller_id)
+
+    return affected_function_ids
+
+
+def update_watched_project(watch_state: Dict,
+                           module_file_paths: List[str],
+                           module_file_stats: Dict[str, Dict],
+                           changed_module_file_paths: List[str],
+                           removed_module_file_paths: List[str],
+                           reference_directory: Path,
+                           output_directory: Path,
+                           parse_cache_directory: Optional[Path] = None,
+                           parsing_mode: str = PARSING_MODE_AST,
+                           graph_expansion_mode: str = GRAPH_EXPANSION_MODE_FULL,
+                           n_jobs: int = 1,
+                           export_diagrams: bool = True,
+                           renderer: str = FLOW_CHART_RENDERER_SCHEMDRAW,
+                           max_rows_per_page: int = FLOW_CHART_MAX_ROWS_PER_PAGE,
+                           max_depth: Optional[int] = None,
+                           max_nodes: Optional[int] = None,
+                           export_store: bool = False) -> Dict:
+    '''
+    Incrementally updates the watch state and the outputs in the specified output directory after the specified modules
+    were added, changed or removed:
+    - only the added and changed modules are parsed
+    - function calls are resolved again in the changed modules only, unless the module level definitions or the imports
+      of any module changed, in which case all function calls are resolved again
+    - the function, module and function dependency meta data are exported again
+    - only the graph roots whose dependency graph includes a function that changed (i.e. was added, removed, or calls
+      different functions than before) are exported again, plus any new graph roots. The outputs of functions that are
+      no longer graph roots are removed.
+
+    Returns a summary of the update.
+
+    Args:
+        watch_state: See create_watch_state
+        module_file_paths: All current module file paths, in the order they were found
+        module_file_stats: See detect_module_changes
+        changed_module_file_paths: See detect_module_changes
+        removed_module_file_paths: See detect_module_changes
+        reference_directory:
+        output_directory:
+        parse_cache_directory:
+        parsing_mode: See graphit.utils.function_helpers.record_unresolved_functions_from_modules
+        graph_expansion_mode:
+        n_jobs:
+        export_diagrams: See graphit.utils.graph_root_helpers.export_graph_root
+        renderer: See graphit.utils.graph_root_helpers.export_graph_root
+        max_rows_per_page: See graphit.utils.graph_root_helpers.export_graph_root
+        max_depth: See graphit.utils.graph_root_helpers.export_graph_root
+        max_nodes: See graphit.utils.graph_root_helpers.export_graph_root
+        export_store: If set, the graph store is written again, too, see graphit.utils.store_helpers.write_graph_store
+
+    Returns:
+
+    '''
+
+    update_start = time.perf_counter()
+
+    resolve_all_calls = watch_state['symbol_resolution_index'] is None or bool(removed_module_file_paths)
+    previous_function_ids = set()
+
+    for module_file_path in removed_module_file_paths:
+        watch_state['module_file_stats'].pop(module_file_path)
+
+        if module_file_path not in watch_state['modules']:
+            continue
+
+        removed_module = watch_state['modules'].pop(module_file_path)
+        watch_state['module_symbol_tables'].pop(removed_module.unique_reference_id)
+
+        for removed_function in watch_state['module_functions'].pop(module_file_path):
+            previous_function_ids.add(removed_function.unique_reference_id)
+            del watch_state['function_calls'][removed_function.unique_reference_id]
+
+    changed_modules = [record_module(module_file_path=module_file_path, reference_directory=reference_directory)
+                       for module_file_path in changed_module_file_paths]
+    changed_module_parse_results = parse_watched_modules(changed_modules,
+                                                         parse_cache_directory=parse_cache_directory,
+                                                         n_jobs=n_jobs,
+                                                         parsing_mode=parsing_mode)
+
+    reparsed_module_file_paths = []
+
+    for module_file_path, changed_module, module_parse_results in zip(changed_module_file_paths, changed_modules,
+                                                                      changed_module_parse_results):
+        watch_state['module_file_stats'][module_file_path] = module_file_stats[module_file_path]
+
+        if module_parse_results is None:
+            continue
+
+        module_functions, module_symbol_table = module_parse_results
+        previous_module_functions = watch_state['module_functions'].get(module_file_path)
+
+        # calls in other modules can only resolve differently if this module's definitions or imports changed
+        if previous_module_functions is None or \
+                [rec_func.function_handle for rec_func in previous_module_functions] != [rec_func.function_handle for rec_func in module_functions] or \
+                watch_state['module_symbol_tables'].get(changed_module.unique_reference_id) != module_symbol_table:
+            resolve_all_calls = True
+
+        for previous_module_function in previous_module_functions or []:
+            previous_function_ids.add(previous_module_function.unique_reference_id)
+            del watch_state['function_calls'][previous_module_function.unique_reference_id]
+
+        for module_function in module_functions:
+            watch_state['function_calls'][module_function.unique_reference_id] = module_function.ordered_function_calls
+
+        watch_state['modules'][module_file_path] = changed_module
+        watch_state['module_functions'][module_file_path] = module_functions
+        watch_state['module_symbol_tables'][changed_module.unique_reference_id] = module_symbol_table
+        reparsed_module_file_paths.append(module_file_path)
+
+    watch_state['module_file_paths'] = [module_file_path for module_file_path in module_file_paths
+                                        if module_file_path in watch_state['modules']]
+
+    all_modules = [watch_state['modules'][module_file_path] for module_file_path in watch_state['module_file_paths']]
+    all_functions = [rec_func for module_file_path in watch_state['module_file_paths']
+                     for rec_func in watch_state['module_functions'][module_file_path]]
+
+    # resolve function calls
+    if resolve_all_calls:
+        watch_state['symbol_resolution_index'] = create_symbol_resolution_index(recorded_modules=all_modules,
+                                                                                recorded_functions=all_functions,
+                                                                                module_symbol_tables=watch_state['module_symbol_tables'])
+        resolved_functions = all_functions
+    else:
+        resolved_functions = [rec_func for module_file_path in reparsed_module_file_paths
+                              for rec_func in watch_state['module_functions'][module_file_path]]
+
+    resolve_recorded_function_calls(recorded_functions=resolved_functions,
+                                    symbol_resolution_index=watch_state['symbol_resolution_index'],
+                                    function_calls=watch_state['function_calls'])
+
+    # find the functions whose graph outputs changed
+    changed_function_ids = set()
+
+    for resolved_function in resolved_functions:
+        function_signature = (resolved_function.function_handle,
+                              resolved_function.source_module_reference_id,
+                              tuple(resolved_function.ordered_function_calls))
+
+        if watch_state['function_signatures'].get(resolved_function.unique_reference_id) != function_signature:
+            watch_state['function_signatures'][resolved_function.unique_reference_id] = function_signature
+            changed_function_ids.add(resolved_function.unique_reference_id)
+
+    for previous_function_id in previous_function_ids:
+        if previous_function_id not in watch_state['function_calls']:
+            del watch_state['function_signatures'][previous_function_id]
+            changed_function_ids.add(previous_function_id)
+
+    # export all non-graph meta data
+    module_meta_data, function_meta_data, function_dependency_meta_data = create_function_and_module_meta_data(all_modules,
+                                                                                                               all_functions)
+
+    for meta_data, meta_data_name in ((module_meta_data, 'module_meta_data'),
+                                      (function_meta_data, 'function_meta_data'),
+                                      (function_dependency_meta_data, 'function_dependency_meta_data')):
+        export_meta_data(meta_data=meta_data, output_directory=output_directory, meta_data_name=meta_data_name)
+
+    if export_store:
+        write_graph_store(store_file_path=get_graph_store_file_path(output_directory),
+                          module_meta_data=module_meta_data,
+                          function_meta_data=function_meta_data,
+                          function_dependency_meta_data=function_dependency_meta_data)
+
+    # export the affected graph roots
+    graph_root_function_ids = get_graph_function_roots(function_meta_data=function_meta_data,
+                                                       function_dependency_meta_data=function_dependency_meta_data)
+    function_adjacency_index = create_function_adjacency_index(function_dependency_meta_data)
+
+    affected_function_ids = get_affected_function_ids(changed_function_ids,
+                                                      [watch_state['function_adjacency_index'], function_adjacency_index])
+
+    exported_graph_root_function_ids = [graph_root_function_id for graph_root_function_id in graph_root_function_ids
+                                        if graph_root_function_id in affected_function_ids or
+                                        graph_root_function_id not in watch_state['graph_root_function_ids']]
+    removed_graph_root_function_ids = watch_state['graph_root_function_ids'].difference(graph_root_function_ids)
+
+    remove_graph_root_outputs(sorted(removed_graph_root_function_ids), output_directory)
+
+    export_all_graph_roots(graph_root_function_ids=exported_graph_root_function_ids,
+                           module_meta_data=module_meta_data,
+                           function_meta_data=function_meta_data,
+                           function_adjacency_index=function_adjacency_index,
+                           output_directory=output_directory,
+                           graph_expansion_mode=graph_expansion_mode,
+                           n_jobs=n_jobs,
+                           export_diagrams=export_diagrams,
+                           renderer=renderer,
+                           max_rows_per_page=max_rows_per_page,
+                           max_depth=max_depth,
+                           max_nodes=max_nodes)
+
+    watch_state['function_adjacency_index'] = function_adjacency_index
+    watch_state['graph_root_function_ids'] = set(graph_root_function_ids)
+
+    watch_update = {'n_parsed_modules': len(reparsed_module_file_paths),
+                    'n_removed_modules': len(removed_module_file_paths),
+                    'n_changed_functions': len(changed_function_ids),
+                    'n_exported_graph_roots': len(exported_graph_root_function_ids),
+                    'n_removed_graph_roots': len(removed_graph_root_function_ids),
+                    'update_time': time.perf_counter() - update_start}
+
+    logger.info(f'Updated outputs in {watch_update["update_time"]:.2f}s: parsed {watch_update["n_parsed_modules"]} '
+                f'modules, {watch_update["n_changed_functions"]} functions changed, exported '
+                f'{watch_update["n_exported_graph_roots"]} and removed {watch_update["n_removed_graph_roots"]} graph roots.')
+
+    return watch_update
+
+
+def watch_project(reference_directory: Path,
+                  output_directory: Path,
+                  scope: List[Path] = [],
+                  ignore_scope: List[Path] = [],
+                  crawl_kwargs: Dict = {},
+                  parse_cache_directory: Optional[Path] = None,
+                  parsing_mode: str = PARSING_MODE_AST,
+                  graph_expansion_mode: str = GRAPH_EXPANSION_MODE_FULL,
+                  n_jobs: int = 1,
+                  export_diagrams: bool = True,
+                  renderer: str = FLOW_CHART_RENDERER_SCHEMDRAW,
+                  max_rows_per_page: int = FLOW_CHART_MAX_ROWS_PER_PAGE,
+                  max_depth: Optional[int] = None,
+                  max_nodes: Optional[int] = None,
+                  export_store: bool = False,
+                  poll_interval: float = WATCH_POLL_INTERVAL_SECONDS,
+                  max_updates: Optional[int] = None) -> Dict:
+    '''
+    Keeps the outputs in the specified output directory up to date with the specified project until interrupted (or
+    until max_updates updates have been made). The module files in scope are polled for changes every poll_interval
+    seconds, and every change is applied incrementally via update_watched_project. The first update records the whole
+    project.
+
+    Args:
+        reference_directory:
+        output_directory:
+        scope:
+        ignore_scope:
+        crawl_kwargs: Passed on to record_all_module_file_paths, e.g. include_patterns or n_threads
+        parse_cache_directory:
+        parsing_mode:
+        graph_expansion_mode:
+        n_jobs:
+        export_diagrams:
+        renderer:
+        max_rows_per_page:
+        max_depth:
+        max_nodes:
+        export_store:
+        poll_interval:
+        max_updates:
+
+    Returns:
+
+    '''
+
+    watch_state = create_watch_state()
+    n_updates = 0
+
+    logger.info(f'Watching {reference_directory} for changes, writing outputs to {output_directory}. Press Ctrl+C to '
+                f'stop.')
+
+    try:
+        while max_updates is None or n_updates < max_updates:
+            poll_start = time.perf_counter()
+
+            module_file_paths = record_all_module_file_paths(reference_directory=reference_directory,
+                                                             scope=scope,
+                                                             ignore_scope=ignore_scope,
+                                                             **crawl_kwargs)
+
+            changed_module_file_paths, removed_module_file_paths, module_file_stats = detect_module_changes(watch_state,
+                                                                                                           module_file_paths)
+
+            if changed_module_file_paths or removed_module_file_paths or not n_updates:
+                update_watched_project(watch_state=watch_state,
+                                       module_file_paths=module_file_paths,
+                                       module_file_stats=module_file_stats,
+                                       changed_module_file_paths=changed_module_file_paths,
+                                       removed_module_file_paths=removed_module_file_paths,
+                                       reference_directory=reference_directory,
+                                       output_directory=output_directory,
+                                       parse_cache_directory=parse_cache_directory,
+                                       parsing_mode=parsing_mode,
+                                       graph_expansion_mode=graph_expansion_mode,
+                                       n_jobs=n_jobs,
+                                       export_diagrams=export_diagrams,
+                                       renderer=renderer,
+                                       max_rows_per_page=max_rows_per_page,
+                                       max_depth=max_depth,
+                                       max_nodes=max_nodes,
+                                       export_store=export_store)
+                n_updates += 1
+                continue
+
+            time.sleep(max(0., poll_interval - (time.perf_counter() - poll_start)))
+    except KeyboardInterrupt:
+        logger.info('Stopped watching.')
+
+    return watch_state
@@ -19,6 +19,10 @@ setup(
    install_requires=[
        "pydantic",
        "schemdraw",
-       "pandas"
+       "pandas",
+       "numpy"
    ],
+   extras_require={
+       "columnar": ["pyarrow"],
+   },
 )
\ No newline at end of file
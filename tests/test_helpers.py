@@ -1,13 +1,93 @@
+import json
 import os
 import string
+import subprocess
+import sys
+import threading
+import urllib.request
+from xml.etree import ElementTree
 
+import pandas as pd
 import pytest
 
-from graphit.utils.helpers import create_unique_reference_id
-from graphit.utils.module_helpers import record_module_import_path_from_module
+from benchmarks.pipeline_benchmark import compare_benchmark_results, run_profiled_graphit, resolution_accuracy
+from benchmarks.project_generator import create_synthetic_project
+from graphit.utils import cache_helpers, function_helpers
+from graphit.utils.cache_helpers import prepare_parse_cache_directory, evict_parse_cache_entries
+from graphit.utils.diff_helpers import create_graph_diff
+from graphit.utils.export_helpers import read_meta_data
+from graphit.utils.flow_chart_helpers import split_flow_chart_into_pages
+from graphit.utils.function_helpers import record_all_functions_from_modules, record_unresolved_functions_from_modules, \
+    record_unresolved_functions_from_module_stream, resolve_all_function_calls, stream_functions_and_symbol_tables_from_modules
+from graphit.utils.graph_helpers import plot_project_graph
+from graphit.utils.graph_root_helpers import estimate_graph_sizes, export_all_graph_roots, link_graph_root_outputs
+from graphit.utils.helpers import create_unique_reference_id, check_unique_reference_ids, create_output_directory
+from graphit.utils.meta_data_helpers import create_function_adjacency_index, create_function_and_module_meta_data, \
+    create_graph_meta_data, create_reverse_function_adjacency_index, get_target_function_ids
+from graphit.utils.model import RecordedModule, RecordedFunction, RecordedClass
+from graphit.utils.module_helpers import record_module_import_path_from_module, record_all_modules, \
+    record_all_module_file_paths, iterate_all_modules
+from graphit.utils.records import FunctionRecord
+from graphit.utils.run_helpers import parse_graphit_arguments, run_configured_graphit
+from graphit.utils.profile_helpers import start_profile, profile_stage, add_graph_root_profiles, write_profile_report
+from graphit.utils.serve_helpers import create_query_index, create_response_cache, cache_response, \
+    get_cached_response, handle_query, create_query_server
+from graphit.utils.store_helpers import write_graph_store, open_graph_store, read_graph_store, query_store_functions, \
+    query_store_subtree, query_store_reachable_function_ids, query_store_is_reachable
+from graphit.utils.shard_helpers import get_module_shard_number, write_shard_artifact, merge_shard_artifacts
+from graphit.utils.svg_helpers import render_svg_flow_chart
+from graphit.utils.watch_helpers import create_watch_state, detect_module_changes, update_watched_project
 
-def test_record_all_module_file_paths():
-    pass
+@pytest.fixture
+def module_test_directory(tmp_path):
+
+    for relative_file_path in ['main.py', 'notes.txt', 'package/__init__.py', 'package/core.py', 'package/core_pb2.py',
+                               'package/generated/schema.py', 'package/tests/test_core.py', 'venv/lib/site.py',
+                               'node_modules/gyp/gyp.py', 'build/lib/main.py', 'keep/build/lib/kept.py']:
+        os.makedirs(os.path.dirname(os.path.join(tmp_path, relative_file_path)), exist_ok=True)
+
+        with open(os.path.join(tmp_path, relative_file_path), 'w') as f:
+            f.write('')
+
+    with open(os.path.join(tmp_path, '.gitignore'), 'w') as f:
+        f.write('# build artefacts\n/build/\n*_pb2.py\n')
+
+    with open(os.path.join(tmp_path, 'package', '.gitignore'), 'w') as f:
+        f.write('generated\n')
+
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    'crawl_kwargs,expected_relative_file_paths',
+    [
+        ({},
+         ['main.py', 'keep/build/lib/kept.py', 'package/__init__.py', 'package/core.py', 'package/tests/test_core.py', 'venv/lib/site.py']),
+        ({'n_threads': 3},
+         ['main.py', 'keep/build/lib/kept.py', 'package/__init__.py', 'package/core.py', 'package/tests/test_core.py', 'venv/lib/site.py']),
+        ({'exclude_patterns': ['venv', 'package/tests']},
+         ['main.py', 'keep/build/lib/kept.py', 'node_modules/gyp/gyp.py', 'package/__init__.py', 'package/core.py']),
+        ({'include_patterns': ['package/*'], 'use_gitignore': False},
+         ['package/__init__.py', 'package/core.py', 'package/core_pb2.py', 'package/generated/schema.py', 'package/tests/test_core.py']),
+    ]
+)
+def test_record_all_module_file_paths(module_test_directory, crawl_kwargs, expected_relative_file_paths):
+
+    recorded_module_file_paths = record_all_module_file_paths(reference_directory=str(module_test_directory),
+                                                              **crawl_kwargs)
+
+    assert [os.path.relpath(recorded_module_file_path, module_test_directory) for recorded_module_file_path in recorded_module_file_paths] == \
+           [os.path.join(*expected_relative_file_path.split('/')) for expected_relative_file_path in expected_relative_file_paths]
+
+
+def test_record_all_module_file_paths_scope(module_test_directory):
+
+    recorded_module_file_paths = record_all_module_file_paths(reference_directory=str(module_test_directory),
+                                                              scope=[os.path.join(module_test_directory, 'package')],
+                                                              ignore_scope=[os.path.join(module_test_directory, 'package', 'tests'),
+                                                                            os.path.join(module_test_directory, 'package', 'core.py')])
+
+    assert recorded_module_file_paths == [os.path.join(str(module_test_directory), 'package', '__init__.py')]
 
 
 @pytest.mark.parametrize(
@@ -25,22 +105,956 @@ def test_record_module_import_path_from_module(module_path,reference_directory,e
     assert actual_relative_module_import_path == expected_relative_module_import_path
 
 
-def test_record_all_modules():
-    pass
+@pytest.fixture
+def synthetic_project(tmp_path):
+
+    project_directory = str(tmp_path / 'project')
+
+    return project_directory, create_synthetic_project(project_directory, n_modules=12, n_functions_per_module=6, seed=1)
+
+
+def test_record_all_modules(synthetic_project):
+
+    project_directory, synthetic_project_truth = synthetic_project
+
+    recorded_modules = record_all_modules(reference_directory=project_directory)
+
+    # the synthetic modules plus one (empty) __init__ module per package
+    assert sorted([recorded_module.import_path for recorded_module in recorded_modules]) == \
+           sorted(['package_0.__init__', 'package_1.__init__'] + [f'package_{i // 10}.module_{i % 10}' for i in range(12)])
+    assert len(set([recorded_module.unique_reference_id for recorded_module in recorded_modules])) == len(recorded_modules)
 
 
 def test_create_unique_function_id():
 
-    randomly_generated_test_id = create_unique_reference_id()
-    assert len(randomly_generated_test_id) == 20
+    generated_test_id = create_unique_reference_id('function:utils.helpers.load')
+    assert len(generated_test_id) == 20
 
-    for char in randomly_generated_test_id:
+    for char in generated_test_id:
         assert char in string.ascii_letters + string.digits
 
+    # ids are derived from their reference key only
+    assert create_unique_reference_id('function:utils.helpers.load') == generated_test_id
+    assert create_unique_reference_id('function:utils.helpers.dump') != generated_test_id
+
+
+def test_check_unique_reference_ids():
+
+    check_unique_reference_ids(['a', 'b', 'c'])
+
+    with pytest.raises(ValueError):
+        check_unique_reference_ids(['a', 'b', 'a'])
+
 
 def test_record_all_functions_basic():
-    pass
 
+    recorded_modules = record_all_modules(reference_directory='graphit')
+    recorded_functions = record_all_functions_from_modules(recorded_modules)
+
+    # the compact records can be converted into the pydantic models
+    assert all([isinstance(recorded_module.to_model(), RecordedModule) for recorded_module in recorded_modules])
+
+    recorded_function_models = [recorded_function.to_model() for recorded_function in recorded_functions]
+
+    assert all([isinstance(recorded_function_model, RecordedFunction) for recorded_function_model in recorded_function_models])
+    assert any([isinstance(recorded_function_model, RecordedClass) for recorded_function_model in recorded_function_models])
+
+
+def test_record_all_functions(synthetic_project):
+
+    project_directory, synthetic_project_truth = synthetic_project
+
+    recorded_modules = record_all_modules(reference_directory=project_directory)
+    recorded_functions = record_all_functions_from_modules(recorded_modules)
+
+    module_import_paths = dict([(rec_module.unique_reference_id, rec_module.import_path) for rec_module in recorded_modules])
+    id_to_qualified_handle = dict([(rec_func.unique_reference_id, f'{module_import_paths[rec_func.source_module_reference_id]}.{rec_func.function_handle}')
+                                   for rec_func in recorded_functions])
+
+    # all calls, including those to colliding handles in other modules, are resolved to the called function
+    assert dict([(id_to_qualified_handle[rec_func.unique_reference_id], [id_to_qualified_handle[call] for call in rec_func.ordered_function_calls])
+                 for rec_func in recorded_functions]) == synthetic_project_truth['function_calls']
+
+
+def test_compare_benchmark_results():
+
+    baseline_results = {'stages': [{'size': 'small', 'stage': 'parsing', 'wall_time_s': 1.0, 'peak_memory_mb': 100,
+                                    'calibration_time_s': 0.1},
+                                   {'size': 'small', 'stage': 'rendering', 'wall_time_s': 0.01, 'calibration_time_s': 0.1}],
+                        'accuracy': [{'size': 'small', 'precision': 1.0, 'recall': 1.0}]}
+
+    assert compare_benchmark_results(baseline_results, baseline_results) == []
+
+    benchmark_results = {'stages': [{'size': 'small', 'stage': 'parsing', 'wall_time_s': 2.0, 'peak_memory_mb': 101,
+                                     'calibration_time_s': 0.1},
+                                    {'size': 'small', 'stage': 'rendering', 'wall_time_s': 0.02, 'calibration_time_s': 0.1}],
+                         'accuracy': [{'size': 'small', 'precision': 0.9, 'recall': 1.0}]}
+
+    # short stages and small memory differences are within the noise margin
+    assert compare_benchmark_results(benchmark_results, baseline_results) == [
+        'parsing (small): wall_time_s regressed from 1.000 to 2.000.',
+        'resolution (small): precision regressed from 1.000 to 0.900.']
+
+    # on a machine twice as slow, twice the wall time is no regression. without calibration times, wall times are not
+    # compared at all
+    slow_machine_results = dict(benchmark_results, accuracy=baseline_results['accuracy'])
+
+    for stage_result in slow_machine_results['stages']:
+        stage_result['calibration_time_s'] = 0.2
+
+    assert compare_benchmark_results(slow_machine_results, baseline_results) == []
+
+    for stage_result in slow_machine_results['stages']:
+        del stage_result['calibration_time_s']
+
+    assert compare_benchmark_results(slow_machine_results, baseline_results) == []
+
+
+
+def test_run_profiled_graphit(synthetic_project, tmp_path):
+
+    project_directory, synthetic_project_truth = synthetic_project
+    os.makedirs(tmp_path / 'output')
+
+    graphit_run = run_profiled_graphit(project_directory, str(tmp_path / 'output'), str(tmp_path / 'cache'),
+                                       export_diagrams=False)
+
+    # the stages are those of run_graphit's profile report
+    assert list(graphit_run['stage_measurements']) == ['module_discovery', 'function_recording', 'parse_cache_eviction',
+                                                       'meta_data', 'meta_data_export', 'graph_roots', 'graph_root_export']
+    assert 'peak_memory_mb' not in graphit_run['stage_measurements']['function_recording']
+    assert graphit_run['n_graph_roots'] > 0
+    assert resolution_accuracy(graphit_run['function_calls'], synthetic_project_truth['function_calls']) == {'precision': 1.0, 'recall': 1.0}
+
+
+def test_record_all_functions_parallel():
+
+    recorded_modules = record_all_modules(reference_directory='graphit')
+
+    sequential_functions = record_all_functions_from_modules(recorded_modules, n_jobs=1)
+    parallel_functions = record_all_functions_from_modules(recorded_modules, n_jobs=2)
+
+    def get_call_handles(recorded_functions):
+        id_to_handle = dict([(rec_func.unique_reference_id, rec_func.function_handle) for rec_func in recorded_functions])
+
+        return [(rec_func.function_handle, [id_to_handle[call] for call in rec_func.ordered_function_calls]) for rec_func in recorded_functions]
+
+    assert get_call_handles(parallel_functions) == get_call_handles(sequential_functions)
+
+
+def test_record_all_functions_with_parse_cache(tmp_path, monkeypatch):
+
+    recorded_modules = record_all_modules(reference_directory='graphit')
+    parse_cache_directory = prepare_parse_cache_directory(tmp_path / 'cache')
+
+    cold_functions = record_all_functions_from_modules(recorded_modules, parse_cache_directory=parse_cache_directory)
+
+    # warm runs must not parse any of the unchanged modules
+    def raise_on_parse(*args, **kwargs):
+        raise AssertionError('Unexpected parse of unchanged module.')
+
+    monkeypatch.setattr(function_helpers.ast, 'parse', raise_on_parse)
+
+    warm_functions = record_all_functions_from_modules(recorded_modules, parse_cache_directory=parse_cache_directory)
+
+    assert [rec_func.function_handle for rec_func in warm_functions] == [rec_func.function_handle for rec_func in cold_functions]
+    assert [len(rec_func.ordered_function_calls) for rec_func in warm_functions] == [len(rec_func.ordered_function_calls) for rec_func in cold_functions]
+
+    # a size limit of 0 evicts all entries and index records. the first one is removed by another run evicting the
+    # same parse cache at the same time
+    n_parse_cache_entries = len(os.listdir(tmp_path / 'cache' / 'entries'))
+    n_parse_cache_index_records = len(os.listdir(tmp_path / 'cache' / 'index'))
+    remove = os.remove
+    removed_file_paths = []
+    monkeypatch.undo()
+
+    def remove_concurrently(file_path):
+        if not removed_file_paths:
+            remove(file_path)
+
+        removed_file_paths.append(file_path)
+        remove(file_path)
+
+    monkeypatch.setattr(cache_helpers.os, 'remove', remove_concurrently)
+
+    assert n_parse_cache_entries > 0
+    assert n_parse_cache_index_records > 0
+    assert evict_parse_cache_entries(parse_cache_directory, size_limit_mb=0) == n_parse_cache_entries + n_parse_cache_index_records - 1
+    assert not os.listdir(tmp_path / 'cache' / 'entries')
+    assert not os.listdir(tmp_path / 'cache' / 'index')
+
+
+def test_record_all_functions_with_parse_cache_version_change(tmp_path, monkeypatch):
+
+    recorded_modules = record_all_modules(reference_directory='graphit')
+    parse_cache_directory = prepare_parse_cache_directory(tmp_path / 'cache')
+
+    expected_functions = record_all_functions_from_modules(recorded_modules)
+
+    # fill the cache with entries of an older cache format, which lacked the symbol tables
+    monkeypatch.setattr(cache_helpers, 'PARSE_CACHE_FORMAT_VERSION', cache_helpers.PARSE_CACHE_FORMAT_VERSION - 1)
+    record_all_functions_from_modules(recorded_modules, parse_cache_directory=parse_cache_directory)
+
+    for parse_cache_entry_name in os.listdir(tmp_path / 'cache' / 'entries'):
+        with open(tmp_path / 'cache' / 'entries' / parse_cache_entry_name, 'r') as f:
+            parse_cache_entry = json.load(f)
+
+        with open(tmp_path / 'cache' / 'entries' / parse_cache_entry_name, 'w') as f:
+            json.dump({'definitions': parse_cache_entry['definitions']}, f)
+
+    # unchanged modules must not be served the older format's entries
+    monkeypatch.undo()
+    warm_functions = record_all_functions_from_modules(recorded_modules, parse_cache_directory=parse_cache_directory)
+
+    def get_call_handles(recorded_functions):
+        id_to_handle = dict([(rec_func.unique_reference_id, rec_func.function_handle) for rec_func in recorded_functions])
+
+        return [(rec_func.function_handle, [id_to_handle[call] for call in rec_func.ordered_function_calls]) for rec_func in recorded_functions]
+
+    assert get_call_handles(warm_functions) == get_call_handles(expected_functions)
+
+
+@pytest.mark.parametrize('n_jobs,n_io_threads', [(1, 1), (1, 3), (2, 2)])
+def test_stream_functions_and_symbol_tables_from_modules(tmp_path, monkeypatch, n_jobs, n_io_threads):
+
+    recorded_modules = record_all_modules(reference_directory='graphit')
+    staged_functions, staged_module_symbol_tables = record_unresolved_functions_from_modules(recorded_modules)
+
+    def get_function_rows(recorded_functions):
+        return [[getattr(rec_func, slot) for slot in FunctionRecord.__slots__] for rec_func in recorded_functions]
+
+    # modules are only consumed as the window of modules in flight moves on
+    n_consumed_modules = [0]
+
+    def iterate_modules():
+        for recorded_module in iterate_all_modules(reference_directory='graphit', n_threads=2):
+            n_consumed_modules[0] += 1
+            yield recorded_module
+
+    streamed_functions = []
+
+    for n_yielded_modules, (module, module_functions, module_symbol_table) in enumerate(stream_functions_and_symbol_tables_from_modules(iterate_modules(),
+                                                                                                                                       n_jobs=n_jobs,
+                                                                                                                                       n_io_threads=n_io_threads,
+                                                                                                                                       max_modules_in_flight=3), 1):
+        assert n_consumed_modules[0] <= n_yielded_modules + 2
+        assert module_symbol_table == staged_module_symbol_tables[module.unique_reference_id]
+        streamed_functions.extend(module_functions)
+
+    assert get_function_rows(streamed_functions) == get_function_rows(staged_functions)
+
+    # warm streams load all modules from the parse cache, without parsing any of them
+    parse_cache_directory = prepare_parse_cache_directory(tmp_path / 'cache')
+    record_unresolved_functions_from_module_stream(recorded_modules, parse_cache_directory=parse_cache_directory)
+
+    def raise_on_parse(*args, **kwargs):
+        raise AssertionError('Unexpected parse of unchanged module.')
+
+    monkeypatch.setattr(function_helpers.ast, 'parse', raise_on_parse)
+
+    streamed_modules, streamed_functions, _ = record_unresolved_functions_from_module_stream(iter(recorded_modules),
+                                                                                            n_io_threads=n_io_threads,
+                                                                                            parse_cache_directory=parse_cache_directory)
+
+    assert [module.file_path for module in streamed_modules] == [module.file_path for module in recorded_modules]
+    assert get_function_rows(streamed_functions) == get_function_rows(staged_functions)
+
+
+def test_record_all_functions_resolves_calls_via_imports(tmp_path):
+
+    project_modules = {
+        'main.py': 'import json\nfrom package import run\nfrom package import other\nimport package.core as core\n\n'
+                   'def main(f):\n    run()\n    other.run()\n    core.helper()\n    json.load(f)\n    load()\n\n'
+                   'def load():\n    pass\n',
+        'package/__init__.py': 'from .core import run\n',
+        'package/core.py': 'def run():\n    helper()\n\ndef helper():\n    pass\n',
+        'package/other.py': 'from .core import *\n\ndef run():\n    helper()\n    self.run()\n',
+        'files.py': 'def open(file_path):\n    pass\n\ndef get(key):\n    pass\n',
+        'app.py': 'def main():\n    d = {}\n    open("x")\n    d.get(1)\n',
+    }
+
+    for relative_file_path, module_source in project_modules.items():
+        os.makedirs(os.path.dirname(os.path.join(tmp_path, relative_file_path)), exist_ok=True)
+
+        with open(os.path.join(tmp_path, relative_file_path), 'w') as f:
+            f.write(module_source)
+
+    recorded_modules = record_all_modules(reference_directory=str(tmp_path))
+    recorded_functions = record_all_functions_from_modules(recorded_modules)
+
+    module_import_paths = dict([(rec_module.unique_reference_id, rec_module.import_path) for rec_module in recorded_modules])
+    id_to_qualified_handle = dict([(rec_func.unique_reference_id, f'{module_import_paths[rec_func.source_module_reference_id]}.{rec_func.function_handle}')
+                                   for rec_func in recorded_functions])
+
+    function_calls = dict([(id_to_qualified_handle[rec_func.unique_reference_id], [id_to_qualified_handle[call] for call in rec_func.ordered_function_calls])
+                           for rec_func in recorded_functions])
+
+    # colliding handles resolve to the imported definitions, calls into other packages (json.load) are not resolved,
+    # ambiguous method calls (self.run) are dropped, and calls of builtins (open) and of methods of local variables
+    # (d.get) don't fall back onto project functions of the same handle
+    assert function_calls == {'main.main': ['package.core.run', 'package.other.run', 'package.core.helper', 'main.load'],
+                              'main.load': [],
+                              'package.core.run': ['package.core.helper'],
+                              'package.core.helper': [],
+                              'package.other.run': ['package.core.helper'],
+                              'files.open': [],
+                              'files.get': [],
+                              'app.main': []}
+
+
+def test_record_all_functions_fast_mode(synthetic_project, monkeypatch):
+
+    project_directory, synthetic_project_truth = synthetic_project
+
+    # a module with a syntax error, which the ast mode can't record
+    with open(os.path.join(project_directory, 'broken.py'), 'w') as f:
+        f.write('import package_0.module_0 as helpers\n\ndef broken(x:\n    """load(x)"""\n    helpers.function_1(x)  # run(x)\n')
+
+    recorded_modules = record_all_modules(reference_directory=project_directory)
+
+    with pytest.raises(SyntaxError):
+        record_all_functions_from_modules(recorded_modules)
+
+    # memory map all module files
+    monkeypatch.setattr(function_helpers, 'FAST_SCAN_MMAP_MIN_FILE_SIZE_BYTES', 0)
+
+    recorded_functions = record_all_functions_from_modules(recorded_modules, parsing_mode='fast')
+
+    module_import_paths = dict([(rec_module.unique_reference_id, rec_module.import_path) for rec_module in recorded_modules])
+    id_to_qualified_handle = dict([(rec_func.unique_reference_id, f'{module_import_paths[rec_func.source_module_reference_id]}.{rec_func.function_handle}')
+                                   for rec_func in recorded_functions])
+
+    # calls in strings and comments are ignored
+    assert dict([(id_to_qualified_handle[rec_func.unique_reference_id], [id_to_qualified_handle[call] for call in rec_func.ordered_function_calls])
+                 for rec_func in recorded_functions]) == dict(synthetic_project_truth['function_calls'],
+                                                              **{'broken.broken': ['package_0.module_0.function_1']})
+    assert all([rec_func.is_approximate for rec_func in recorded_functions])
+
+
+def test_create_function_and_module_meta_data(synthetic_project):
+
+    project_directory, synthetic_project_truth = synthetic_project
+
+    recorded_modules = record_all_modules(reference_directory=project_directory)
+    recorded_functions = record_all_functions_from_modules(recorded_modules)
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = create_function_and_module_meta_data(recorded_modules,
+                                                                                                               recorded_functions)
+
+    # the vectorized tables equal those created from one row per record and function call
+    pd.testing.assert_frame_equal(module_meta_data,
+                                  pd.DataFrame([(rec_module.unique_reference_id, rec_module.file_path, rec_module.import_path, rec_module.reference_directory)
+                                                for rec_module in recorded_modules],
+                                               columns=module_meta_data.columns.tolist()))
+    pd.testing.assert_frame_equal(function_meta_data,
+                                  pd.DataFrame([(rec_func.unique_reference_id, rec_func.function_handle, rec_func.source_module_reference_id,
+                                                 rec_func.definition_start_line_index, rec_func.definition_end_line_index,
+                                                 rec_func.definition_start_line_offset, rec_func.definition_end_line_offset,
+                                                 len(rec_func.ordered_function_calls), rec_func.is_approximate)
+                                                for rec_func in recorded_functions],
+                                               columns=function_meta_data.columns.tolist()))
+    pd.testing.assert_frame_equal(function_dependency_meta_data,
+                                  pd.DataFrame([(rec_func.unique_reference_id, function_call, function_call_index)
+                                                for rec_func in recorded_functions
+                                                for function_call_index, function_call in enumerate(rec_func.ordered_function_calls)],
+                                               columns=function_dependency_meta_data.columns.tolist()))
+
+    assert function_meta_data['n_dependency_functions'].sum() == len(function_dependency_meta_data) == \
+           sum([len(function_calls) for function_calls in synthetic_project_truth['function_calls'].values()])
+
+    # tables without rows have columns of dtype object, like tables created from no rows
+    for meta_data in create_function_and_module_meta_data([], []):
+        assert meta_data.empty
+        assert (meta_data.dtypes == object).all()
+
+
+def test_update_watched_project(tmp_path):
+
+    project_directory = tmp_path / 'project'
+    output_directory = tmp_path / 'output'
+    os.makedirs(project_directory)
+    os.makedirs(output_directory)
+
+    def write_module(module_name, module_source):
+        with open(project_directory / module_name, 'w') as f:
+            f.write(module_source)
+
+    def update():
+        module_file_paths = record_all_module_file_paths(reference_directory=str(project_directory))
+        changed_module_file_paths, removed_module_file_paths, module_file_stats = detect_module_changes(watch_state, module_file_paths)
+
+        return update_watched_project(watch_state=watch_state,
+                                      module_file_paths=module_file_paths,
+                                      module_file_stats=module_file_stats,
+                                      changed_module_file_paths=changed_module_file_paths,
+                                      removed_module_file_paths=removed_module_file_paths,
+                                      reference_directory=str(project_directory),
+                                      output_directory=output_directory)
+
+    def get_exported_graph_root_ids():
+        return sorted([file_name.split('_')[1] for file_name in os.listdir(output_directory) if file_name.endswith('.svg')])
+
+    write_module('a.py', 'def root_a():\n    helper_a()\n\ndef helper_a():\n    pass\n')
+    write_module('b.py', 'def root_b():\n    helper_b()\n\ndef helper_b():\n    pass\n')
+
+    watch_state = create_watch_state()
+    watch_update = update()
+
+    assert (watch_update['n_parsed_modules'], watch_update['n_exported_graph_roots']) == (2, 2)
+
+    root_ids = dict([(rec_func.function_handle, rec_func.unique_reference_id) for module_functions in watch_state['module_functions'].values() for rec_func in module_functions])
+    assert get_exported_graph_root_ids() == sorted([root_ids['root_a'], root_ids['root_b']])
+
+    # only the changed module is parsed, and only the affected graph root is exported again
+    write_module('b.py', 'def root_b():\n    helper_b()\n    helper_b()\n\ndef helper_b():\n    pass\n')
+    watch_update = update()
+
+    assert (watch_update['n_parsed_modules'], watch_update['n_changed_functions'], watch_update['n_exported_graph_roots']) == (1, 1, 1)
+
+    # without changes, nothing is parsed
+    assert detect_module_changes(watch_state, record_all_module_file_paths(reference_directory=str(project_directory)))[:2] == ([], [])
+
+    # the outputs of functions that are no longer graph roots are removed
+    write_module('b.py', 'from a import helper_a\n\ndef helper_b():\n    helper_a()\n')
+    watch_update = update()
+
+    assert (watch_update['n_exported_graph_roots'], watch_update['n_removed_graph_roots']) == (1, 1)
+    assert get_exported_graph_root_ids() == sorted([root_ids['root_a'], root_ids['helper_b']])
+
+
+@pytest.fixture
+def graph_test_meta_data():
+
+    module_meta_data = pd.DataFrame([('m1', 'a.py', 'a', '.')],
+                                    columns=['unique_reference_id', 'file_path', 'import_path', 'reference_directory'])
+
+    function_meta_data = pd.DataFrame([(f'f{i}', f'handle_{i}', 'm1') for i in range(13)],
+                                      columns=['unique_reference_id', 'function_handle', 'source_module_reference_id'])
+
+    # f0 calls f1, ..., f11; f1 calls f12
+    function_dependency_meta_data = pd.DataFrame([('f0', f'f{i}', i - 1) for i in range(1, 12)] + [('f1', 'f12', 0)],
+                                                 columns=['unique_reference_id', 'function_dependency_reference_id', 'function_dependency_index'])
+
+    return module_meta_data, function_meta_data, function_dependency_meta_data
+
+
+def test_create_graph_meta_data(graph_test_meta_data):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    graph_meta_data = create_graph_meta_data(root_function_reference_id='f0',
+                                             module_meta_data=module_meta_data,
+                                             function_meta_data=function_meta_data,
+                                             function_adjacency_index=create_function_adjacency_index(function_dependency_meta_data))
+
+    assert graph_meta_data['target_function_graph_index'].tolist() == ['', '1', '1.1', '10', '11', '2', '3', '4', '5', '6', '7', '8', '9']
+    assert graph_meta_data['target_function_generation'].tolist() == [0, 1, 2] + [1] * 10
+    assert graph_meta_data['graph_plot_y_coordinate'].tolist() == list(range(1, 14))
+    assert graph_meta_data['target_function_import_path'].tolist()[:3] == ['a.handle_0', 'a.handle_1', 'a.handle_12']
+
+
+@pytest.mark.parametrize(
+    'graph_expansion_mode,expected_graph_indices,expected_node_types,expected_reference_graph_indices',
+    [
+        ('full',
+         ['', '1', '1.1', '1.2', '2', '2.1', '2.2'],
+         ['function', 'function', 'cycle', 'function', 'function', 'cycle', 'function'],
+         ['', '', '', '', '', '', '']),
+        ('memoized',
+         ['', '1', '1.1', '1.2', '2'],
+         ['function', 'function', 'cycle', 'function', 'reference'],
+         ['', '', '', '', '1']),
+    ]
+)
+def test_create_graph_meta_data_cycles_and_references(graph_expansion_mode,
+                                                      expected_graph_indices,
+                                                      expected_node_types,
+                                                      expected_reference_graph_indices):
+
+    module_meta_data = pd.DataFrame([('m1', 'a.py', 'a', '.')],
+                                    columns=['unique_reference_id', 'file_path', 'import_path', 'reference_directory'])
+
+    function_meta_data = pd.DataFrame([(f'f{i}', f'handle_{i}', 'm1') for i in range(3)],
+                                      columns=['unique_reference_id', 'function_handle', 'source_module_reference_id'])
+
+    # f0 calls f1 twice; f1 recursively calls f0, and f2
+    function_dependency_meta_data = pd.DataFrame([('f0', 'f1', 0), ('f0', 'f1', 1), ('f1', 'f0', 0), ('f1', 'f2', 1)],
+                                                 columns=['unique_reference_id', 'function_dependency_reference_id', 'function_dependency_index'])
+
+    graph_meta_data = create_graph_meta_data(root_function_reference_id='f0',
+                                             module_meta_data=module_meta_data,
+                                             function_meta_data=function_meta_data,
+                                             function_dependency_meta_data=function_dependency_meta_data,
+                                             graph_expansion_mode=graph_expansion_mode)
+
+    assert graph_meta_data['target_function_graph_index'].tolist() == expected_graph_indices
+    assert graph_meta_data['target_function_node_type'].tolist() == expected_node_types
+    assert graph_meta_data['target_function_reference_graph_index'].tolist() == expected_reference_graph_indices
+
+
+@pytest.mark.parametrize(
+    'max_depth,max_nodes,expected_graph_indices,expected_truncated_graph_indices',
+    [
+        (None, None, ['', '1', '1.1', '10', '11', '2', '3', '4', '5', '6', '7', '8', '9'], []),
+        (1, None, ['', '1', '10', '11', '2', '3', '4', '5', '6', '7', '8', '9'], ['1']),
+        (0, None, [''], ['']),
+        (None, 12, ['', '1', '10', '11', '2', '3', '4', '5', '6', '7', '8', '9'], ['1']),
+        (None, 5, [''], ['']),
+    ]
+)
+def test_create_graph_meta_data_budgets(graph_test_meta_data,
+                                        max_depth,
+                                        max_nodes,
+                                        expected_graph_indices,
+                                        expected_truncated_graph_indices):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    graph_meta_data = create_graph_meta_data(root_function_reference_id='f0',
+                                             module_meta_data=module_meta_data,
+                                             function_meta_data=function_meta_data,
+                                             function_dependency_meta_data=function_dependency_meta_data,
+                                             max_depth=max_depth,
+                                             max_nodes=max_nodes)
+
+    assert graph_meta_data['target_function_graph_index'].tolist() == expected_graph_indices
+    assert graph_meta_data.loc[graph_meta_data['target_function_node_type'] == 'truncated', 'target_function_graph_index'].tolist() == \
+        expected_truncated_graph_indices
+
+
+def test_create_graph_meta_data_callers(graph_test_meta_data):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    reverse_function_adjacency_index = create_reverse_function_adjacency_index(create_function_adjacency_index(function_dependency_meta_data))
+
+    assert reverse_function_adjacency_index['f12'] == [('f1', 0)]
+    assert 'f0' not in reverse_function_adjacency_index
+
+    graph_meta_data = create_graph_meta_data(root_function_reference_id='f12',
+                                             module_meta_data=module_meta_data,
+                                             function_meta_data=function_meta_data,
+                                             function_adjacency_index=reverse_function_adjacency_index)
+
+    assert graph_meta_data['target_function_graph_index'].tolist() == ['', '1', '1.1']
+    assert graph_meta_data['target_function_handle'].tolist() == ['handle_12', 'handle_1', 'handle_0']
+
+
+def test_get_target_function_ids(graph_test_meta_data):
+
+    module_meta_data, function_meta_data, _ = graph_test_meta_data
+
+    assert get_target_function_ids(module_meta_data, function_meta_data, ['a.handle_1', 'handle_12', 'handle_1']) == ['f1', 'f12']
+
+    with pytest.raises(ValueError):
+        get_target_function_ids(module_meta_data, function_meta_data, ['b.handle_1'])
+
+
+@pytest.mark.parametrize('root_function_reference_id,expected_n_arrows', [('f0', 12), ('f12', 0)])
+def test_plot_project_graph(graph_test_meta_data, root_function_reference_id, expected_n_arrows):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    graph_meta_data = create_graph_meta_data(root_function_reference_id=root_function_reference_id,
+                                             module_meta_data=module_meta_data,
+                                             function_meta_data=function_meta_data,
+                                             function_dependency_meta_data=function_dependency_meta_data)
+
+    drawing = plot_project_graph(graph_meta_data)
+
+    # one arrow to the first child of each parent, and one between each pair of consecutive siblings
+    n_arrows = len([element for element in drawing.elements if type(element).__name__ == 'Arrow'])
+
+    assert n_arrows == expected_n_arrows
+
+
+@pytest.mark.parametrize('root_function_reference_id,expected_n_arrows', [('f0', 12), ('f12', 0)])
+def test_render_svg_flow_chart(graph_test_meta_data, tmp_path, root_function_reference_id, expected_n_arrows):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    graph_meta_data = create_graph_meta_data(root_function_reference_id=root_function_reference_id,
+                                             module_meta_data=module_meta_data,
+                                             function_meta_data=function_meta_data,
+                                             function_dependency_meta_data=function_dependency_meta_data)
+
+    render_svg_flow_chart(graph_meta_data, tmp_path / 'diagram.svg')
+
+    svg_root = ElementTree.parse(tmp_path / 'diagram.svg').getroot()
+    used_symbol_ids = [svg_element.get('{http://www.w3.org/1999/xlink}href') for svg_element in svg_root.iter('{http://www.w3.org/2000/svg}use')]
+    path_classes = [svg_element.get('class') for svg_element in svg_root.iter('{http://www.w3.org/2000/svg}path')]
+
+    # the same elements as plot_project_graph draws, with each box and circle referencing its shared symbol
+    assert used_symbol_ids.count('#function-box') == len(graph_meta_data)
+    assert used_symbol_ids.count('#module-0-box') == len(graph_meta_data)
+    assert used_symbol_ids.count('#graph-index-circle') == len(graph_meta_data) - 1
+    assert path_classes.count('arrow') == expected_n_arrows
+
+
+def test_split_flow_chart_into_pages(graph_test_meta_data):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    graph_meta_data = create_graph_meta_data(root_function_reference_id='f0',
+                                             module_meta_data=module_meta_data,
+                                             function_meta_data=function_meta_data,
+                                             function_dependency_meta_data=function_dependency_meta_data)
+
+    pages = split_flow_chart_into_pages(graph_meta_data, max_rows_per_page=5)
+
+    assert [len(page['graph_meta_data']) for page in pages] == [5, 5, 3]
+    assert all([page['graph_meta_data']['graph_plot_y_coordinate'].tolist() == list(range(1, len(page['graph_meta_data']) + 1))
+                for page in pages])
+
+    # the arrows '1' -> '2', '6' -> '7' and '9' -> '10' cross pages, and each is marked on both pages
+    continuation_markers = [(page['page_index'], continuation_marker['graph_index'], continuation_marker['linked_graph_index'],
+                             continuation_marker['linked_page_index'])
+                            for page in pages for continuation_marker in page['continuation_markers']]
+
+    assert sorted(continuation_markers) == [(0, '1', '2', 1), (0, '10', '9', 2), (1, '2', '1', 0), (1, '6', '7', 2),
+                                            (2, '7', '6', 1), (2, '9', '10', 0)]
+    assert len(split_flow_chart_into_pages(graph_meta_data, max_rows_per_page=0)) == 1
+
+
+@pytest.mark.parametrize('renderer', ['schemdraw', 'svg'])
+def test_export_all_graph_roots_paged(graph_test_meta_data, tmp_path, renderer):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    graph_root_exports = export_all_graph_roots(graph_root_function_ids=['f0'],
+                                                module_meta_data=module_meta_data,
+                                                function_meta_data=function_meta_data,
+                                                function_adjacency_index=create_function_adjacency_index(function_dependency_meta_data),
+                                                output_directory=tmp_path,
+                                                renderer=renderer,
+                                                max_rows_per_page=5)
+
+    assert graph_root_exports[0]['n_diagram_pages'] == 3
+    assert sorted(os.listdir(tmp_path)) == ['graphit_f0_graph_meta_data.csv', 'graphit_f0_graph_root_diagram_index.html',
+                                            'graphit_f0_graph_root_diagram_page_1.svg', 'graphit_f0_graph_root_diagram_page_2.svg',
+                                            'graphit_f0_graph_root_diagram_page_3.svg']
+
+    with open(tmp_path / 'graphit_f0_graph_root_diagram_index.html') as f:
+        assert f.read().count('graphit_f0_graph_root_diagram_page_') == 3
+
+
+def test_estimate_graph_sizes(graph_test_meta_data):
+
+    _, _, function_dependency_meta_data = graph_test_meta_data
+    function_adjacency_index = create_function_adjacency_index(function_dependency_meta_data)
+
+    assert estimate_graph_sizes(['f0', 'f1', 'f12'], function_adjacency_index) == {'f0': 13, 'f1': 2, 'f12': 1}
+
+
+def test_export_all_graph_roots_parallel(graph_test_meta_data, tmp_path):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    graph_root_exports = export_all_graph_roots(graph_root_function_ids=['f0', 'f1'],
+                                                module_meta_data=module_meta_data,
+                                                function_meta_data=function_meta_data,
+                                                function_adjacency_index=create_function_adjacency_index(function_dependency_meta_data),
+                                                output_directory=tmp_path,
+                                                n_jobs=2)
+
+    assert sorted([graph_root_export['n_graph_records'] for graph_root_export in graph_root_exports]) == [2, 13]
+    assert sorted(os.listdir(tmp_path)) == ['graphit_f0_graph_meta_data.csv', 'graphit_f0_graph_root_diagram.svg',
+                                            'graphit_f1_graph_meta_data.csv', 'graphit_f1_graph_root_diagram.svg']
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow'])
+def test_export_all_graph_roots_columnar(graph_test_meta_data, tmp_path, export_format):
+
+    pytest.importorskip('pyarrow')
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    export_all_graph_roots(graph_root_function_ids=['f0', 'f1'],
+                           module_meta_data=module_meta_data,
+                           function_meta_data=function_meta_data,
+                           function_adjacency_index=create_function_adjacency_index(function_dependency_meta_data),
+                           output_directory=tmp_path,
+                           export_format=export_format)
+
+    graph_meta_data = read_meta_data(os.path.join(tmp_path, f'graphit_graph_meta_data.{export_format}'))
+
+    assert graph_meta_data['root_function_id'].astype(str).value_counts().to_dict() == {'f0': 13, 'f1': 2}
+    assert graph_meta_data['target_function_generation'].dtype == 'int64'
+
+
+def test_write_profile_report(graph_test_meta_data, tmp_path):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    profile = start_profile()
+
+    with profile_stage(profile, 'graph_root_export') as stage_profile:
+        graph_root_exports = export_all_graph_roots(graph_root_function_ids=['f0', 'f1'],
+                                                    module_meta_data=module_meta_data,
+                                                    function_meta_data=function_meta_data,
+                                                    function_adjacency_index=create_function_adjacency_index(function_dependency_meta_data),
+                                                    output_directory=tmp_path,
+                                                    profile=True)
+        stage_profile['n_items'] = len(graph_root_exports)
+
+    add_graph_root_profiles(profile, graph_root_exports)
+
+    with open(write_profile_report(profile, tmp_path)) as f:
+        profile_report = json.load(f)
+
+    assert [stage_profile['stage'] for stage_profile in profile_report['stages']] == ['graph_root_export']
+    assert profile_report['stages'][0]['n_items'] == 2
+    assert profile_report['stages'][0]['peak_memory_mb'] > 0
+    assert sorted([graph_root_profile['graph_root_function_id'] for graph_root_profile in profile_report['graph_roots']]) == ['f0', 'f1']
+    assert all([graph_root_profile['peak_memory_mb'] > 0 for graph_root_profile in profile_report['graph_roots']])
+    assert profile_report['total_wall_time_s'] >= profile_report['stages'][0]['wall_time_s']
+
+
+def test_cli_import_time():
+
+    # importing the cli must not import the heavy dependencies, so that e.g. `run_graphit --help` starts fast
+    import_check = subprocess.run([sys.executable, '-c',
+                                   'import sys, time\n'
+                                   'import_start = time.perf_counter()\n'
+                                   'import graphit.main\n'
+                                   'print(time.perf_counter() - import_start)\n'
+                                   'print(",".join(sorted(set(["pandas", "schemdraw", "matplotlib", "pydantic"]) & set(sys.modules))))'],
+                                  capture_output=True, text=True, check=True)
+    import_time, imported_heavy_modules = import_check.stdout.splitlines()
+
+    assert imported_heavy_modules == ''
+    assert float(import_time) < 1
+
+    help_check = subprocess.run([sys.executable, '-m', 'graphit.main', '--help'],
+                                capture_output=True, text=True, check=True)
+
+    assert '--no-diagrams' in help_check.stdout
+
+
+def test_export_all_graph_roots_no_diagrams(graph_test_meta_data, tmp_path):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    graph_root_exports = export_all_graph_roots(graph_root_function_ids=['f0', 'f1'],
+                                                module_meta_data=module_meta_data,
+                                                function_meta_data=function_meta_data,
+                                                function_adjacency_index=create_function_adjacency_index(function_dependency_meta_data),
+                                                output_directory=tmp_path,
+                                                export_diagrams=False)
+
+    assert sorted([graph_root_export['n_graph_records'] for graph_root_export in graph_root_exports]) == [2, 13]
+    assert sorted(os.listdir(tmp_path)) == ['graphit_f0_graph_meta_data.csv', 'graphit_f1_graph_meta_data.csv']
+
+    # the node columns are only exported if the graphs can contain reference or truncated nodes
+    assert 'target_function_node_type' not in read_meta_data(os.path.join(tmp_path, 'graphit_f0_graph_meta_data.csv')).columns
+
+    export_all_graph_roots(graph_root_function_ids=['f0'],
+                           module_meta_data=module_meta_data,
+                           function_meta_data=function_meta_data,
+                           function_adjacency_index=create_function_adjacency_index(function_dependency_meta_data),
+                           output_directory=tmp_path,
+                           graph_expansion_mode='memoized',
+                           export_diagrams=False)
+
+    assert 'target_function_node_type' in read_meta_data(os.path.join(tmp_path, 'graphit_f0_graph_meta_data.csv')).columns
+
+
+def test_response_cache():
+
+    response_cache = create_response_cache(size_limit_mb=3 / 1024 ** 2)
+
+    cache_response(response_cache, ('a',), b'a')
+    cache_response(response_cache, ('b',), b'bb')
+    assert get_cached_response(response_cache, ('a',)) == b'a'
+
+    # 'b' is the least recently used response now
+    cache_response(response_cache, ('c',), b'c')
+    assert list(response_cache['responses']) == [('a',), ('c',)]
+    assert get_cached_response(response_cache, ('b',)) is None
+    assert response_cache['size_bytes'] == 2
+
+    # too large to be cached at all
+    cache_response(response_cache, ('d',), b'dddd')
+    assert get_cached_response(response_cache, ('d',)) is None
+
+
+def test_query_server(graph_test_meta_data):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+    function_meta_data = function_meta_data.assign(definition_start_line_index=0, definition_end_line_index=1)
+
+    query_index = create_query_index(module_meta_data, function_meta_data, function_dependency_meta_data)
+    response_cache = create_response_cache()
+
+    status_code, _, response_body = handle_query(query_index, response_cache, '/callers', {'target': ['handle_12']})
+    assert status_code == 200
+    assert [caller['function_id'] for caller in json.loads(response_body)[0]['callers']] == ['f1']
+
+    status_code, _, response_body = handle_query(query_index, response_cache, '/subtree', {'target': ['a.handle_0'], 'depth': ['1']})
+    assert status_code == 200
+    assert len(json.loads(response_body)[0]['graph_meta_data']) == 12
+    assert len(response_cache['responses']) == 1
+
+    assert handle_query(query_index, response_cache, '/subtree', {'target': ['handle_0'], 'depth': ['x']})[0] == 400
+    assert handle_query(query_index, response_cache, '/svg', {'target': ['handle_13']})[0] == 404
+
+    query_server = create_query_server(query_index, port=0)
+    threading.Thread(target=query_server.serve_forever, daemon=True).start()
+
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{query_server.server_address[1]}/svg?target=handle_1&direction=callers') as response:
+            assert response.headers['Content-Type'] == 'image/svg+xml'
+            assert ElementTree.fromstring(response.read()).tag.endswith('svg')
+
+        with urllib.request.urlopen(f'http://127.0.0.1:{query_server.server_address[1]}/roots') as response:
+            assert [root['function_id'] for root in json.loads(response.read())] == ['f0']
+    finally:
+        query_server.shutdown()
+        query_server.server_close()
+
+
+def test_graph_store(graph_test_meta_data, tmp_path):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+    function_meta_data = function_meta_data.assign(definition_start_line_index=0, definition_end_line_index=1,
+                                                   definition_start_line_offset=0, definition_end_line_offset=0,
+                                                   n_dependency_functions=0)
+
+    # f12 calls back into f1, closing a cycle
+    function_dependency_meta_data = pd.concat([function_dependency_meta_data,
+                                               pd.DataFrame([('f12', 'f1', 0)], columns=function_dependency_meta_data.columns)],
+                                              ignore_index=True)
+
+    store_file_path = write_graph_store(str(tmp_path / 'graph_store.sqlite'), module_meta_data, function_meta_data,
+                                        function_dependency_meta_data)
+    connection = open_graph_store(store_file_path)
+
+    for meta_data, stored_meta_data in zip((module_meta_data, function_meta_data, function_dependency_meta_data),
+                                           read_graph_store(connection)):
+        pd.testing.assert_frame_equal(meta_data, stored_meta_data, check_dtype=False)
+
+    assert query_store_functions(connection, 'a.handle_1')['unique_reference_id'].tolist() == ['f1']
+    assert query_store_functions(connection, 'b.handle_1').empty
+
+    assert len(query_store_subtree(connection, 'f0')) == 13
+    assert query_store_subtree(connection, 'f0', max_depth=1)['target_function_id'].tolist() == [f'f{i}' for i in range(1, 12)]
+    assert query_store_subtree(connection, 'f12', graph_direction='callers')[['source_function_id', 'target_function_id']].values.tolist() == \
+        [['f12', 'f1'], ['f1', 'f0'], ['f1', 'f12']]
+
+    assert sorted(query_store_reachable_function_ids(connection, 'f1')) == ['f1', 'f12']
+    assert query_store_is_reachable(connection, 'f0', 'f12')
+    assert not query_store_is_reachable(connection, 'f2', 'f12')
+
+    connection.close()
+
+
+def test_create_graph_diff_and_link_graph_root_outputs(graph_test_meta_data, tmp_path):
+
+    module_meta_data, function_meta_data, function_dependency_meta_data = graph_test_meta_data
+
+    # f1 no longer calls f12 but f11 instead, f12 is removed and f13 is added
+    changed_function_meta_data = pd.concat([function_meta_data.iloc[:12],
+                                            pd.DataFrame([('f13', 'handle_13', 'm1')], columns=function_meta_data.columns)],
+                                           ignore_index=True)
+    changed_function_dependency_meta_data = function_dependency_meta_data.replace({'function_dependency_reference_id': {'f12': 'f11'}})
+
+    graph_diff, changed_function_ids = create_graph_diff((module_meta_data, function_meta_data, function_dependency_meta_data),
+                                                         (module_meta_data, changed_function_meta_data, changed_function_dependency_meta_data))
+
+    assert changed_function_ids == {'f1', 'f12', 'f13'}
+    assert graph_diff['added_functions'] == ['a.handle_13']
+    assert graph_diff['removed_functions'] == ['a.handle_12']
+    assert graph_diff['rewired_functions'] == [{'function': 'a.handle_1', 'added_dependencies': ['a.handle_11'],
+                                                'removed_dependencies': ['a.handle_12']}]
+    assert (graph_diff['n_added_dependencies'], graph_diff['n_removed_dependencies']) == (1, 1)
+
+    baseline_directory, output_directory = tmp_path / 'baseline', tmp_path / 'output'
+    os.mkdir(baseline_directory)
+    os.mkdir(output_directory)
+
+    export_all_graph_roots(graph_root_function_ids=['f0', 'f2'],
+                           module_meta_data=module_meta_data,
+                           function_meta_data=function_meta_data,
+                           function_adjacency_index=create_function_adjacency_index(function_dependency_meta_data),
+                           output_directory=baseline_directory,
+                           renderer='svg')
+
+    assert link_graph_root_outputs('f2', baseline_directory, output_directory)
+    assert not link_graph_root_outputs('f3', baseline_directory, output_directory)
+    assert sorted(os.listdir(output_directory)) == ['graphit_f2_graph_meta_data.csv', 'graphit_f2_graph_root_diagram.svg']
+    assert os.path.samefile(output_directory / 'graphit_f2_graph_root_diagram.svg', baseline_directory / 'graphit_f2_graph_root_diagram.svg')
+
+
+def test_run_graphit_with_baseline_of_other_graph_settings(tmp_path):
+
+    project_directory = tmp_path / 'project'
+    os.makedirs(project_directory / 'pkg')
+    (project_directory / 'pkg' / '__init__.py').write_text('')
+    (project_directory / 'pkg' / 'a.py').write_text('def main():\n    walk(1)\n    walk(2)\n\n'
+                                                    'def walk(n):\n    if n:\n        walk(n - 1)\n')
+    os.makedirs(tmp_path / 'output')
+
+    def run_graphit(*args):
+        output_directory = run_configured_graphit(parse_graphit_arguments(['--reference-directory', str(project_directory),
+                                                                           '--module-scope', str(project_directory / 'pkg'),
+                                                                           '--meta-data-export-directory', str(tmp_path / 'output'),
+                                                                           '--no-cache', '--no-diagrams', *args]))
+
+        # main is the only graph root
+        graph_meta_data_file_names = [file_name for file_name in os.listdir(output_directory) if file_name.endswith('_graph_meta_data.csv')]
+        assert len(graph_meta_data_file_names) == 1
+
+        return output_directory, read_meta_data(os.path.join(output_directory, graph_meta_data_file_names[0]))
+
+    baseline_directory, _ = run_graphit('--graph-expansion', 'full')
+    _, memoized_graph_meta_data = run_graphit('--graph-expansion', 'memoized')
+    output_directory, graph_meta_data = run_graphit('--graph-expansion', 'memoized', '--baseline', str(baseline_directory))
+
+    # the baseline's graph roots were expanded in full, so they are exported again instead of being reused
+    pd.testing.assert_frame_equal(graph_meta_data, memoized_graph_meta_data)
+
+    with open(os.path.join(output_directory, 'graphit_graph_diff.json')) as f:
+        assert json.load(f)['n_reused_graph_roots'] == 0
+
+
+def test_merge_shard_artifacts(synthetic_project, tmp_path):
+
+    project_directory, _ = synthetic_project
+
+    recorded_modules = record_all_modules(reference_directory=project_directory)
+    recorded_functions = record_all_functions_from_modules(recorded_modules)
+
+    n_shards = 3
+    shard_directory = tmp_path / 'shards'
+    os.mkdir(shard_directory)
+
+    for shard_number in range(1, n_shards + 1):
+        shard_module_indices = [module_index for module_index, module in enumerate(recorded_modules)
+                                if get_module_shard_number(module, n_shards) == shard_number]
+        shard_functions, shard_module_symbol_tables = record_unresolved_functions_from_modules(
+            [recorded_modules[module_index] for module_index in shard_module_indices])
+
+        write_shard_artifact(shard_directory, shard_number, n_shards, recorded_modules, shard_module_indices, shard_functions,
+                             shard_module_symbol_tables)
+
+        if shard_number == 1:
+            # a merge needs all shards
+            with pytest.raises(ValueError):
+                merge_shard_artifacts([shard_directory])
+
+    merged_modules, merged_functions, merged_module_symbol_tables = merge_shard_artifacts([shard_directory])
+    merged_functions = resolve_all_function_calls(merged_functions, merged_modules, merged_module_symbol_tables)
+
+    # the merged records are the same, and in the same order, as those of an unsharded run
+    assert [module.unique_reference_id for module in merged_modules] == [module.unique_reference_id for module in recorded_modules]
+    assert [(function.unique_reference_id, function.ordered_function_calls) for function in merged_functions] == \
+        [(function.unique_reference_id, function.ordered_function_calls) for function in recorded_functions]
+
+
+def test_create_output_directory_collisions(tmp_path):
+
+    output_directories = [create_output_directory(tmp_path) for _ in range(3)]
+
+    assert len(set(output_directories)) == 3
+    assert all([os.path.isdir(output_directory) for output_directory in output_directories])
 
-def test_record_all_functions():
-    pass
\ No newline at end of file